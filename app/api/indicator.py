@@ -38,12 +38,12 @@ KEYS = {
 
 # 투자지표 조회 (쿼리 기반)
 @router.get("/")
-def get_investment_info(
+async def get_investment_info(
 	code: str = Query(..., description="종목 코드 (예: 005930, TSLA 등)"),
 	market: str = Query("KR", description="시장 구분 (KR | US)"),
 	intent: str = Query("", description="원하는 정보 (예: 시가총액, 매출액, 등락률, PSR )")
 ):
-	data = get_investment_metrics(code, market)
+	data = await get_investment_metrics(code, market)
 	# intent가 없으면 모두 모든 data return
 	if intent == "":
 		return data
@@ -57,12 +57,12 @@ def get_investment_info(
 
 # 특정 지표 설명 조회 (쿼리 기반)
 @router.get("/explain")
-def explain_metric(
+async def explain_metric(
 	code: str = Query(..., description="종목 코드"),
 	market: str = Query("KR", description="시장"),
 	metric: str = Query(..., description="지표명 (예: PER, PBR, ROE 등)")
 ):
-	data = get_investment_metrics(code, market)
+	data = await get_investment_metrics(code, market)
 
 	metric_upper = metric.upper()
 	# 값 할당
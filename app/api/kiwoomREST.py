@@ -1,13 +1,14 @@
 import os
-import requests
 import json
-import time
-import redis
 import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
-from app.db.redis_service import get_redis, get_cache, set_cache
+from app.db.redis_service import get_async_redis, aget_cache, aset_cache
 from app.errors import StockAPIException
+from app.services.kiwoom_client import kiwoom_post
+from app.services.kiwoom_token import get_kiwoom_token
+from app.services import metrics
+from app.services.chart_codec import encode_chart, decode_chart, to_frame
 
 
 load_dotenv()
@@ -18,117 +19,60 @@ REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 
 
-# 공통 post 함수 
-def try_post(url, headers, params, timeout=5):
-	try:
-		response = requests.post(url, headers=headers, json=params, timeout=timeout)
-		response.raise_for_status()
-		return response.json()
-	except requests.exceptions.RequestException as e:
-		raise StockAPIException(status_code=500, detail=f"요청 실패: {str(e)}")
-
-
-# 접근토큰 발급
-def get_kiwoom_token():
-	cache_key = f"KIWOOM_TOKEN"
-	r = get_redis(9)
-	# Redis에서 토큰 조회
-	token = get_cache(r, cache_key)
-
-	if token:
-		return token
-	
-	# 1. 요청할 API URL
-	host = 'https://mockapi.kiwoom.com'  # 모의투자
-	# host = 'https://api.kiwoom.com' # 실전투자
-	endpoint = '/oauth2/token'
-	url = host + endpoint
-
-	# 2. header 데이터
-	headers = {
-		'Content-Type': 'application/json;charset=UTF-8',  # 컨텐츠타입
-	}
-
-	# 요청 데이터
-	params = {
-		'grant_type': 'client_credentials',  # grant_type
-		'appkey': API_KEY,  # 앱키
-		'secretkey': SECRET_KEY,  # 시크릿키
-	}
-
-	response = try_post(url, headers, params)
-
-	try:
-		token = response["token"]
-		set_cache(r, cache_key, token, 3600)
-		return token
-	except (KeyError, redis.RedisError) as e:
-		raise StockAPIException(status_code=500, detail=f"토큰 저장 또는 응답 파싱 실패: {str(e)}")
+# 공통 post 함수 (공유 커넥션 풀 사용)
+async def try_post(endpoint, params, api_id=None, token=None, cont_yn=None, next_key=None, timeout=None):
+	data, _ = await kiwoom_post(endpoint, params, api_id=api_id, token=token, cont_yn=cont_yn, next_key=next_key, timeout=timeout)
+	return data
 
 
 # 주식기본정보요청
-def get_kiwoom_stkinfo(token, cont_yn='N', next_key='', code=""):
-	# 1. 요청할 API URL
-	host = 'https://mockapi.kiwoom.com'  # 모의투자
-	# host = 'https://api.kiwoom.com' # 실전투자
+async def get_kiwoom_stkinfo(token, cont_yn='N', next_key='', code=""):
+	# 1. 요청할 API endpoint
 	endpoint = '/api/dostk/stkinfo'
-	url = host + endpoint
-
-	# 2. header 데이터
-	headers = {
-		'Content-Type': 'application/json;charset=UTF-8',  # 컨텐츠타입
-		'authorization': f'Bearer {token}',  # 접근토큰
-		'cont-yn': cont_yn,  # 연속조회여부
-		'next-key': next_key,  # 연속조회키
-		'api-id': 'ka10001',  # TR명
-	}
 
-	# 요청 데이터
+	# 2. 요청 데이터
 	params = {
 		'stk_cd': code,  # 종목코드 거래소별 종목코드 (KRX:039490,NXT:039490_NX,SOR:039490_AL)
 	}
 
 	# 3. http POST 요청
-	return try_post(url, headers, params)
+	return await try_post(endpoint, params, api_id='ka10001', token=token, cont_yn=cont_yn, next_key=next_key)
 
 
 # 일봉차트 전체 조회
-def get_kiwoom_stock_chart(token, code, date=datetime.now().strftime("%Y%m%d")):
-	r = get_redis(0)
-	cached = get_cache(r, code)
+async def get_kiwoom_stock_chart(token, code, date=None):
+	date = date or datetime.now().strftime("%Y%m%d")
+	r = get_async_redis(0, decode_responses=False)
+	cache_key = code
+	cached = await aget_cache(r, cache_key)
 	if cached:
-		return pd.read_json(cached)
+		try:
+			columns, _ = decode_chart(cached)
+			df_cached = to_frame(columns)
+			df_cached['timestamp'] = df_cached['timestamp'].dt.strftime('%Y-%m-%dT%H:%M:%S')
+			return df_cached
+		except ValueError:
+			pass  # 이전 형식(JSON) 캐시는 무시하고 다시 조회
 
-	host = 'https://mockapi.kiwoom.com'
 	endpoint = '/api/dostk/chart'
-	url = host + endpoint
 	all_data = []
 	next_key_val = ""
+	pages = 0
 
 	while True:
-		headers = {
-			'Content-Type': 'application/json;charset=UTF-8',
-			'authorization': f'Bearer {token}',
-			'cont-yn': 'Y',
-			'next-key': next_key_val,
-			'api-id': 'ka10081',
-		}
-
 		params = {
 			'stk_cd': code,
 			'base_dt': date,
 			'upd_stkpc_tp': '1',
 		}
 
-		try:
-			response = requests.post(url, headers=headers, json=params, timeout=5)
-			response.raise_for_status()
-			data_json = response.json()
-		except requests.exceptions.RequestException as e:
-			raise StockAPIException(status_code=500, detail=f"[ERROR] 요청 실패: {e}")
+		data_json, response_headers = await kiwoom_post(
+			endpoint, params, api_id='ka10081', token=token, cont_yn='Y', next_key=next_key_val
+		)
 
-		next_key_val = response.headers.get("next-key")
+		next_key_val = response_headers.get("next-key")
 		data = data_json.get("stk_dt_pole_chart_qry", [])
+		pages += 1
 
 		if not data:
 			break
@@ -141,7 +85,9 @@ def get_kiwoom_stock_chart(token, code, date=datetime.now().strftime("%Y%m%d")):
 		if not next_key_val:
 			break
 
-		time.sleep(1)
+	# 요청당 조회한 페이지 수 기록
+	await metrics.incr("kiwoom.ka10081.pages", pages)
+	await metrics.observe("kiwoom.ka10081.pages_per_request.stock_chart", pages)
 
 	if not all_data:
 		return pd.DataFrame()
@@ -171,7 +117,7 @@ def get_kiwoom_stock_chart(token, code, date=datetime.now().strftime("%Y%m%d")):
 		df_filtered[numeric_columns] = df_filtered[numeric_columns].apply(pd.to_numeric, errors='coerce')
 
 		# 변환 후 캐싱
-		set_cache(r, code, df_filtered.to_json())
+		await aset_cache(r, cache_key, encode_chart(df_filtered))
 
 		return df_filtered
 
@@ -182,21 +128,10 @@ def get_kiwoom_stock_chart(token, code, date=datetime.now().strftime("%Y%m%d")):
 
 
 # 주식년봉차트조회요청
-def fn_ka10094(token, cont_yn='N', next_key='', code="", date=datetime.today().strftime('%Y%m%d')):
-	# 1. 요청할 API URL
-	host = 'https://mockapi.kiwoom.com'  # 모의투자
-	# host = 'https://api.kiwoom.com' # 실전투자
+async def fn_ka10094(token, cont_yn='N', next_key='', code="", date=None):
+	date = date or datetime.today().strftime('%Y%m%d')
+	# 1. 요청할 API endpoint
 	endpoint = '/api/dostk/chart'
-	url = host + endpoint
-
-	# 2. header 데이터
-	headers = {
-		'Content-Type': 'application/json;charset=UTF-8',  # 컨텐츠타입
-		'authorization': f'Bearer {token}',  # 접근토큰
-		'cont-yn': cont_yn,  # 연속조회여부
-		'next-key': next_key,  # 연속조회키
-		'api-id': 'ka10094',  # TR명
-	}
 
 	# 2. 요청 데이터
 	params = {
@@ -206,35 +141,16 @@ def fn_ka10094(token, cont_yn='N', next_key='', code="", date=datetime.today().s
 	}
 
 	# 3. http POST 요청
-	response = requests.post(url, headers=headers, json=params)
-
-	# 4. 응답 상태 코드와 데이터 출력
-	# print('Code:', response.status_code)
-	# print('Header:', json.dumps({key: response.headers.get(key) for key in ['next-key', 'cont-yn', 'api-id']}, indent=4, ensure_ascii=False))
-	# print('Body:', json.dumps(response.json(), indent=4, ensure_ascii=False))  # JSON 응답을 파싱하여 출력
-
-	data = response.json()  # 전체 응답을 딕셔너리로 파싱
+	data = await try_post(endpoint, params, api_id='ka10094', token=token, cont_yn=cont_yn, next_key=next_key)  # 전체 응답을 딕셔너리로 파싱
 
 	df = pd.DataFrame(data)
 	return df
 
 
 # 전업종지수요청
-def get_industry_price(token, code, cont_yn='N', next_key=''):
-	# 1. 요청할 API URL
-	host = 'https://mockapi.kiwoom.com'  # 모의투자
-	# host = 'https://api.kiwoom.com' # 실전투자
+async def get_industry_price(token, code, cont_yn='N', next_key=''):
+	# 1. 요청할 API endpoint
 	endpoint = '/api/dostk/sect'
-	url = host + endpoint
-
-	# 2. header 데이터
-	headers = {
-		'Content-Type': 'application/json;charset=UTF-8',  # 컨텐츠타입
-		'authorization': f'Bearer {token}',  # 접근토큰
-		'cont-yn': cont_yn,  # 연속조회여부
-		'next-key': next_key,  # 연속조회키
-		'api-id': 'ka20003',  # TR명
-	}
 
 	# 2. 요청 데이터
 	params = {
@@ -243,25 +159,13 @@ def get_industry_price(token, code, cont_yn='N', next_key=''):
 	}
 
 	# 3. http POST 요청
-	return try_post(url, headers, params)
+	return await try_post(endpoint, params, api_id='ka20003', token=token, cont_yn=cont_yn, next_key=next_key)
 
 
 # 테마그룹별요청
-def fn_ka90001(token, code='', cont_yn='N', next_key=''):
-	# 1. 요청할 API URL
-	host = 'https://mockapi.kiwoom.com'  # 모의투자
-	# host = 'https://api.kiwoom.com' # 실전투자
+async def fn_ka90001(token, code='', cont_yn='N', next_key=''):
+	# 1. 요청할 API endpoint
 	endpoint = '/api/dostk/thme'
-	url = host + endpoint
-
-	# 2. header 데이터
-	headers = {
-		'Content-Type': 'application/json;charset=UTF-8',  # 컨텐츠타입
-		'authorization': f'Bearer {token}',  # 접근토큰
-		'cont-yn': cont_yn,  # 연속조회여부
-		'next-key': next_key,  # 연속조회키
-		'api-id': 'ka90001',  # TR명
-	}
 
 	# 2. 요청 데이터
 	params = {
@@ -274,10 +178,10 @@ def fn_ka90001(token, code='', cont_yn='N', next_key=''):
 	}
 
 	# 3. http POST 요청
-	response = requests.post(url, headers=headers, json=params)
-	next_key_val = response.headers.get('next-key')
+	data, response_headers = await kiwoom_post(endpoint, params, api_id='ka90001', token=token, cont_yn=cont_yn, next_key=next_key)
+	next_key_val = response_headers.get('next-key')
 	print(next_key_val)
-	print(response.text)
+	print(json.dumps(data, ensure_ascii=False))
 
 
 	# 4. 응답 상태 코드와 데이터 출력
@@ -287,21 +191,9 @@ def fn_ka90001(token, code='', cont_yn='N', next_key=''):
 
 
 # 테마구성종목요청
-def fn_ka90002(token, code, cont_yn='N', next_key=''):
-	# 1. 요청할 API URL
-	host = 'https://mockapi.kiwoom.com'  # 모의투자
-	# host = 'https://api.kiwoom.com' # 실전투자
+async def fn_ka90002(token, code, cont_yn='N', next_key=''):
+	# 1. 요청할 API endpoint
 	endpoint = '/api/dostk/thme'
-	url = host + endpoint
-
-	# 2. header 데이터
-	headers = {
-		'Content-Type': 'application/json;charset=UTF-8',  # 컨텐츠타입
-		'authorization': f'Bearer {token}',  # 접근토큰
-		'cont-yn': cont_yn,  # 연속조회여부
-		'next-key': next_key,  # 연속조회키
-		'api-id': 'ka90002',  # TR명
-	}
 
 	# 2. 요청 데이터
 	params = {
@@ -311,33 +203,20 @@ def fn_ka90002(token, code, cont_yn='N', next_key=''):
 	}
 
 	# 3. http POST 요청
-	response = requests.post(url, headers=headers, json=params)
-	next_key_val = response.headers.get('next-key')
+	data, response_headers = await kiwoom_post(endpoint, params, api_id='ka90002', token=token, cont_yn=cont_yn, next_key=next_key)
+	next_key_val = response_headers.get('next-key')
 	print(next_key_val)
 
-	# 4. 응답 상태 코드와 데이터 출력
-	print('Code:', response.status_code)
-	print('Header:', json.dumps({key: response.headers.get(key) for key in ['next-key', 'cont-yn', 'api-id']}, indent=4,
+	# 4. 응답 데이터 출력
+	print('Header:', json.dumps({key: response_headers.get(key) for key in ['next-key', 'cont-yn', 'api-id']}, indent=4,
 								ensure_ascii=False))
-	print('Body:', json.dumps(response.json(), indent=4, ensure_ascii=False))  # JSON 응답을 파싱하여 출력
+	print('Body:', json.dumps(data, indent=4, ensure_ascii=False))  # JSON 응답을 파싱하여 출력
 
 
 # 업종별주가요청
-def fn_ka20002(token, cont_yn='N', next_key=''):
-	# 1. 요청할 API URL
-	host = 'https://mockapi.kiwoom.com'  # 모의투자
-	# host = 'https://api.kiwoom.com' # 실전투자
+async def fn_ka20002(token, cont_yn='N', next_key=''):
+	# 1. 요청할 API endpoint
 	endpoint = '/api/dostk/sect'
-	url = host + endpoint
-
-	# 2. header 데이터
-	headers = {
-		'Content-Type': 'application/json;charset=UTF-8',  # 컨텐츠타입
-		'authorization': f'Bearer {token}',  # 접근토큰
-		'cont-yn': cont_yn,  # 연속조회여부
-		'next-key': next_key,  # 연속조회키
-		'api-id': 'ka20002',  # TR명
-	}
 
 	# 2. 요청 데이터
 	params = {
@@ -348,10 +227,10 @@ def fn_ka20002(token, cont_yn='N', next_key=''):
 	}
 
 	# 3. http POST 요청
-	response = requests.post(url, headers=headers, json=params)
-	next_key_val = response.headers.get('next-key')
+	data, response_headers = await kiwoom_post(endpoint, params, api_id='ka20002', token=token, cont_yn=cont_yn, next_key=next_key)
+	next_key_val = response_headers.get('next-key')
 	print(next_key_val)
-	print(response.text)
+	print(json.dumps(data, ensure_ascii=False))
 
 
 	# 4. 응답 상태 코드와 데이터 출력
@@ -361,26 +240,16 @@ def fn_ka20002(token, cont_yn='N', next_key=''):
 
 
 # 종목코드 조회 함수
-def get_stock_code(token, company_name, market='0'):
-	# 1. 요청할 API URL
-	host = 'https://mockapi.kiwoom.com'  # 모의투자
-	# host = 'https://api.kiwoom.com'  # 실전투자
+async def get_stock_code(token, company_name, market='0'):
+	# 1. 요청할 API endpoint
 	endpoint = '/api/dostk/stkinfo'
-	url = host + endpoint
-
-	# 2. header 데이터
-	headers = {
-		'Content-Type': 'application/json;charset=UTF-8',  # 컨텐츠타입
-		'authorization': f'Bearer {token}',  # 접근토큰
-		'api-id': 'ka10099',  # TR명
-	}
 
-	# 3. 요청 데이터
+	# 2. 요청 데이터
 	params = {
 		'mrkt_tp': market,  # 시장구분 0:코스피, 10: 코스닥
 	}
 
-	response = try_post(url, headers, params)
+	response = await try_post(endpoint, params, api_id='ka10099', token=token)
 
 	for stock in response.get('list', []):
 		if stock.get('name') == company_name:
@@ -390,26 +259,16 @@ def get_stock_code(token, company_name, market='0'):
 
 
 # 기업 목록 조회 함수
-def get_stocks_by_keyword(token, keyword, market='0'):
-	# 1. 요청할 API URL
-	host = 'https://mockapi.kiwoom.com'  # 모의투자
-	# host = 'https://api.kiwoom.com'  # 실전투자
+async def get_stocks_by_keyword(token, keyword, market='0'):
+	# 1. 요청할 API endpoint
 	endpoint = '/api/dostk/stkinfo'
-	url = host + endpoint
-
-	# 2. header 데이터
-	headers = {
-		'Content-Type': 'application/json;charset=UTF-8',  # 컨텐츠타입
-		'authorization': f'Bearer {token}',  # 접근토큰
-		'api-id': 'ka10099',  # TR명
-	}
 	
-	# 3. 요청 데이터
+	# 2. 요청 데이터
 	params = {
 		'mrkt_tp': market,  # 시장구분 0:코스피, 10: 코드닥
 	}
 
-	response = try_post(url, headers, params)
+	response = await try_post(endpoint, params, api_id='ka10099', token=token)
 
 	matches = {
 		stock['name']: stock['code']
@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+from app.services.metrics import get_metrics
+
+router = APIRouter(prefix="/api/metrics", tags=["Metrics"])
+
+# 서버 내부 지표 조회 (업스트림 호출 수, 페이지 수 등)
+@router.get("")
+async def read_metrics():
+    return await get_metrics()
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Query, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Query, HTTPException, WebSocket, WebSocketDisconnect, Response, Request
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime
 from pydantic import BaseModel
+from typing import List, Optional
 import os
 import subprocess
 import uuid
@@ -9,14 +12,17 @@ import asyncio
 import websockets
 from websockets.protocol import State 
 import logging
-from app.services.stock_service import get_stock_chart, get_price, get_overseas_price, get_stock_chart_range
+from app.services.stock_service import get_stock_chart, get_stock_chart_blob, get_price, get_overseas_price, get_stock_chart_range_blob, iter_stock_charts
+from app.services.chart_codec import decode_chart, to_json_bytes, iter_ndjson
+from app.services import chart_response
 from app.api.kiwoomREST import get_kiwoom_token,get_stock_code, get_stocks_by_keyword
 from app.errors import StockAPIException
 from app.services.kiwoom_connection_manager import KiwoomConnectionManager as connection_manager
+from app.services.ws_client import MAX_HZ
+from app.services.tick_buffer import TICK_BUFFER_SIZE, SNAPSHOT_TICKS
+from app.services.bar_builder import BAR_INTERVALS, BAR_HISTORY, SNAPSHOT_BARS
 
 
-ACCESS_TOKEN = get_kiwoom_token()  # 고객 Access Token
-
 router = APIRouter(prefix="/api/stock", tags=["Stock"])
 
 class ChartDirectRequest(BaseModel):
@@ -24,6 +30,17 @@ class ChartDirectRequest(BaseModel):
     period: str
     market: str = "KR"
 
+class ChartBatchItem(BaseModel):
+    code: str
+    period: str
+    market: Optional[str] = None
+
+class ChartBatchRequest(BaseModel):
+    items: List[ChartBatchItem]
+
+# 일괄 차트 조회 최대 종목 수
+MAX_BATCH_ITEMS = 50
+
 def infer_market(code: str) -> str:
     return "KR" if code.endswith(".KS") or code.endswith(".KQ") else "US"
 
@@ -34,37 +51,79 @@ def validate_market_match(code: str, market: str) -> bool:
         return False
     return True
 
+# 차트 응답 (ETag 조건부 요청 + gzip/br 압축)
+# If-None-Match가 현재 버전과 같으면 JSON을 만들지 않고 304 반환
+async def _chart_response(request: Request, blob: bytes, render, variant: str = "", conditional: bool = True) -> Response:
+    etag = chart_response.make_etag(blob, variant)
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    matched = chart_response.matched_etag(request.headers.get("if-none-match"), etag) if conditional else None
+    if matched is not None:
+        headers["ETag"] = matched
+        return Response(status_code=304, headers=headers)
+
+    encoding = chart_response.choose_encoding(request.headers.get("accept-encoding"))
+    body, encoding = await chart_response.get_body(etag, encoding, render)
+    headers["ETag"] = chart_response.etag_header(etag, encoding)
+    if encoding != chart_response.IDENTITY:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# 차트 NDJSON 스트리밍 응답 (캔들 한 줄씩, 청크 단위로 직렬화해 전체 리스트를 만들지 않음)
+# 완성된 차트 캐시를 나눠 보내므로, 캐시 미스에서는 업스트림 조회가 모두 끝난 뒤 전송을 시작함
+def _chart_ndjson_response(request: Request, blob: bytes) -> Response:
+    etag = chart_response.make_etag(blob, "ndjson")
+    headers = {"Cache-Control": "no-cache", "ETag": chart_response.etag_header(etag, chart_response.IDENTITY)}
+    if chart_response.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    columns, _ = decode_chart(blob)
+    return StreamingResponse(iter_ndjson(columns), media_type="application/x-ndjson", headers=headers)
+
+def _render_chart(blob: bytes):
+    return lambda: to_json_bytes(decode_chart(blob)[0])
+
 @router.get("/price")
-def get_price_info(
+async def get_price_info(
     code: str = Query(..., description="종목 코드 (예: 005930, TSLA 등)"),
     intent: str = Query(..., description="의도 (예: current_price, high_limit, low_limit 등)"),
     market: str = Query("KR", description="시장 구분 (KR | US)")
 ):
     if market == "KR":
         code = code.split(".")[0]
-        return get_price(code, intent)
+        return await get_price(code, intent)
     elif market == "US":
         if intent == "current_price":
-            return get_overseas_price(code)
+            return await get_overseas_price(code)
         raise StockAPIException(status_code=400, detail="해외 종목은 현재가만 지원합니다.")
     raise StockAPIException(status_code=400, detail=f"Unsupported market type: {market}")
 
 @router.get("/chart")
-def get_chart_by_query(
+async def get_chart_by_query(
+    request: Request,
     code: str = Query(..., description="야후 파이낸스 형식의 종목 코드 (예: 005930.KS, TSLA)"),
     period: str = Query(..., description="차트 기간 (예: 3mo, 1y 등)"),
-    market: str = Query(None, description="시장 구분 (KR | US), 생략 시 자동 추론")
+    market: str = Query(None, description="시장 구분 (KR | US), 생략 시 자동 추론"),
+    format: str = Query("json", description="응답 형식 (json | ndjson), ndjson은 캔들을 한 줄씩 스트리밍")
 ):
     final_market = market or infer_market(code)
 
     # 유효성 검사
     if not validate_market_match(code, final_market):
         raise StockAPIException(status_code=400, detail=f"종목 코드 '{code}'와 시장 '{final_market}'이(가) 일치하지 않습니다.")
+    if format not in ("json", "ndjson"):
+        raise StockAPIException(status_code=400, detail=f"지원하지 않는 형식: {format}")
+
+    blob = await get_stock_chart_blob(code, period, final_market)
+
+    if format == "ndjson":
+        return _chart_ndjson_response(request, blob)
 
-    return get_stock_chart(code, period, final_market)
+    # 캐시된 컬럼 데이터를 바로 JSON으로 직렬화하여 반환
+    return await _chart_response(request, blob, _render_chart(blob))
 
 @router.post("/chart/direct")
-def get_chart_direct(req: ChartDirectRequest):
+async def get_chart_direct(req: ChartDirectRequest, request: Request):
     if not req.stock_code or not req.period:
         raise StockAPIException(status_code=400, detail="필수값 누락")
 
@@ -72,10 +131,39 @@ def get_chart_direct(req: ChartDirectRequest):
     if not validate_market_match(req.stock_code, req.market):
         raise StockAPIException(status_code=400, detail=f"종목 코드 '{req.stock_code}'와 시장 '{req.market}'이(가) 일치하지 않습니다.")
 
-    return get_stock_chart(req.stock_code, req.period, req.market)
+    blob = await get_stock_chart_blob(req.stock_code, req.period, req.market)
+    return await _chart_response(request, blob, _render_chart(blob), conditional=False)
+
+@router.post("/charts")
+async def get_charts_batch(req: ChartBatchRequest):
+    if not req.items:
+        raise StockAPIException(status_code=400, detail="필수값 누락")
+    if len(req.items) > MAX_BATCH_ITEMS:
+        raise StockAPIException(status_code=400, detail=f"한 번에 최대 {MAX_BATCH_ITEMS}개 종목까지 조회할 수 있습니다.")
+
+    items = []
+    for item in req.items:
+        final_market = item.market or infer_market(item.code)
+        if not validate_market_match(item.code, final_market):
+            raise StockAPIException(status_code=400, detail=f"종목 코드 '{item.code}'와 시장 '{final_market}'이(가) 일치하지 않습니다.")
+        items.append((item.code, item.period, final_market))
+
+    # 완료되는 종목부터 한 줄씩(NDJSON) 전송
+    async def stream():
+        async for (code, period, market), result in iter_stock_charts(items):
+            head = json.dumps({"code": code, "period": period, "market": market}, ensure_ascii=False, separators=(",", ":"))[:-1]
+            if isinstance(result, Exception):
+                status_code = getattr(result, "status_code", 500)
+                detail = getattr(result, "detail", str(result))
+                yield f'{head},"status":{status_code},"detail":{json.dumps(detail, ensure_ascii=False)}}}\n'.encode("utf-8")
+            else:
+                columns, _ = decode_chart(result)
+                yield head.encode("utf-8") + b',"status":200,"data":' + to_json_bytes(columns) + b'}\n'
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 @router.get("/generate-audio")
-def generate_audio_by_stock(
+async def generate_audio_by_stock(
     code: str = Query(..., description="야후 파이낸스 형식의 종목 코드 (예: 005930.KS, TSLA)"),
     period: str = Query("1mo", description="차트 기간 (예: 1mo, 3mo 등)"),
     market: str = Query(None, description="시장 구분 (KR | US), 생략 시 자동 추론")
@@ -88,7 +176,7 @@ def generate_audio_by_stock(
         raise StockAPIException(status_code=400, detail="시장/코드 불일치")
 
     # 차트 데이터 가져오기
-    chart_data = get_stock_chart(code, period, final_market)
+    chart_data = await get_stock_chart(code, period, final_market)
     if not chart_data or len(chart_data) == 0:
         raise StockAPIException(status_code=404, detail="차트 데이터 없음")
 
@@ -102,7 +190,7 @@ def generate_audio_by_stock(
         json.dump(chart_data, f)
 
     # C++ 실행
-    result = subprocess.run(["wine", "./app/api/hrtf_converter.exe", json_file, wav_file])
+    result = await run_in_threadpool(subprocess.run, ["wine", "./app/api/hrtf_converter.exe", json_file, wav_file])
 
     # 실패 시
     if result.returncode != 0 or not os.path.exists(wav_file):
@@ -118,7 +206,8 @@ def generate_audio_by_stock(
 
     return Response(content=audio_bytes, media_type="audio/wav")
 @router.get("/chart/range")
-def get_chart_by_range(
+async def get_chart_by_range(
+    request: Request,
     code: str = Query(..., description="야후 파이낸스 형식의 종목 코드 (예: 005930.KS, TSLA)"),
     start: str = Query(..., description="드래그 시작일 (YYYY-MM-DD)"),
     end: str = Query(..., description="드래그 종료일 (YYYY-MM-DD)"),
@@ -137,39 +226,73 @@ def get_chart_by_range(
     except ValueError:
         raise HTTPException(status_code=400, detail="날짜 형식이 잘못되었습니다 (YYYY-MM-DD)")
 
-    data = get_stock_chart_range(code, start_date, end_date, final_market)
+    blob = await get_stock_chart_range_blob(code, start_date, end_date, final_market)
 
-    return {
-        "meta": {
+    def render():
+        columns, _ = decode_chart(blob)
+        meta = {
             "code": code,
             "period": {"start": start, "end": end},
-            "count": len(data)
-        },
-        "data": data
-    }
+            "count": len(next(iter(columns.values()), ())),
+        }
+        return (
+            b'{"meta":' + json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            + b',"data":' + to_json_bytes(columns) + b'}'
+        )
+
+    # meta에 요청 값이 그대로 들어가므로 ETag에 함께 반영
+    return await _chart_response(request, blob, render, variant=f"{code}|{start}|{end}")
 
 @router.get("/findcode")
-def get_code(company_name: str = Query(..., description="기업 이름 입력 예) 삼성전자, SK하이닉스")
+async def get_code(company_name: str = Query(..., description="기업 이름 입력 예) 삼성전자, SK하이닉스")
 			 ,market: str = Query(..., description="0:코스피, 10: 코스닥")):
 	
-	result = get_stock_code(token=get_kiwoom_token(), company_name=company_name, market=market)
+	result = await get_stock_code(token=await get_kiwoom_token(), company_name=company_name, market=market)
 
 	return result
 
 @router.get("/findstk")
-def get_name_and_code(
+async def get_name_and_code(
 		keyword: str = Query(..., description="키워드 입력 예) 삼성, 현대")
 		,market: str = Query(..., description="0:코스피, 10: 코스닥") ):
 	
-	result = get_stocks_by_keyword(token=get_kiwoom_token(), keyword=keyword, market=market)
+	result = await get_stocks_by_keyword(token=await get_kiwoom_token(), keyword=keyword, market=market)
 
 	return result
 
     
+# 최근 실시간 체결 (이 서버가 실시간 시세를 받은 종목만, 오래된 순)
+@router.get("/ticks")
+async def get_recent_ticks(
+    code: str = Query(..., description="종목 코드 (예: 005930)"),
+    limit: int = Query(100, ge=1, le=TICK_BUFFER_SIZE, description="조회할 체결 수")
+):
+    code = code.split(".")[0]
+    return {"stock_code": code, "ticks": connection_manager().ticks.recent(code, limit)}
+
+# 실시간 체결로 만든 분봉 (이 서버가 실시간 시세를 받은 종목만, 오래된 순, 마지막은 진행 중인 봉)
+@router.get("/bars")
+async def get_intraday_bars(
+    code: str = Query(..., description="종목 코드 (예: 005930)"),
+    interval: int = Query(1, description="봉 단위(분): 1 | 5 | 15"),
+    limit: int = Query(100, ge=1, le=BAR_HISTORY, description="조회할 봉 수")
+):
+    if interval not in BAR_INTERVALS:
+        raise StockAPIException(status_code=400, detail=f"interval은 {list(BAR_INTERVALS)} 중 하나여야 합니다.")
+    code = code.split(".")[0]
+    return {"stock_code": code, "interval": interval, "bars": connection_manager().bars.recent(code, interval, limit)}
+
+# 실시간 시세 송신 큐 상태 (클라이언트별 큐 길이, 버린 메시지 수)
+@router.get("/ws/stats")
+async def get_websocket_stats():
+    return connection_manager().stats()
+
 @router.websocket("/ws/trade-price")
 async def websocket_trade_price(websocket: WebSocket):
     await websocket.accept()
     manager = connection_manager()
+    # ?encoding=binary: 체결을 바이너리 프레임으로 수신 (형식은 app/services/tick_codec.py)
+    manager.register_client(websocket, binary=websocket.query_params.get("encoding") == "binary")
 
     try:
         while True:
@@ -180,9 +303,38 @@ async def websocket_trade_price(websocket: WebSocket):
             action = data.get('action')
             stock_code = data.get('code')
 
-            if action == 'subscribe' and stock_code:
+            # 분봉 구독: {"action": "subscribe", "code": "005930", "type": "bars", "interval": 1 | 5 | 15}
+            if data.get('type') == 'bars' and action in ('subscribe', 'unsubscribe') and stock_code:
+                interval = data.get('interval')
+                if action == 'unsubscribe' and interval is None:
+                    await manager.unsubscribe_bars(websocket, stock_code)
+                elif interval not in BAR_INTERVALS or isinstance(interval, bool):
+                    manager.send(websocket, {"status": "error", "detail": f"interval은 {list(BAR_INTERVALS)} 중 하나여야 합니다."})
+                elif action == 'subscribe':
+                    snapshot = data.get('snapshot', SNAPSHOT_BARS)
+                    if not isinstance(snapshot, int) or isinstance(snapshot, bool) or not 0 <= snapshot <= BAR_HISTORY:
+                        manager.send(websocket, {"status": "error", "detail": f"snapshot은 0 이상 {BAR_HISTORY} 이하의 정수여야 합니다."})
+                        continue
+                    await manager.subscribe_bars(websocket, stock_code, interval, snapshot=snapshot)
+                else:
+                    await manager.unsubscribe_bars(websocket, stock_code, interval)
+            elif action == 'subscribe' and stock_code:
+                # 선택: max_hz(초당 최대 전송 횟수) 또는 mode="latest" (최신 틱만 전송)
+                max_hz = data.get('max_hz')
+                mode = data.get('mode')
+                # 선택: snapshot(구독 직후 받을 최근 체결 수, 0이면 최신가만)
+                snapshot = data.get('snapshot', SNAPSHOT_TICKS)
+                if max_hz is not None and (not isinstance(max_hz, (int, float)) or not 0 < max_hz <= MAX_HZ):
+                    manager.send(websocket, {"status": "error", "detail": f"max_hz는 0보다 크고 {MAX_HZ} 이하여야 합니다."})
+                    continue
+                if mode not in (None, 'all', 'latest'):
+                    manager.send(websocket, {"status": "error", "detail": f"지원하지 않는 mode: {mode}"})
+                    continue
+                if not isinstance(snapshot, int) or isinstance(snapshot, bool) or not 0 <= snapshot <= TICK_BUFFER_SIZE:
+                    manager.send(websocket, {"status": "error", "detail": f"snapshot은 0 이상 {TICK_BUFFER_SIZE} 이하의 정수여야 합니다."})
+                    continue
                 logging.info(f"Client {websocket} subscribing to {stock_code}")
-                await manager.subscribe(websocket, stock_code)
+                await manager.subscribe(websocket, stock_code, max_hz=max_hz, mode=mode, snapshot=snapshot)
             elif action == 'unsubscribe' and stock_code:
                 logging.info(f"Client {websocket} unsubscribing from {stock_code}")
                 await manager.unsubscribe(websocket, stock_code)
@@ -190,7 +342,7 @@ async def websocket_trade_price(websocket: WebSocket):
                 # 선택 사항: 알 수 없는 작업에 대한 오류를 다시 보냅니다.
                 error_message = {"status": "error", "detail": f"Unknown action '{action}' or missing code."}
                 logging.warning(f"Sending error to client {websocket}: {error_message}")
-                await websocket.send_json(error_message)
+                manager.send(websocket, error_message)
 
     except WebSocketDisconnect:
         logging.info(f"Client {websocket} disconnected.")
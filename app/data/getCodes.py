@@ -1,27 +1,27 @@
 import pandas as pd
 
 
-def getKospiCodes(filePath):
+def getKospiCodes(filePath, limit=3):
     kospi = pd.read_csv(filePath, dtype={'종목코드': str})
     # 콤마 제거 → 숫자형으로 변환
     kospi['상장시가총액(원)'] = kospi['상장시가총액(원)'].str.replace(',', '').astype(float)
     # 정렬
     kospi = kospi.sort_values(by="상장시가총액(원)", ascending=False)
 
-    top100 = kospi.head(3)
+    top100 = kospi.head(limit)
     codes = dict(zip(top100['종목코드'], top100['종목명']))
 
     return codes
 
 
-def getKosdaqCodes(filePath):
+def getKosdaqCodes(filePath, limit=100):
     kosdaq = pd.read_csv(filePath, dtype={'종목코드': str})
     # 콤마 제거 → 숫자형으로 변환
     kosdaq['상장시가총액(원)'] = kosdaq['상장시가총액(원)'].str.replace(',', '').astype(float)
     # 정렬
     kosdaq = kosdaq.sort_values(by="상장시가총액(원)", ascending=False)
 
-    top100 = kosdaq.head(100)
+    top100 = kosdaq.head(limit)
     codes = dict(zip(top100['종목코드'], top100['종목명']))
 
     return codes
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import asyncio
 import redis
 import json
 import numpy as np
@@ -6,6 +7,8 @@ from sqlalchemy import create_engine, MetaData, Table, Column, Integer, Float, S
 from sqlalchemy.orm import sessionmaker
 from app.api.kiwoomREST import *
 from app.data.getCodes import getKospiCodes
+from app.db.redis_service import close_async_redis
+from app.services.kiwoom_client import close_client
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -106,10 +109,23 @@ def update_ohlcv_bulk(ohlcv_table, ohlcv_data_list: list):
 
 
 
+# 동기 코드에서 코루틴 실행
+# 공유 httpx/Redis 비동기 클라이언트는 처음 사용한 이벤트 루프에 묶이므로, 루프가 끝나기 전에 정리해 다음 실행에서 새로 만들게 함
+def run_async(coro):
+    async def run():
+        try:
+            return await coro
+        finally:
+            await close_client()
+            await close_async_redis()
+
+    return asyncio.run(run())
+
+
 # OHLCV 데이터 요청(과거 주가) 및 저장 
 def REST_save_table(token, table_name, code, date=""):
     ohlcv_table = createTable(table_name)
-    df_filtered = get_kiwoom_chart(token, code, date)
+    df_filtered = run_async(get_kiwoom_stock_chart(token, code, date))
 
     df_filtered['code'] = code
     # DataFrame을 dict 리스트로 변환
@@ -137,7 +153,7 @@ def REST_save_table(token, table_name, code, date=""):
 
 # OHLCV 데이터 요청(현재가) 요청 및 저장 
 def REST_insert_colmns(code):
-    data = get_kiwoom_stkinfo(token=MY_ACCESS_TOKEN, code=code)
+    data = run_async(get_kiwoom_stkinfo(token=MY_ACCESS_TOKEN, code=code))
     table_name = data['stk_nm']
     ohlcv_table = createTable(table_name)
 
@@ -1,5 +1,6 @@
 import redis
 import os
+from redis import asyncio as aioredis
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,13 +12,29 @@ chart = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=Tru
 metric = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=2, decode_responses=True)
 kiwoom_token = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=9, decode_responses=True)
 
+# 비동기 클라이언트 (db, decode_responses 별로 하나씩 재사용)
+_async_clients = {}
 
-def get_redis(db):
+
+def get_redis(db, decode_responses=True):
     try:
-        return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=db, decode_responses=True)
+        return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=db, decode_responses=decode_responses)
     except redis.RedisError as e:
         raise ConnectionError(f"Redis 연결 실패: {str(e)}")
 
+def get_async_redis(db, decode_responses=True):
+    key = (db, decode_responses)
+    if key not in _async_clients:
+        _async_clients[key] = aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=db, decode_responses=decode_responses)
+    return _async_clients[key]
+
+# 비동기 클라이언트 정리 (이벤트 루프가 끝나기 전에 호출, 다음 호출 시 새로 생성)
+async def close_async_redis():
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    for client in clients:
+        await client.aclose()
+
 # 캐시 저장 헬퍼
 def set_cache(client, key, value, ttl=3600):
     try:
@@ -31,4 +48,19 @@ def get_cache(client, key):
         return client.get(key)
     except redis.RedisError as e:
         print(f"Redis 조회 실패: {e}")
-        return None
\ No newline at end of file
+        return None
+
+# 비동기 캐시 저장 헬퍼
+async def aset_cache(client, key, value, ttl=3600):
+    try:
+        await client.setex(key, ttl, value)
+    except redis.RedisError as e:
+        print(f"Redis 저장 실패: {e}")
+
+# 비동기 캐시 조회 헬퍼
+async def aget_cache(client, key):
+    try:
+        return await client.get(key)
+    except redis.RedisError as e:
+        print(f"Redis 조회 실패: {e}")
+        return None
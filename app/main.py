@@ -6,8 +6,11 @@ from logging.handlers import TimedRotatingFileHandler
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import stock, indicator, investment, intent, naverNews
+from app.api import stock, indicator, investment, intent, naverNews, metrics
 from app.errors import add_exception_handlers, StockAPIException
+from app.services.kiwoom_client import close_client
+from app.services import prewarm_service, fx_service
+from app.services.kiwoom_connection_manager import KiwoomConnectionManager as connection_manager
 
 # 로깅 설정
 LOG_DIR = "logs"
@@ -41,6 +44,22 @@ app = FastAPI()
 
 add_exception_handlers(app)
 
+@app.on_event("startup")
+async def start_prewarm_scheduler():
+    # Redis에 저장된 환율 스냅샷을 메모리로 읽음 (업스트림 조회는 스케줄러가 담당)
+    await fx_service.load()
+    # 환율 갱신, 인기 종목 캐시 프리워밍 스케줄러 시작
+    prewarm_service.start_scheduler()
+    # 실시간 체결 배포 시작 (WS_DISTRIBUTION=redis인 경우 워커 간 배포)
+    await connection_manager().start()
+
+@app.on_event("shutdown")
+async def close_kiwoom_client():
+    prewarm_service.stop_scheduler()
+    await connection_manager().shutdown()
+    # 키움 REST 커넥션 풀 정리
+    await close_client()
+
 @app.middleware("http")
 async def log_requests_and_errors(request: Request, call_next):
     start_time = time.time()
@@ -95,4 +114,5 @@ app.include_router(stock.router)
 app.include_router(intent.router)
 app.include_router(indicator.router)
 app.include_router(investment.router)
-app.include_router(naverNews.router)
\ No newline at end of file
+app.include_router(naverNews.router)
+app.include_router(metrics.router)
\ No newline at end of file
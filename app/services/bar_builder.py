@@ -0,0 +1,143 @@
+"""
+실시간 분봉 생성
+
+키움 실시간 체결로 종목별 1/5/15분봉(OHLCV)을 메모리에서 갱신합니다.
+봉은 봉 단위별 고정 크기 numpy 구조체 배열(링 버퍼)에 보관하며, 마지막 봉은 진행 중인 봉입니다.
+"""
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+BAR_INTERVALS = (1, 5, 15)                                # 지원하는 봉 단위(분)
+BAR_HISTORY = int(os.getenv("BAR_HISTORY", 400))         # 봉 단위별 보관하는 봉 수 (1분봉 기준 하루 장 시간 이상)
+BAR_CODES = int(os.getenv("BAR_CODES", 1000))            # 봉을 유지하는 최대 종목 수
+SNAPSHOT_BARS = int(os.getenv("WS_SNAPSHOT_BARS", 60))   # 봉 구독 시 보내는 기본 봉 수
+
+KST = timezone(timedelta(hours=9))
+_KST_OFFSET = np.timedelta64(9, "h")
+
+BAR_DTYPE = np.dtype([
+    ("start", "i8"),      # 봉 시작 시각 (epoch 초)
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "i8"),
+])
+
+
+# 체결시간(HHMMSS, 한국 시간) → epoch 초 (형식이 다르면 현재 시각)
+def tick_epoch(execution_time: str) -> int:
+    now = datetime.now(KST)
+    try:
+        t = now.replace(hour=int(execution_time[0:2]), minute=int(execution_time[2:4]),
+                        second=int(execution_time[4:6]), microsecond=0)
+    except (TypeError, ValueError):
+        return int(time.time())
+    return int(t.timestamp())
+
+
+class BarSeries:
+    """종목 하나, 봉 단위 하나의 봉 링 버퍼"""
+
+    def __init__(self, interval: int, capacity: int = BAR_HISTORY):
+        self.interval = interval
+        self.seconds = interval * 60
+        self.data = np.zeros(capacity, dtype=BAR_DTYPE)
+        self.head = 0     # 다음 봉을 쓸 위치
+        self.count = 0
+        self.late = 0     # 진행 중인 봉보다 이전 시각이라 반영하지 못한 체결 수
+
+    def __len__(self):
+        return self.count
+
+    def _last(self) -> int:
+        return (self.head - 1) % len(self.data)
+
+    def update(self, ts: int, price: float, volume: int):
+        """
+        체결을 반영합니다. 반환값: (완성된 이전 봉 또는 None, 진행 중인 봉)
+        봉 데이터는 배열의 행(view)이므로 보관하려면 복사해야 합니다.
+        """
+        # KST는 UTC+9이므로 epoch 기준으로 내림해도 한국 시간 기준 봉 경계와 같음
+        start = ts - ts % self.seconds
+        if self.count:
+            bar = self.data[self._last()]
+            if start == bar["start"]:
+                bar["high"] = max(bar["high"], price)
+                bar["low"] = min(bar["low"], price)
+                bar["close"] = price
+                bar["volume"] += volume
+                return None, bar
+            if start < bar["start"]:
+                self.late += 1
+                return None, bar
+            closed = bar.copy()
+        else:
+            closed = None
+
+        self.data[self.head] = (start, price, price, price, price, volume)
+        bar = self.data[self.head]
+        self.head = (self.head + 1) % len(self.data)
+        self.count = min(self.count + 1, len(self.data))
+        return closed, bar
+
+    def recent(self, n: int) -> np.ndarray:
+        """최근 n개 봉 (오래된 순, 마지막은 진행 중인 봉)"""
+        n = min(n, self.count)
+        index = (self.head - n + np.arange(n)) % len(self.data)
+        return self.data[index]
+
+
+def to_records(bars: np.ndarray) -> list:
+    """봉 배열 → [{"timestamp": "YYYY-MM-DDTHH:MM", open, high, low, close, volume}] (한국 시간)"""
+    bars = np.atleast_1d(bars)
+    stamps = np.datetime_as_string(bars["start"].astype("datetime64[s]") + _KST_OFFSET, unit="m")
+    return [
+        {
+            "timestamp": str(stamp),
+            "open": float(bar["open"]),
+            "high": float(bar["high"]),
+            "low": float(bar["low"]),
+            "close": float(bar["close"]),
+            "volume": int(bar["volume"]),
+        }
+        for stamp, bar in zip(stamps, bars)
+    ]
+
+
+class BarStore:
+    """종목코드 -> {봉 단위: BarSeries}"""
+
+    def __init__(self, intervals=BAR_INTERVALS, capacity: int = BAR_HISTORY, max_codes: int = BAR_CODES):
+        self.intervals = intervals
+        self.capacity = capacity
+        self.max_codes = max_codes
+        self.series = OrderedDict()
+
+    def update(self, code: str, tick: dict) -> dict:
+        """체결을 모든 봉 단위에 반영합니다. 반환값: {봉 단위: (완성된 봉 또는 None, 진행 중인 봉)}"""
+        series = self.series.get(code)
+        if series is None:
+            series = self.series[code] = {i: BarSeries(i, self.capacity) for i in self.intervals}
+            if len(self.series) > self.max_codes:
+                self.series.popitem(last=False)
+        else:
+            self.series.move_to_end(code)
+
+        ts = tick_epoch(tick["execution_time"])
+        price = tick["current_price"]
+        # 체결량은 매수(+)/매도(-) 부호가 붙어 있으므로 절댓값 사용
+        volume = abs(int(tick["volume"]))
+        return {interval: s.update(ts, price, volume) for interval, s in series.items()}
+
+    def recent(self, code: str, interval: int, n: int) -> list:
+        series = self.series.get(code)
+        if series is None or n <= 0:
+            return []
+        return to_records(series[interval].recent(n))
+
+    def __len__(self):
+        return len(self.series)
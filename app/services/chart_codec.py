@@ -0,0 +1,174 @@
+"""
+차트 캐시용 컬럼 기반 바이너리 포맷
+
+레이아웃 (little endian)
+    header  : magic(4s) version(B) flags(B) ncols(H) nrows(I) meta_len(H) reserved(H)
+    meta    : JSON (선택, 8바이트 정렬 패딩)
+    body    : 컬럼마다 name_len(B) name dtype(1s) + 패딩 + 값 배열 (8바이트 정렬)
+
+flags의 첫 비트가 켜져 있으면 body 전체가 zstd로 압축되어 있습니다.
+압축하지 않은 경우 decode는 원본 bytes 위에 NumPy 뷰를 만들어 복사 없이 반환합니다.
+"""
+import json
+import struct
+import numpy as np
+import pandas as pd
+
+try:
+    import zstandard
+except ImportError:  # zstd 미설치 시 비압축으로 저장
+    zstandard = None
+
+MAGIC = b"HSCC"
+VERSION = 1
+FLAG_ZSTD = 0x01
+
+HEADER = struct.Struct("<4sBBHIHH")
+
+# 컬럼별 dtype 코드
+DTYPES = {
+    b"i": np.dtype("<i4"),
+    b"q": np.dtype("<i8"),
+    b"f": np.dtype("<f4"),
+    b"d": np.dtype("<f8"),
+}
+DTYPE_CODES = {v: k for k, v in DTYPES.items()}
+
+# 날짜 컬럼 (1970-01-01 기준 일수, int32로 저장)
+DATE_COLUMNS = {"timestamp"}
+# 항상 정수로 저장하는 컬럼
+INT_COLUMNS = {"volume", "open_krw", "high_krw", "low_krw", "close_krw"}
+# 값이 없으면 캔들로 저장하지 않는 가격 컬럼
+PRICE_COLUMNS = ("open", "high", "low", "close")
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def _pad(n: int) -> int:
+    return (-n) % 8
+
+
+# 컬럼 저장 dtype 선택 (헤더에 컬럼별 dtype 코드로 기록)
+# 날짜: int32 일수, 거래량/원화 환산값: int64, 나머지는 원본 dtype 기준 (정수: int64(국내 가격), 실수: float64)
+# 값이 아니라 원본 dtype으로 정하므로 같은 경로의 응답 스키마가 요청마다 같음
+def _column_array(name: str, series: pd.Series) -> np.ndarray:
+    if name in DATE_COLUMNS:
+        days = pd.to_datetime(series).values.astype("datetime64[D]")
+        return (days - _EPOCH).astype("<i4")
+
+    try:
+        values = pd.to_numeric(series, errors="raise")
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"차트 캐시에 저장할 수 없는 컬럼입니다: {name} ({e})") from e
+    if name in INT_COLUMNS or values.dtype.kind in "iub":
+        return values.fillna(0).to_numpy().astype("<i8")
+    return values.fillna(0).to_numpy().astype("<f8")
+
+
+# DataFrame → 바이너리
+# 가격이 없는 행은 0원 캔들로 저장하지 않고 제외
+def encode_chart(df: pd.DataFrame, meta: dict = None, compress: bool = True) -> bytes:
+    prices = [name for name in PRICE_COLUMNS if name in df.columns]
+    if prices:
+        df = df.dropna(subset=prices)
+    body = bytearray()
+    for name in df.columns:
+        arr = _column_array(name, df[name])
+        encoded_name = name.encode("utf-8")
+        body += struct.pack("<B", len(encoded_name)) + encoded_name + DTYPE_CODES[arr.dtype]
+        body += b"\0" * _pad(len(body))
+        body += arr.tobytes()
+        body += b"\0" * _pad(len(body))
+
+    flags = 0
+    if compress and zstandard is not None:
+        body = zstandard.ZstdCompressor(level=3).compress(bytes(body))
+        flags |= FLAG_ZSTD
+
+    meta_bytes = json.dumps(meta).encode("utf-8") if meta else b""
+    meta_bytes += b"\0" * _pad(HEADER.size + len(meta_bytes))
+
+    header = HEADER.pack(MAGIC, VERSION, flags, len(df.columns), len(df), len(meta_bytes), 0)
+    return header + meta_bytes + bytes(body)
+
+
+# 바이너리 → (컬럼별 NumPy 배열, meta)
+def decode_chart(blob: bytes):
+    if not blob or len(blob) < HEADER.size:
+        raise ValueError("차트 캐시 형식이 올바르지 않습니다.")
+
+    magic, version, flags, ncols, nrows, meta_len, _ = HEADER.unpack_from(blob, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("지원하지 않는 차트 캐시 버전입니다.")
+
+    meta_bytes = blob[HEADER.size:HEADER.size + meta_len].rstrip(b"\0")
+    meta = json.loads(meta_bytes) if meta_bytes else {}
+
+    body = memoryview(blob)[HEADER.size + meta_len:]
+    if flags & FLAG_ZSTD:
+        if zstandard is None:
+            raise ValueError("zstd 압축 캐시를 읽으려면 zstandard 패키지가 필요합니다.")
+        body = memoryview(zstandard.ZstdDecompressor().decompress(body))
+
+    columns = {}
+    offset = 0
+    for _ in range(ncols):
+        name_len = body[offset]
+        name = bytes(body[offset + 1:offset + 1 + name_len]).decode("utf-8")
+        dtype = DTYPES[bytes(body[offset + 1 + name_len:offset + 2 + name_len])]
+        offset += 2 + name_len
+        offset += _pad(offset)
+        columns[name] = np.frombuffer(body, dtype=dtype, count=nrows, offset=offset)
+        offset += nrows * dtype.itemsize
+        offset += _pad(offset)
+
+    return columns, meta
+
+
+# 일수 배열 → "YYYY-MM-DD" 문자열 배열
+def days_to_str(days: np.ndarray) -> np.ndarray:
+    return np.datetime_as_string(_EPOCH + days.astype("timedelta64[D]"), unit="D")
+
+
+# 컬럼 → DataFrame (timestamp는 datetime64)
+def to_frame(columns: dict) -> pd.DataFrame:
+    data = {}
+    for name, arr in columns.items():
+        if name in DATE_COLUMNS:
+            data[name] = pd.to_datetime(_EPOCH + arr.astype("timedelta64[D]")).astype("datetime64[ns]")
+        else:
+            data[name] = arr
+    return pd.DataFrame(data)
+
+
+def _response_frame(columns: dict) -> pd.DataFrame:
+    data = {}
+    for name, arr in columns.items():
+        if name in DATE_COLUMNS:
+            data[name] = days_to_str(arr)
+        elif arr.dtype.kind == "f":
+            data[name] = np.round(arr.astype("<f8"), 2)
+        else:
+            data[name] = arr
+    return pd.DataFrame(data)
+
+
+# 컬럼 → 기존 응답 형식(list of dict)
+def to_records(columns: dict) -> list:
+    return _response_frame(columns).to_dict(orient="records")
+
+
+# 컬럼 → JSON 응답 bytes (dict 변환 없이 바로 직렬화)
+def to_json_bytes(columns: dict) -> bytes:
+    return _response_frame(columns).to_json(orient="records", double_precision=2).encode("utf-8")
+
+
+# 컬럼 → NDJSON 청크 (한 번에 chunk_rows 행씩 직렬화)
+def iter_ndjson(columns: dict, chunk_rows: int = 1000):
+    nrows = len(next(iter(columns.values()), ()))
+    for start in range(0, nrows, chunk_rows):
+        chunk = {name: arr[start:start + chunk_rows] for name, arr in columns.items()}
+        lines = _response_frame(chunk).to_json(orient="records", lines=True, double_precision=2)
+        if not lines.endswith("\n"):
+            lines += "\n"
+        yield lines.encode("utf-8")
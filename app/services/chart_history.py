@@ -0,0 +1,75 @@
+import pandas as pd
+from app.db.redis_service import get_async_redis, aget_cache, aset_cache
+from app.services.chart_codec import encode_chart, decode_chart, to_frame
+
+# 종목별 일봉 히스토리 (Redis db 0, 7일 TTL)
+HISTORY_TTL = 7 * 24 * 3600
+HISTORY_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+# 국내 주식 가격/거래량은 원 단위 정수
+INT_HISTORY_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def _history_key(code: str) -> str:
+    return f"history:{code}"
+
+
+# 저장된 일봉 히스토리와 메타 정보(first, last, complete) 조회
+async def load_history(code: str):
+    cached = await aget_cache(get_async_redis(0, decode_responses=False), _history_key(code))
+    if not cached:
+        return None, None
+
+    try:
+        columns, payload = decode_chart(cached)
+        df = to_frame(columns)[HISTORY_COLUMNS].astype({name: "int64" for name in INT_HISTORY_COLUMNS})
+        meta = {
+            "first": pd.Timestamp(payload["first"]),
+            "last": pd.Timestamp(payload["last"]),
+            "complete": bool(payload.get("complete", False)),
+        }
+    except (ValueError, KeyError, TypeError):
+        return None, None
+
+    if df.empty:
+        return None, None
+    return df, meta
+
+
+# 일봉 히스토리 저장
+# complete: 상장일까지 모두 받아온 히스토리인지 여부
+async def save_history(code: str, df: pd.DataFrame, complete: bool = False):
+    if df.empty:
+        return
+
+    df = df[HISTORY_COLUMNS].dropna(subset=INT_HISTORY_COLUMNS).sort_values(by="timestamp")
+    if df.empty:
+        return
+    df = df.astype({name: "int64" for name in INT_HISTORY_COLUMNS})
+    meta = {
+        "first": df["timestamp"].iloc[0].strftime("%Y-%m-%d"),
+        "last": df["timestamp"].iloc[-1].strftime("%Y-%m-%d"),
+        "complete": complete,
+    }
+    await aset_cache(get_async_redis(0, decode_responses=False), _history_key(code), encode_chart(df, meta=meta), HISTORY_TTL)
+
+
+# 새로 받은 캔들이 기존 히스토리와 겹치는 구간에서 값이 다르면 (수정주가 반영 등) 히스토리를 버림
+def is_consistent(history: pd.DataFrame, fresh: pd.DataFrame, last: pd.Timestamp) -> bool:
+    if fresh.empty:
+        return True
+
+    # 마지막 저장일은 장중에 받은 미완성 캔들일 수 있으므로 비교에서 제외
+    overlap = fresh[fresh["timestamp"] < last][["timestamp", "close"]].merge(
+        history[["timestamp", "close"]], on="timestamp", suffixes=("_new", "_old")
+    )
+    return bool((overlap["close_new"] == overlap["close_old"]).all())
+
+
+# 기존 히스토리에 새 캔들 병합 (같은 날짜는 새 값으로 교체)
+def merge_history(history: pd.DataFrame, fresh: pd.DataFrame) -> pd.DataFrame:
+    if fresh.empty:
+        return history
+
+    merged = pd.concat([history, fresh[HISTORY_COLUMNS]], ignore_index=True)
+    merged = merged.drop_duplicates(subset="timestamp", keep="last")
+    return merged.sort_values(by="timestamp").reset_index(drop=True)
@@ -0,0 +1,129 @@
+"""
+차트 응답 캐시
+
+차트 캐시 바이너리에서 ETag를 만들고, 직렬화한 JSON과 압축본(gzip, br)을
+Redis(resp:{etag})에 함께 저장해 같은 버전의 차트는 다시 직렬화/압축하지 않습니다.
+"""
+import os
+import gzip
+import hashlib
+import logging
+import redis
+from app.db.redis_service import get_async_redis
+
+try:
+    import brotli
+except ImportError:  # brotli 미설치 시 gzip만 사용
+    brotli = None
+
+RESPONSE_DB = int(os.getenv("REDIS_DB", 0))
+RESPONSE_TTL = 6 * 3600        # 차트 캐시 hard TTL과 동일
+MIN_COMPRESS_SIZE = 1024       # 이보다 작은 응답은 압축하지 않음(bytes)
+RENDER_VERSION = b"1"          # 응답 JSON 형식이 바뀌면 올려서 ETag를 무효화
+
+IDENTITY = "identity"
+
+
+# 캐시 바이너리(+ 응답 구분값) → ETag 값 (따옴표 제외)
+def make_etag(blob: bytes, variant: str = "") -> str:
+    h = hashlib.blake2b(RENDER_VERSION, digest_size=16)
+    h.update(variant.encode("utf-8"))
+    h.update(b"\0")
+    h.update(blob)
+    return h.hexdigest()
+
+
+# 인코딩별 ETag 헤더 값 (압축본은 접미사로 구분)
+def etag_header(etag: str, encoding: str) -> str:
+    return f'"{etag}"' if encoding == IDENTITY else f'"{etag}-{encoding}"'
+
+
+# If-None-Match에서 현재 버전과 일치하는 ETag 헤더 값 (인코딩 접미사는 무시, 없으면 None)
+# 304에는 클라이언트가 보낸 변형(-br, -gzip 등)을 그대로 돌려주어 저장된 ETag와 맞춤
+def matched_etag(if_none_match: str, etag: str):
+    if not if_none_match:
+        return None
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return etag_header(etag, IDENTITY)
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        if candidate.split("-", 1)[0] == etag:
+            return f'"{candidate}"'
+    return None
+
+
+# If-None-Match에 현재 버전이 포함되어 있는지 확인
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    return matched_etag(if_none_match, etag) is not None
+
+
+# Accept-Encoding 협상 (br > gzip > identity)
+def choose_encoding(accept_encoding: str) -> str:
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+
+    def ok(name):
+        return accepted.get(name, accepted.get("*", 0)) > 0
+
+    if brotli is not None and ok("br"):
+        return "br"
+    if ok("gzip"):
+        return "gzip"
+    return IDENTITY
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    return body
+
+
+async def get_body(etag: str, encoding: str, render):
+    """
+    etag 버전의 응답 body를 encoding으로 반환합니다. 반환값: (body, 실제 인코딩)
+    저장된 압축본이 있으면 그대로 사용하고, 없으면 render()로 JSON을 만든 뒤 압축해 저장합니다.
+    """
+    client = get_async_redis(RESPONSE_DB, decode_responses=False)
+    key = f"resp:{etag}"
+
+    raw = None
+    try:
+        raw, body = await client.hmget(key, [IDENTITY, encoding])
+        if body is not None:
+            return body, encoding
+    except redis.RedisError as e:
+        logging.warning(f"응답 캐시 조회 실패 ({key}): {e}")
+
+    rendered = raw is None
+    if rendered:
+        raw = render()
+    if encoding == IDENTITY or len(raw) < MIN_COMPRESS_SIZE:
+        if not rendered:
+            return raw, IDENTITY
+        encoding, body = IDENTITY, raw
+    else:
+        body = _compress(raw, encoding)
+
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.hset(key, mapping={IDENTITY: raw, encoding: body})
+        pipe.expire(key, RESPONSE_TTL)
+        await pipe.execute()
+    except redis.RedisError as e:
+        logging.warning(f"응답 캐시 저장 실패 ({key}): {e}")
+    return body, encoding
@@ -0,0 +1,290 @@
+"""
+환율 서비스
+
+한국수출입은행 환율(전체 통화)을 주기적으로 받아 프로세스 메모리와 Redis(db 2)에 보관합니다.
+    fx:snapshot            최신 환율 스냅샷 (JSON)
+    fx:history:{cur_unit}  통화별 일별 매매기준율 (field: YYYY-MM-DD)
+    fx:history:dates       이미 조회한 날짜 (휴일처럼 데이터가 없는 날 포함)
+조회 함수는 업스트림을 호출하지 않고 메모리의 값만 사용합니다.
+"""
+import os
+import json
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import redis
+import requests
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+from app.db.redis_service import get_async_redis
+from app.errors import StockAPIException
+from app.services import metrics
+from app.services.single_flight import single_flight
+
+load_dotenv()
+EXCHANGE_RATE_KEY = os.getenv("EXCHANGE_RATE_KEY")
+
+EXIM_URL = "https://oapi.koreaexim.go.kr/site/program/financial/exchangeJSON"
+NAVER_USD_URL = "https://finance.naver.com/marketindex/exchangeDetail.naver?marketindexCd=FX_USDKRW"
+
+FX_DB = 2
+SNAPSHOT_KEY = "fx:snapshot"
+HISTORY_DATES_KEY = "fx:history:dates"
+
+REFRESH_MINUTES = int(os.getenv("FX_REFRESH_MINUTES", 30))   # 스냅샷 갱신 주기(분)
+HISTORY_DAYS = int(os.getenv("FX_HISTORY_DAYS", 365))        # 일별 환율을 채우는 기간(일)
+BACKFILL_PER_RUN = int(os.getenv("FX_BACKFILL_PER_RUN", 5))  # 갱신 1회당 과거 날짜 조회 수
+LOOKBACK_DAYS = 7                                            # 스냅샷이 없을 때 거슬러 올라가는 최대 일수
+DEFAULT_USD_KRW = 1350.0                                     # 환율을 전혀 얻지 못했을 때 사용하는 값
+RETRY_SECONDS = 60                                           # 스냅샷이 없을 때 요청 경로에서 재조회하는 최소 간격(초)
+
+KST = timezone(timedelta(hours=9))
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+# 프로세스 내 스냅샷 {"date", "source", "fetched_at", "rates": [수출입은행 응답 항목]}
+_snapshot = None
+# 통화별 매매기준율 {cur_unit: float}
+_rates = {}
+# 통화별 일별 환율 {cur_unit: (일수 배열, 환율 배열)} (날짜 오름차순)
+_history = {}
+# 스냅샷 없이 마지막으로 업스트림 조회를 시도한 시각
+_last_attempt = 0.0
+
+
+def _history_key(cur_unit: str) -> str:
+    return f"fx:history:{cur_unit}"
+
+
+def _to_float(value) -> float:
+    return float(str(value).replace(",", ""))
+
+
+def _parse_rates(items: list) -> dict:
+    rates = {}
+    for item in items:
+        try:
+            rates[item["cur_unit"]] = _to_float(item["deal_bas_r"])
+        except (KeyError, ValueError):
+            continue
+    return rates
+
+
+# 수출입은행 환율 조회 (데이터가 없는 날은 빈 리스트)
+def _fetch_exim(date_str: str) -> list:
+    params = {
+        'authkey': EXCHANGE_RATE_KEY,
+        'searchdate': date_str,
+        'data': 'AP01',
+    }
+    response = requests.get(EXIM_URL, params=params, timeout=5)
+    response.raise_for_status()
+    data = response.json()
+    if not isinstance(data, list):
+        raise ValueError(f"환율 응답 형식 오류: {data}")
+    # result: 1 성공, 2 DATA코드 오류, 3 인증코드 오류, 4 일일제한횟수 마감
+    if data and data[0].get("result") not in (1, None):
+        raise ValueError(f"환율 조회 실패 (result={data[0].get('result')})")
+    return data
+
+
+# 네이버 USD/KRW (수출입은행 환율을 얻지 못했을 때만 사용)
+def _fetch_naver_usd() -> list:
+    response = requests.get(NAVER_USD_URL, timeout=5)
+    response.encoding = "utf-8"
+    rate_text = response.text.split("blind\">")[1].split("</span>")[0]
+    _to_float(rate_text)
+    return [{"result": 1, "cur_unit": "USD", "cur_nm": "미국 달러", "deal_bas_r": rate_text}]
+
+
+def _set_snapshot(snapshot: dict):
+    global _snapshot, _rates
+    _snapshot = snapshot
+    _rates = _parse_rates(snapshot.get("rates", []))
+
+
+async def _load_snapshot():
+    try:
+        raw = await get_async_redis(FX_DB).get(SNAPSHOT_KEY)
+        return json.loads(raw) if raw else None
+    except (redis.RedisError, ValueError) as e:
+        logging.warning(f"환율 스냅샷 조회 실패: {e}")
+        return None
+
+
+async def _load_history():
+    global _history
+    client = get_async_redis(FX_DB)
+    history = {}
+    try:
+        for cur_unit in _rates:
+            values = await client.hgetall(_history_key(cur_unit))
+            if not values:
+                continue
+            dates = sorted(values)
+            days = (np.array(dates, dtype="datetime64[D]") - _EPOCH).astype("<i4")
+            history[cur_unit] = (days, np.array([float(values[d]) for d in dates]))
+    except redis.RedisError as e:
+        logging.warning(f"환율 히스토리 조회 실패: {e}")
+        return
+    _history = history
+
+
+async def _save_day(date: str, items: list):
+    try:
+        pipe = get_async_redis(FX_DB).pipeline(transaction=False)
+        for cur_unit, rate in _parse_rates(items).items():
+            pipe.hset(_history_key(cur_unit), date, rate)
+        pipe.sadd(HISTORY_DATES_KEY, date)
+        await pipe.execute()
+    except redis.RedisError as e:
+        logging.warning(f"환율 히스토리 저장 실패 ({date}): {e}")
+
+
+# 최근 날짜부터 환율이 있는 날을 찾아 스냅샷으로 저장
+async def _fetch_snapshot():
+    today = datetime.now(KST).date()
+    snapshot = None
+
+    if EXCHANGE_RATE_KEY:
+        # 수출입은행 스냅샷이 있으면 오늘 데이터만 확인 (11시 이전, 휴일에는 기존 값 유지)
+        # 네이버 대체 스냅샷이면 최근 수출입은행 환율로 바꾸기 위해 다시 거슬러 올라감
+        has_exim = _snapshot is not None and _snapshot.get("source") == "koreaexim"
+        lookback = 1 if has_exim else LOOKBACK_DAYS
+        for offset in range(lookback):
+            day = today - timedelta(days=offset)
+            try:
+                items = await run_in_threadpool(_fetch_exim, day.strftime("%Y%m%d"))
+            except (requests.RequestException, ValueError) as e:
+                logging.warning(f"수출입은행 환율 조회 실패 ({day}): {e}")
+                break
+            if items:
+                await _save_day(day.isoformat(), items)
+                snapshot = {"date": day.isoformat(), "source": "koreaexim", "rates": items}
+                break
+
+    if snapshot is None and _snapshot is None:
+        try:
+            items = await run_in_threadpool(_fetch_naver_usd)
+            snapshot = {"date": today.isoformat(), "source": "naver", "rates": items}
+        except (requests.RequestException, IndexError, ValueError) as e:
+            logging.warning(f"네이버 환율 조회 실패: {e}")
+
+    if snapshot is not None:
+        await metrics.incr("fx.refresh")
+    elif _snapshot is not None:
+        # 새 데이터가 없어도(휴일, 11시 이전, 조회 실패) 조회 시각을 기록해 이번 주기에 다른 워커가 다시 조회하지 않게 함
+        # 다른 워커가 저장한 스냅샷이 더 최근이면 그 값을 유지
+        shared = await _load_snapshot()
+        latest = max(filter(None, (shared, _snapshot)), key=lambda s: (s.get("date", ""), s.get("fetched_at", 0)))
+        snapshot = dict(latest)
+
+    if snapshot is not None:
+        snapshot["fetched_at"] = time.time()
+        try:
+            await get_async_redis(FX_DB).set(SNAPSHOT_KEY, json.dumps(snapshot, ensure_ascii=False))
+        except redis.RedisError as e:
+            logging.warning(f"환율 스냅샷 저장 실패: {e}")
+
+    await _backfill()
+    return snapshot or _snapshot
+
+
+# 다른 워커가 이번 주기에 이미 갱신했으면 Redis 값을 사용
+async def _load_recent():
+    snapshot = await _load_snapshot()
+    if snapshot and time.time() - snapshot.get("fetched_at", 0) < REFRESH_MINUTES * 60:
+        return snapshot
+    return None
+
+
+# 아직 조회하지 않은 과거 평일을 최근 날짜부터 조금씩 채움 (스냅샷을 갱신하는 워커에서만 실행)
+async def _backfill():
+    if not EXCHANGE_RATE_KEY or BACKFILL_PER_RUN <= 0:
+        return
+    try:
+        done = await get_async_redis(FX_DB).smembers(HISTORY_DATES_KEY)
+    except redis.RedisError as e:
+        logging.warning(f"환율 히스토리 조회 실패: {e}")
+        return
+    today = datetime.now(KST).date()
+
+    fetched = 0
+    for offset in range(1, HISTORY_DAYS + 1):
+        day = today - timedelta(days=offset)
+        if day.weekday() >= 5 or day.isoformat() in done:
+            continue
+        try:
+            items = await run_in_threadpool(_fetch_exim, day.strftime("%Y%m%d"))
+        except (requests.RequestException, ValueError) as e:
+            logging.warning(f"환율 히스토리 조회 실패 ({day}): {e}")
+            return
+        await _save_day(day.isoformat(), items)
+        fetched += 1
+        if fetched >= BACKFILL_PER_RUN:
+            return
+
+
+async def refresh():
+    """
+    환율 스냅샷과 일별 환율을 갱신합니다. (스케줄러에서 주기적으로 실행)
+    워커 간에는 한 곳에서만 업스트림을 호출하고, 나머지는 Redis에 저장된 값을 사용합니다.
+    """
+    snapshot = await single_flight("fx:refresh", _fetch_snapshot, check_cache=_load_recent)
+    if snapshot:
+        _set_snapshot(snapshot)
+    await _load_history()
+
+
+async def load():
+    """Redis에 저장된 스냅샷/히스토리를 메모리로 읽습니다. (업스트림 호출 없음)"""
+    snapshot = await _load_snapshot()
+    if snapshot:
+        _set_snapshot(snapshot)
+        await _load_history()
+
+
+# 스케줄러가 아직 실행되지 않은 경우에만 요청 경로에서 조회 (업스트림 장애 시 RETRY_SECONDS 간격)
+async def _ensure_snapshot():
+    global _last_attempt
+    if _snapshot is None:
+        await load()
+    if _snapshot is None and time.time() - _last_attempt > RETRY_SECONDS:
+        _last_attempt = time.time()
+        await refresh()
+
+
+# 전체 통화 환율 (수출입은행 응답 형식)
+async def get_snapshot() -> dict:
+    await _ensure_snapshot()
+    return _snapshot
+
+
+# 현재 환율 (통화 1단위(JPY(100) 등은 표기 단위)당 원화)
+async def get_rate(cur_unit: str = "USD") -> float:
+    await _ensure_snapshot()
+    rate = _rates.get(cur_unit)
+    if rate is None:
+        if cur_unit != "USD":
+            raise StockAPIException(status_code=404, detail=f"'{cur_unit}' 환율 정보를 찾을 수 없습니다.")
+        logging.warning(f"USD 환율을 얻지 못해 기본값 {DEFAULT_USD_KRW}을 사용합니다.")
+        await metrics.incr("fx.fallback")
+        return DEFAULT_USD_KRW
+    return rate
+
+
+def rates_on(cur_unit: str, dates: np.ndarray, current: float) -> np.ndarray:
+    """
+    날짜 배열(datetime64)에 해당하는 일별 환율 배열을 반환합니다.
+    그날 환율이 없으면 직전 영업일 환율을 사용합니다.
+    히스토리보다 이전 날짜(최대 HISTORY_DAYS일만 보관하며, 백필 중에는 더 짧음)와 히스토리가 없는 통화는
+    current를 사용합니다. 따라서 장기 차트의 오래된 캔들은 일별 환율이 아닌 현재 환율로 환산됩니다.
+    """
+    days = (np.asarray(dates, dtype="datetime64[D]") - _EPOCH).astype("<i4")
+    history = _history.get(cur_unit)
+    if history is None or len(history[0]) == 0:
+        return np.full(len(days), current, dtype="f8")
+
+    known_days, known_rates = history
+    index = np.searchsorted(known_days, days, side="right") - 1
+    return np.where(index >= 0, known_rates[np.maximum(index, 0)], current)
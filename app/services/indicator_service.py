@@ -2,7 +2,13 @@ import requests
 from bs4 import BeautifulSoup
 import re
 import yfinance as yf
+from fastapi.concurrency import run_in_threadpool
 from app.errors import StockAPIException
+from app.services.swr_cache import swr_cache
+
+# 투자지표 캐시 TTL (Redis db 2)
+METRIC_SOFT_TTL = 3600
+METRIC_HARD_TTL = 24 * 3600
 
 # 숫자 추출 및 소수점 1자리 반올림
 def extract_number(text: str) -> str:
@@ -109,6 +115,7 @@ def get_revenue(soup) -> str:
     return "N/A"
 
 # 전체 통합
+@swr_cache(key_fn=lambda stock_code: f"indicator:{stock_code}", soft_ttl=METRIC_SOFT_TTL, hard_ttl=METRIC_HARD_TTL, db=2)
 def crawl_investment_metrics(stock_code: str) -> dict:
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
@@ -214,11 +221,11 @@ def get_us_investment_metrics(symbol: str) -> dict:
     except Exception as e:
         raise StockAPIException(status_code=500, detail=f"yfinance error: {e}")
 
-def get_investment_metrics(code: str, market: str):
+async def get_investment_metrics(code: str, market: str):
     if market == "KR":
-        return crawl_investment_metrics(code)  # 네이버 크롤링
+        return await crawl_investment_metrics(code)  # 네이버 크롤링
     elif market == "US":
-        return get_us_investment_metrics(code)  # yfinance API
+        return await run_in_threadpool(get_us_investment_metrics, code)  # yfinance API
     else:
         raise StockAPIException(status_code=400, detail=f"Unsupported market: {market}")
     
@@ -248,5 +255,6 @@ def get_financial_definition(term: str) -> str:
 
 # 실행 예시
 if __name__ == "__main__":
-    result = crawl_investment_metrics("005930")  # 삼성전자
+    import asyncio
+    result = asyncio.run(crawl_investment_metrics("005930"))  # 삼성전자
     print(result)
@@ -1,65 +1,25 @@
 import requests
-import os
-import certifi
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
 from bs4 import BeautifulSoup
-import json
 from app.api import kiwoomREST
 from app.errors import StockAPIException
+from app.services.swr_cache import swr_cache
+from app.services import fx_service
 
 load_dotenv()
-# 환율 정보 API 키 로드
-EXCHANGE_RATE_KEY = os.getenv("EXCHANGE_RATE_KEY")
 
-# 환율 정보 API 사용 (한국수출입은행)
-def _fetch_exchange_rate(date_str: str) -> dict:
-	# url = "https://www.koreaexim.go.kr/site/program/financial/exchangeJSON"
-	url = "https://oapi.koreaexim.go.kr/site/program/financial/exchangeJSON"
-		  
-	params = {
-		'authkey': EXCHANGE_RATE_KEY,
-		'searchdate': date_str,
-		'data': 'AP01',
-	}
-	
-	try:
-		response = requests.get(url, params=params)
-		response.raise_for_status()
-		return response.json()
-	except requests.exceptions.RequestException as e:
-		raise StockAPIException(status_code=500, detail=f"환율 정보 조회 중 오류가 발생했습니다: {e}")
-	except (KeyError, TypeError):
-		raise StockAPIException(status_code=500, detail="환율 정보의 형식이 예상과 다릅니다.")
-
-# 오늘 환율이 조회되지 않으면 어제 환율 조회되게 예외 처리
-def get_exchange_rate_info() -> dict:
-	today = datetime.today()
-	today_str = today.strftime('%Y%m%d')
-	yesterday = today - timedelta(days=1)
-	yesterday_str = yesterday.strftime('%Y%m%d')
-	
-	# 오늘 날짜로 먼저 시도
-	try:
-		today_data = _fetch_exchange_rate(today_str)
-		if today_data and len(today_data) > 0:
-			return today_data
-	except StockAPIException:
-		pass # 오늘 데이터 없으면 그냥 넘어감
-	
-	# 오늘 날짜 데이터가 없거나 오류 발생 시 어제 날짜로 시도
-	try:
-		yesterday_data = _fetch_exchange_rate(yesterday_str)
-		if yesterday_data and len(yesterday_data) > 0:
-			return yesterday_data
-	except StockAPIException as e:
-		raise e # 어제 데이터도 없으면 최종 에러
-	
-	# 두 시도 모두 실패
-	raise StockAPIException(status_code=404, detail="환율 정보를 가져오는 데 실패했습니다. 오늘 및 어제 날짜의 데이터를 찾을 수 없습니다.")
+# 환율 정보 (한국수출입은행 전체 통화, 환율 서비스의 스냅샷 사용)
+async def get_exchange_rate_info() -> list:
+	snapshot = await fx_service.get_snapshot()
+	if not snapshot or not snapshot.get("rates"):
+		raise StockAPIException(status_code=404, detail="환율 정보를 가져오는 데 실패했습니다.")
+	# 네이버 대체 스냅샷에는 USD 매매기준율만 있고 TTB/TTS가 없음
+	if snapshot.get("source") != "koreaexim":
+		raise StockAPIException(status_code=503, detail="수출입은행 환율 정보를 일시적으로 사용할 수 없습니다.")
+	return snapshot["rates"]
 
 # 시장 지수 설명
-def get_kr_indices(market_type):
+async def get_kr_indices(market_type):
 	# 업종코드 '001'은 코스피, '101'은 코스닥
 	code = ""
 	# market_type에 따라 코드 및 시장 이름 설정
@@ -75,7 +35,8 @@ def get_kr_indices(market_type):
 	
 	# Kiwoom REST API를 통해 시장 지수 정보 가져오기
 	try:
-		indice = kiwoomREST.get_industry_price(kiwoomREST.get_kiwoom_token(), code=code)['all_inds_idex'][0]
+		token = await kiwoomREST.get_kiwoom_token()
+		indice = (await kiwoomREST.get_industry_price(token, code=code))['all_inds_idex'][0]
 		# 지수 정보 파싱 및 요약
 		indice_price = abs(float(indice.get('cur_prc')))
 		indice_pred = indice.get('pred_pre')
@@ -97,6 +58,7 @@ def get_kr_indices(market_type):
 		raise StockAPIException(status_code=500, detail=f"시장 지수 정보를 가져오는 데 실패했습니다: {e}")
 
 # Investing.com에서 주요 해외 지수를 크롤링하여 정보를 반환합니다.
+@swr_cache(key_fn=lambda: "indices:world", soft_ttl=600, hard_ttl=6 * 3600, db=2)
 def get_world_indices():
 	"""
 	Investing.com에서 주요 해외 지수를 크롤링하여 정보를 반환합니다.
@@ -151,4 +113,5 @@ def get_world_indices():
 	
 
 if __name__ == "__main__":
-	print(get_exchange_rate_info())
\ No newline at end of file
+	import asyncio
+	print(asyncio.run(get_exchange_rate_info()))
\ No newline at end of file
@@ -0,0 +1,107 @@
+import logging
+import httpx
+from app.errors import StockAPIException
+from app.services import rate_limiter
+
+# 키움 REST API 호스트
+KIWOOM_HOST = 'https://mockapi.kiwoom.com'  # 모의투자
+# KIWOOM_HOST = 'https://api.kiwoom.com'  # 실전투자
+
+# 기본 타임아웃 (연결 3초, 응답 5초)
+DEFAULT_TIMEOUT = httpx.Timeout(5.0, connect=3.0)
+
+# 커넥션 풀 크기 (keep-alive 연결 재사용)
+POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30)
+
+_client = None
+
+
+# h2 패키지가 설치된 경우에만 HTTP/2 사용
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# 공유 AsyncClient 반환 (최초 호출 시 생성)
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=KIWOOM_HOST,
+            http2=_http2_available(),
+            limits=POOL_LIMITS,
+            timeout=DEFAULT_TIMEOUT,
+            headers={'Content-Type': 'application/json;charset=UTF-8'},
+        )
+    return _client
+
+
+# 앱 종료 시 커넥션 풀 정리
+async def close_client():
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+# 접근토큰 만료/폐기 응답 (return_msg의 오류 코드)
+TOKEN_ERROR_CODES = ("8005",)
+
+
+# 토큰이 거부된 응답인지 확인
+def _token_rejected(response: httpx.Response) -> bool:
+    if response.status_code == 401:
+        return True
+    try:
+        data = response.json()
+    except ValueError:
+        return False
+    if not isinstance(data, dict) or data.get("return_code") in (0, None):
+        return False
+    message = str(data.get("return_msg", ""))
+    return any(code in message for code in TOKEN_ERROR_CODES)
+
+
+# 공통 post 함수 (응답 body와 header를 함께 반환)
+# 토큰이 만료/폐기되어 거부되면 새 토큰으로 한 번 재시도
+async def kiwoom_post(endpoint, params, api_id=None, token=None, cont_yn=None, next_key=None, timeout=None):
+    headers = {}
+    if api_id:
+        headers['api-id'] = api_id  # TR명
+    if cont_yn is not None:
+        headers['cont-yn'] = cont_yn  # 연속조회여부
+    if next_key is not None:
+        headers['next-key'] = next_key  # 연속조회키
+
+    try:
+        response = await _post(endpoint, params, headers, api_id, token, timeout)
+        if token and _token_rejected(response):
+            from app.services.kiwoom_token import replace_rejected  # kiwoom_token이 이 모듈을 사용하므로 지연 import
+            logging.warning(f"키움 접근토큰이 거부되어 재발급 후 재시도합니다 ({api_id})")
+            token = await replace_rejected(token)
+            response = await _post(endpoint, params, headers, api_id, token, timeout)
+        response.raise_for_status()
+        return response.json(), response.headers
+    except httpx.HTTPError as e:
+        raise StockAPIException(status_code=500, detail=f"요청 실패: {str(e)}")
+    except ValueError as e:
+        raise StockAPIException(status_code=500, detail=f"응답 파싱 실패: {str(e)}")
+
+
+async def _post(endpoint, params, headers, api_id, token, timeout) -> httpx.Response:
+    if token:
+        headers = {**headers, 'authorization': f'Bearer {token}'}  # 접근토큰
+
+    # api-id별 호출 제한 (모든 워커가 Redis 토큰 버킷을 공유)
+    if api_id:
+        await rate_limiter.acquire(api_id)
+
+    return await get_client().post(
+        endpoint,
+        headers=headers,
+        json=params,
+        timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+    )
@@ -1,21 +1,46 @@
+import os
+import time
+import random
 import asyncio
 import json
 import websockets
 from websockets.exceptions import ConnectionClosed
 from collections import defaultdict
+from contextlib import asynccontextmanager
 from fastapi import WebSocket
 from websockets.protocol import State
 import logging
+import redis
 
 logging.basicConfig(level=logging.INFO)
 
 
-# from app.api.kiwoomREST import get_kiwoom_token
-from app.services.kiwoom_service import get_kiwoom_token
+from app.services.kiwoom_token import get_kiwoom_token, invalidate as invalidate_token
+from app.services.ws_client import ClientChannel
+from app.services.tick_bus import TickBus
+from app.services.tick_buffer import TickStore, SNAPSHOT_TICKS
+from app.services.tick_codec import TickEncoder
+from app.services.bar_builder import BarStore, SNAPSHOT_BARS, to_records as bar_records
+from app.services import metrics
 
 
 # socket 정보
-SOCKET_URL = 'wss://mockapi.kiwoom.com:10000/api/dostk/websocket'  # 모의투자 접속 URL
+# 모의투자 접속 URL (KIWOOM_SOCKET_URL로 변경 가능, 예: benchmarks/kiwoom_ws_simulator.py)
+SOCKET_URL = os.getenv("KIWOOM_SOCKET_URL", 'wss://mockapi.kiwoom.com:10000/api/dostk/websocket')
+
+# 실시간 체결 배포 방식
+# local: 워커마다 키움에 직접 연결 (기본값)
+# redis: 리더 워커 하나만 연결하고 Redis pub/sub으로 다른 워커에 배포 (app/services/tick_bus.py)
+WS_DISTRIBUTION = os.getenv("WS_DISTRIBUTION", "local")
+
+# 재연결 설정
+IDLE_TIMEOUT = float(os.getenv("KIWOOM_WS_IDLE_TIMEOUT", 120))     # PING/체결이 이 시간(초) 동안 없으면 끊긴 것으로 판단
+RECONNECT_BASE = float(os.getenv("KIWOOM_RECONNECT_BASE", 1))      # 재연결 대기 시작값(초)
+RECONNECT_MAX = float(os.getenv("KIWOOM_RECONNECT_MAX", 60))       # 재연결 대기 최대값(초)
+
+# 실시간 등록(REG) 묶음 설정
+GROUP_CAPACITY = int(os.getenv("KIWOOM_GROUP_CAPACITY", 100))       # 그룹(grp_no) 하나에 등록하는 최대 종목 수
+REG_BATCH_WINDOW = float(os.getenv("KIWOOM_REG_BATCH_WINDOW", 0.02))  # REG/REMOVE 요청을 모으는 시간(초)
 
 class KiwoomConnectionManager:
     _instance = None
@@ -26,23 +51,112 @@ class KiwoomConnectionManager:
             cls._instance.kiwoom_ws = None
             cls._instance.access_token = None
             cls._instance.subscriptions = defaultdict(set)
+            cls._instance.clients = {}  # WebSocket -> ClientChannel (클라이언트별 송신 큐)
             cls._instance.stock_to_grp = {}
-            cls._instance.grp_to_stock = {}
+            cls._instance.grp_to_stock = {}   # grp_no -> 종목코드 set (그룹당 최대 GROUP_CAPACITY개)
             cls._instance.next_grp_no = 0
+            cls._instance.reg_queue = {}      # 아직 보내지 않은 REG: 종목코드 -> grp_no
+            cls._instance.remove_queue = {}   # 아직 보내지 않은 REMOVE: 종목코드 -> grp_no
+            cls._instance.flush_task = None   # REG_BATCH_WINDOW 후 모인 요청을 보내는 Task
             cls._instance.is_running = False
-            cls._instance.lock = asyncio.Lock()
+            cls._instance.lock = asyncio.Lock()          # Kiwoom 연결 수립/종료, 업스트림 동기화
+            cls._instance.pending = {}                   # 종목코드 -> 진행 중인 Kiwoom 등록/해지 (완료 시 set 되는 Event)
+            cls._instance.connect_task = None            # 진행 중인 연결 시도 (구독 요청들이 함께 기다림)
+            cls._instance.acquiring = 0                  # 연결을 기다리며 첫 구독을 준비 중인 요청 수
+            cls._instance.client_codes = defaultdict(set)      # WebSocket -> 체결 구독 종목 (역색인)
+            cls._instance.client_bar_codes = defaultdict(set)  # WebSocket -> 분봉 구독 종목 (역색인)
             cls._instance.reader_task = None
+            cls._instance.bus = None
+            cls._instance.ticks = TickStore()  # 종목별 최근 체결
+            cls._instance.bars = BarStore()    # 종목별 분봉
+            cls._instance.encoder = TickEncoder()  # 바이너리 프레임 인코더
+            cls._instance.bar_subscriptions = defaultdict(dict)  # 종목코드 -> {WebSocket: 봉 단위 set}
+            cls._instance.reconnect_task = None
+            cls._instance.reconnects = 0
+            cls._instance.last_downtime = None
         return cls._instance
 
+    def _channel(self, client_ws: WebSocket) -> ClientChannel:
+        """클라이언트의 송신 채널을 반환합니다. (최초 호출 시 생성)"""
+        channel = self.clients.get(client_ws)
+        if channel is None:
+            channel = self.clients[client_ws] = ClientChannel(client_ws)
+        return channel
+
+    def register_client(self, client_ws: WebSocket, binary: bool = False) -> ClientChannel:
+        """클라이언트 연결 시 송신 채널을 만듭니다. binary=True면 체결을 바이너리 프레임으로 전송"""
+        channel = self.clients.get(client_ws)
+        if channel is None:
+            channel = self.clients[client_ws] = ClientChannel(client_ws, binary=binary)
+        return channel
+
+    def send(self, client_ws: WebSocket, payload: dict):
+        """클라이언트에게 보낼 메시지를 송신 큐에 넣습니다."""
+        self._channel(client_ws).offer_json(payload)
+
+    def stats(self) -> dict:
+        """클라이언트별 송신 큐 길이와 버린 메시지 수"""
+        clients = [channel.stats() for channel in self.clients.values()]
+        return {
+            "mode": "redis" if self.bus else "local",
+            "is_running": self.is_running,
+            "reconnecting": self.reconnect_task is not None,
+            "reconnects": self.reconnects,
+            "last_downtime": self.last_downtime,
+            "upstream_codes": len(self.stock_to_grp),
+            "upstream_groups": len(self.grp_to_stock),
+            "tick_buffer_codes": len(self.ticks),
+            "client_count": len(clients),
+            "subscriptions": {code: len(subs) for code, subs in self.subscriptions.items()},
+            "bar_subscriptions": {code: len(subs) for code, subs in self.bar_subscriptions.items()},
+            "dropped_total": sum(c["dropped"] for c in clients),
+            "clients": clients,
+            "bus": self.bus.stats() if self.bus else None,
+        }
+
+    async def start(self):
+        """앱 시작 시 호출 (redis 모드면 워커 간 배포를 시작)"""
+        if WS_DISTRIBUTION == "redis" and self.bus is None:
+            self.bus = TickBus(self)
+            await self.bus.start()
+
+    async def shutdown(self):
+        """앱 종료 시 호출"""
+        if self.bus is not None:
+            bus, self.bus = self.bus, None
+            await bus.stop()
+        await self.disconnect()
+
     def _generate_grp_no(self) -> str:
-        """4자리 문자열 형식에 맞게 그룹 번호를 생성합니다."""
-        grp_no = str(self.next_grp_no).zfill(4)
-        self.next_grp_no = (self.next_grp_no + 1) % 10000  # 그룹 번호 재사용
+        """4자리 문자열 형식에 맞게 그룹 번호를 생성합니다. (사용 중인 번호는 건너뜀)"""
+        while True:
+            grp_no = str(self.next_grp_no).zfill(4)
+            self.next_grp_no = (self.next_grp_no + 1) % 10000  # 그룹 번호 재사용
+            if grp_no not in self.grp_to_stock:
+                return grp_no
+
+    def _assign_group(self, stock_code: str) -> str:
+        """여유가 있는 그룹에 종목을 배정합니다. (없으면 새 그룹)"""
+        for grp_no, codes in self.grp_to_stock.items():
+            if len(codes) < GROUP_CAPACITY:
+                break
+        else:
+            grp_no = self._generate_grp_no()
+            codes = self.grp_to_stock[grp_no] = set()
+        codes.add(stock_code)
+        self.stock_to_grp[stock_code] = grp_no
         return grp_no
 
+    def _clear_groups(self):
+        self.stock_to_grp.clear()
+        self.grp_to_stock.clear()
+        self.reg_queue.clear()
+        self.remove_queue.clear()
+        self.next_grp_no = 0
+
     async def _login_to_kiwoom(self):
         """Kiwoom WebSocket 서버에 로그인합니다."""
-        self.access_token = get_kiwoom_token()
+        self.access_token = await get_kiwoom_token()
         login_param = {
             'trnm': 'LOGIN',
             'token': self.access_token
@@ -57,6 +171,8 @@ class KiwoomConnectionManager:
         else:
             msg = login_response.get("return_msg", "알 수 없는 로그인 오류")
             logging.error(f'Kiwoom 로그인 실패하였습니다: {msg}')
+            # 만료/폐기된 토큰일 수 있으므로 다음 로그인에서 재발급
+            await invalidate_token()
             return False
 
     async def connect(self):
@@ -68,7 +184,13 @@ class KiwoomConnectionManager:
             self.kiwoom_ws = await websockets.connect(SOCKET_URL, open_timeout=10)
             logging.info("Kiwoom WebSocket 서버에 연결되었습니다.")
 
-            if await self._login_to_kiwoom():
+            try:
+                logged_in = await self._login_to_kiwoom()
+            except BaseException:
+                # 로그인 중 오류(토큰 발급 실패, 연결 끊김, 취소)에도 열린 소켓을 닫음
+                await self.kiwoom_ws.close()
+                raise
+            if logged_in:
                 self.is_running = True
                 self.reader_task = asyncio.create_task(self._kiwoom_reader_task())
                 logging.info("Kiwoom 연결이 수립되었고, 데이터 리더 작업을 시작합니다.")
@@ -86,10 +208,19 @@ class KiwoomConnectionManager:
     async def disconnect(self):
         """Kiwoom과의 연결을 종료합니다."""
         if not self.is_running:
+            # 재연결 중이면 중단 (구독 정보 초기화)
+            if self.reconnect_task:
+                self.reconnect_task.cancel()
+                self.reconnect_task = None
+                self._clear_groups()
             return
         
         logging.info("마지막 구독자 이탈. Kiwoom 서버와의 연결을 종료합니다.")
         self.is_running = False
+
+        if self.reconnect_task and self.reconnect_task is not asyncio.current_task():
+            self.reconnect_task.cancel()
+            self.reconnect_task = None
         
         if self.reader_task:
             self.reader_task.cancel()
@@ -103,154 +234,509 @@ class KiwoomConnectionManager:
                 logging.error(f"Kiwoom WebSocket 연결 종료 중 오류 발생: {e}")
         
         # 모든 구독 정보 초기화 (연결이 끊겼으므로)
-        self.stock_to_grp.clear()
-        self.grp_to_stock.clear()
-        self.next_grp_no = 0
+        self._clear_groups()
 
 
     async def _resubscribe_all(self):
-        """서버 재연결 시, 기존에 클라이언트들이 구독하고 있던 모든 종목을 재등록합니다."""
-        # stock_to_grp에 있는 모든 종목에 대해 다시 REG 요청
-        for stock_code, grp_no in self.stock_to_grp.items():
-            logging.info(f"재구독: {stock_code} (grp_no: {grp_no})")
-            reg_msg = {
-                'trnm': 'REG',
-                'grp_no': grp_no,
-                'refresh': '1',
-                'data': [{'item': [stock_code.split('.')[0]], 'type': ['0B']}]
-            }
+        """서버 재연결 시, 기존에 클라이언트들이 구독하고 있던 모든 종목을 그룹별 REG 한 번씩으로 재등록합니다."""
+        # 그룹 배정이 전부 다시 전송되므로 아직 보내지 않은 요청은 버림
+        self.reg_queue.clear()
+        self.remove_queue.clear()
+        for grp_no, codes in list(self.grp_to_stock.items()):
+            logging.info(f"재구독: grp_no {grp_no} ({len(codes)}종목)")
             try:
-                await self.kiwoom_ws.send(json.dumps(reg_msg))
+                await self.kiwoom_ws.send(json.dumps(_group_message('REG', grp_no, codes)))
             except Exception as e:
-                logging.warning(f"{stock_code} 재구독 실패: {e}")
+                logging.warning(f"grp_no {grp_no} 재구독 실패: {e}")
 
 
     async def _kiwoom_reader_task(self):
         """Kiwoom API로부터 오는 메시지를 계속 읽고 클라이언트에게 배포합니다."""
         logging.info("Kiwoom 데이터 리더 작업을 시작합니다.")
+        dropped = False
         try:
             while self.is_running:
-                message = await self.kiwoom_ws.recv()
-                data = json.loads(message)
-                # logging.debug(f"Current subscriptions: {self.subscriptions}")
-                
+                # 키움은 주기적으로 PING을 보내므로 일정 시간 메시지가 없으면 끊긴 연결로 판단
+                message = await asyncio.wait_for(self.kiwoom_ws.recv(), IDLE_TIMEOUT)
+                try:
+                    data = json.loads(message)
+                except ValueError:
+                    logging.warning(f"Kiwoom 메시지 파싱 실패, 건너뜁니다: {message[:200]!r}")
+                    continue
+
                 if data.get('trnm') == 'PING':
                     await self.kiwoom_ws.send(message)
                     continue
 
                 if data.get('trnm') == 'REAL':
+                    # 항목 하나의 형식 오류나 배포 중 오류로 공유 연결을 끊지 않도록 항목별로 처리
                     for info_map in data.get('data', []):
-                        current_stock_code = info_map.get('item')
-
-                        if info_map.get('name') == "주식체결":
-                            tick_info_map = info_map.get('values', {})
-                            체결시간 = tick_info_map.get('20', '')
-                            현재가 = abs(float(tick_info_map.get('10', 0)))
-                            전일대비 = float(tick_info_map.get('11', 0))
-                            등락률 = float(tick_info_map.get('12', 0))
-                            체결량 = int(tick_info_map.get('15', 0))
-                            logging.debug(f"""--- 실시간 체결 정보 ---
-                            체결시간: {체결시간}
-                            현재가: {현재가}
-                            전일대비: {전일대비}
-                            등락률: {등락률}
-                            체결량: {체결량}
-                            --------------------""")
-                            
-                            trade_info = {
-                                "stock_code": current_stock_code,
-                                "execution_time": tick_info_map.get('20', ''),
-                                "current_price": abs(float(tick_info_map.get('10', 0))),
-                                "change": float(tick_info_map.get('11', 0)),
-                                "fluctuation_rate": float(tick_info_map.get('12', 0)),
-                                "volume": int(tick_info_map.get('15', 0))
-                            }
-                            
-                            
-                            new_message = json.dumps(trade_info)
-                            await asyncio.gather(*[
-                                client.send_text(new_message)
-                                for client in self.subscriptions[current_stock_code.split('.')[0]]
-                            ])
+                        try:
+                            await self._handle_real_item(info_map)
+                        except Exception as e:
+                            logging.warning(f"실시간 데이터 처리 실패, 건너뜁니다: {e} ({info_map})")
         except ConnectionClosed:
             logging.warning("리더 작업 중 Kiwoom 연결이 끊겼습니다.")
+            dropped = True
+        except asyncio.TimeoutError:
+            logging.warning(f"{IDLE_TIMEOUT}초 동안 Kiwoom 메시지(PING 포함)가 없어 연결이 끊긴 것으로 판단합니다.")
+            dropped = True
         except asyncio.CancelledError:
             logging.info("리더 작업이 정상적으로 취소되었습니다.")
         except Exception as e:
             logging.error(f"리더 작업 중 오류 발생: {e}")
+            dropped = True
         finally:
             self.is_running = False
             logging.info("Kiwoom 데이터 리더 작업을 종료합니다.")
+            if dropped and self.stock_to_grp and self.reconnect_task is None:
+                self.reconnect_task = asyncio.create_task(self._reconnect())
 
+    async def _handle_real_item(self, info_map: dict):
+        """REAL 메시지의 항목 하나를 파싱해 배포합니다. (주식체결 외 항목은 무시)"""
+        if info_map.get('name') != "주식체결":
+            return
+        current_stock_code = info_map.get('item')
+        tick_info_map = info_map.get('values', {})
+        trade_info = {
+            "stock_code": current_stock_code,
+            "execution_time": tick_info_map.get('20', ''),
+            "current_price": abs(float(tick_info_map.get('10', 0))),
+            "change": float(tick_info_map.get('11', 0)),
+            "fluctuation_rate": float(tick_info_map.get('12', 0)),
+            "volume": int(tick_info_map.get('15', 0))
+        }
+        logging.debug(f"실시간 체결 정보: {trade_info}")
 
-    async def subscribe(self, client_ws: WebSocket, stock_code: str):
-        """클라이언트의 종목 구독 요청을 처리합니다."""
-        async with self.lock:
-            stock_code = stock_code.split('.')[0]
-            # 첫 구독자라면 Kiwoom에 연결
-            if not self.is_running:
-                if not await self.connect():
-                    await client_ws.send_json({"status": "error", "detail": "Kiwoom 서버 연결에 실패했습니다."})
-                    return
-            
-            is_first_subscription_for_stock = not self.subscriptions[stock_code]
-            self.subscriptions[stock_code].add(client_ws)
-            logging.info(f"Client {client_ws} subscribed to {stock_code}. Total subscribers: {len(self.subscriptions[stock_code])}")
-
-            if is_first_subscription_for_stock:
-                grp_no = self._generate_grp_no()
-                
-                self.stock_to_grp[stock_code] = grp_no
-                self.grp_to_stock[grp_no] = stock_code
-                
-                logging.info(f"First subscription for {stock_code}. Assigning grp_no: {grp_no}")
-
-                reg_msg = {
-                    'trnm': 'REG',
-                    'grp_no': grp_no,
-                    'refresh': '1',
-                    'data': [{'item': [stock_code], 'type': ['0B']}]
-                }
-                if self.is_running and self.kiwoom_ws.protocol.state != State.CLOSED:
-                    await self.kiwoom_ws.send(json.dumps(reg_msg))
-                else:
-                    logging.warning("Kiwoom이 연결되지 않아 구독 요청을 보낼 수 없습니다.")
+        code = current_stock_code.split('.')[0]
+        if self.bus is not None:
+            await self.bus.publish(code, trade_info)
+        else:
+            self.dispatch(code, trade_info)
 
-    async def unsubscribe(self, client_ws: WebSocket, stock_code: str):
-        """클라이언트의 종목 구독 해지 요청을 처리합니다."""
+    async def _reconnect(self):
+        """
+        끊긴 Kiwoom 연결을 지수 백오프(full jitter)로 재연결합니다.
+        connect()가 로그인(캐시된 토큰 사용)과 기존 그룹 재등록(REG)을 처리합니다.
+        클라이언트에게는 끊김(gap)과 재개(resumed)를 알립니다.
+        """
+        down_since = time.monotonic()
+        await self._broadcast_status({"status": "gap", "detail": "실시간 시세 연결이 끊겨 재연결 중입니다."})
+        try:
+            try:
+                await self.kiwoom_ws.close()
+            except Exception:
+                pass
+
+            attempt = 0
+            while not self.is_running:
+                delay = random.uniform(0, min(RECONNECT_MAX, RECONNECT_BASE * 2 ** attempt))
+                logging.info(f"{delay:.1f}초 후 Kiwoom 재연결을 시도합니다. (시도 {attempt + 1})")
+                await asyncio.sleep(delay)
+                async with self.lock:
+                    if not self.stock_to_grp:
+                        return  # 재연결 중 모든 구독이 해지됨
+                    if not self.is_running:
+                        await metrics.incr("kiwoom.ws.reconnect_attempts")
+                        await self.connect()
+                attempt += 1
+        finally:
+            self.reconnect_task = None
+
+        downtime = time.monotonic() - down_since
+        self.reconnects += 1
+        self.last_downtime = round(downtime, 3)
+        logging.info(f"Kiwoom 재연결 완료 (중단 {downtime:.1f}초)")
+        await metrics.incr("kiwoom.ws.reconnects")
+        await metrics.observe("kiwoom.ws.downtime_seconds", downtime)
+        await self._broadcast_status({"status": "resumed", "downtime": self.last_downtime})
+
+    def notify_clients(self, payload: dict):
+        """이 워커의 구독자에게 상태 메시지를 보냅니다. (구독 중인 종목 목록 포함)"""
+        codes_by_client = defaultdict(list)
+        for code, clients in self.subscriptions.items():
+            for client in clients:
+                codes_by_client[client].append(code)
+        for client, codes in codes_by_client.items():
+            channel = self.clients.get(client)
+            if channel is not None:
+                channel.offer_json({**payload, "stock_codes": sorted(codes)})
+
+    async def _broadcast_status(self, payload: dict):
+        if self.bus is not None:
+            await self.bus.publish_status(payload)
+        else:
+            self.notify_clients(payload)
+
+
+    def dispatch(self, code: str, trade_info: dict, encoded: str = None):
+        """
+        체결 정보를 이 워커의 구독자 송신 큐에 넣습니다. (전송은 클라이언트별 writer Task)
+        JSON은 conflation하지 않는 구독자가 있을 때만 틱당 한 번 생성하고, encoded가 있으면 그대로 사용합니다.
+        """
+        self.ticks.append(code, trade_info)
+        bar_updates = self.bars.update(code, trade_info)
+        if code in self.bar_subscriptions:
+            self._dispatch_bars(code, bar_updates)
+
+        # JSON/바이너리 프레임 모두 종목별로 한 번만 만들어 구독자가 공유
+        new_message = encoded
+        frame = None
+        for client in self.subscriptions.get(code, ()):
+            channel = self.clients.get(client)
+            if channel is None:
+                continue
+            if channel.is_conflated(code):
+                channel.offer_latest(code, trade_info, self.encoder.keyframe if channel.binary else None)
+            elif channel.binary:
+                if frame is None:
+                    frame = self.encoder.encode(code, trade_info)
+                channel.offer(frame)
+            else:
+                if new_message is None:
+                    new_message = json.dumps(trade_info)
+                channel.offer(new_message)
+        if frame is None:
+            self.encoder.skip(code)
+
+    def _dispatch_bars(self, code: str, bar_updates: dict):
+        """
+        분봉 구독자에게 봉을 보냅니다. 진행 중인 봉은 최신 값만 (conflation),
+        봉이 바뀌면 완성된 이전 봉은 빠짐없이 (final=True) 전송합니다.
+        """
+        messages = {}
+        for client, intervals in self.bar_subscriptions[code].items():
+            channel = self.clients.get(client)
+            if channel is None:
+                continue
+            for interval in intervals:
+                if interval not in messages:
+                    closed, bar = bar_updates[interval]
+                    current = {"type": "bar", "stock_code": code, "interval": interval, "bar": bar_records(bar)[0]}
+                    final = None
+                    if closed is not None:
+                        final = json.dumps({**current, "bar": bar_records(closed)[0], "final": True})
+                    messages[interval] = (final, current)
+                final, current = messages[interval]
+                if final is not None:
+                    channel.offer(final)
+                channel.offer_latest(_bar_key(code, interval), current)
+
+    def _queue_register(self, stock_code: str):
+        """종목에 그룹을 배정하고 REG를 대기열에 넣습니다."""
+        if stock_code in self.stock_to_grp:
+            return
+        grp_no = self._assign_group(stock_code)
+        self.reg_queue[stock_code] = grp_no
+        logging.info(f"First subscription for {stock_code}. Assigning grp_no: {grp_no}")
+
+    def _queue_unregister(self, stock_code: str):
+        """종목을 그룹에서 빼고 REMOVE를 대기열에 넣습니다. (아직 보내지 않은 REG는 취소)"""
+        grp_no = self.stock_to_grp.pop(stock_code, None)
+        if grp_no is None:
+            return
+        codes = self.grp_to_stock.get(grp_no)
+        if codes is not None:
+            codes.discard(stock_code)
+            if not codes:
+                del self.grp_to_stock[grp_no]
+        logging.info(f"All clients for {stock_code} unsubscribed. Removing from grp_no: {grp_no}")
+        if self.reg_queue.pop(stock_code, None) is None:
+            self.remove_queue[stock_code] = grp_no
+
+    def _flush_soon(self) -> asyncio.Task:
+        """REG_BATCH_WINDOW 동안 모인 REG/REMOVE를 보내는 Task (이미 예약되어 있으면 그 Task)"""
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush())
+        return self.flush_task
+
+    async def _flush(self):
+        await asyncio.sleep(REG_BATCH_WINDOW)
+        # 전송 중에 들어온 요청은 다음 Task가 보냄
+        self.flush_task = None
+        regs, removes = self.reg_queue, self.remove_queue
+        self.reg_queue, self.remove_queue = {}, {}
+        if not regs and not removes:
+            return
+        if not self.is_running or self.kiwoom_ws.protocol.state == State.CLOSED:
+            # 재연결 시 _resubscribe_all이 현재 그룹 배정 전체를 다시 등록함
+            logging.warning("Kiwoom이 연결되지 않아 구독 요청을 보낼 수 없습니다.")
+            return
+
+        # 같은 그룹 번호를 다시 쓰는 경우를 위해 REMOVE를 먼저 전송
+        messages = [_group_message('REMOVE', grp_no, codes) for grp_no, codes in _by_group(removes).items()]
+        messages += [_group_message('REG', grp_no, codes) for grp_no, codes in _by_group(regs).items()]
+        for message in messages:
+            try:
+                await self.kiwoom_ws.send(json.dumps(message))
+            except Exception as e:
+                logging.warning(f"{message['trnm']} grp_no {message['grp_no']} 전송 실패: {e}")
+        logging.info(f"Kiwoom 실시간 등록 {len(regs)}종목, 해지 {len(removes)}종목 ({len(messages)}개 메시지)")
+
+    async def _register(self, stock_code: str):
+        """종목을 키움 실시간 체결에 등록(REG)합니다. (같은 시점의 다른 요청과 묶어서 전송)"""
+        self._queue_register(stock_code)
+        await asyncio.shield(self._flush_soon())
+
+    async def _unregister(self, stock_code: str):
+        """종목의 실시간 체결 등록을 해지(REMOVE)합니다. (같은 시점의 다른 요청과 묶어서 전송)"""
+        self._queue_unregister(stock_code)
+        await asyncio.shield(self._flush_soon())
+
+    async def sync_upstream(self, codes: set):
+        """
+        (redis 모드 리더) 키움 구독을 전체 워커의 구독 종목 codes와 맞춥니다.
+        codes가 비면 연결을 종료합니다.
+        """
         async with self.lock:
-            stock_code = stock_code.split('.')[0]
-            if client_ws not in self.subscriptions.get(stock_code, set()):
+            if not codes:
+                await self.disconnect()
                 return
+            if not self.is_running and not await self.connect():
+                return  # 다음 동기화 주기에 다시 시도
+            for stock_code in set(self.stock_to_grp) - codes:
+                self._queue_unregister(stock_code)
+            for stock_code in codes - set(self.stock_to_grp):
+                self._queue_register(stock_code)
+            if self.reg_queue or self.remove_queue:
+                await asyncio.shield(self._flush_soon())
+
+    def _in_use(self, stock_code: str) -> bool:
+        """이 워커에 체결 또는 분봉 구독자가 있는지"""
+        return bool(self.subscriptions.get(stock_code)) or bool(self.bar_subscriptions.get(stock_code))
+
+    async def _ensure_connected(self) -> bool:
+        """
+        Kiwoom 연결을 기다립니다. 동시에 들어온 요청은 같은 연결 시도를 공유하고,
+        이미 구독 중인 종목의 구독/해지는 연결 시도를 기다리지 않습니다.
+        """
+        if self.is_running:
+            return True
+        if self.connect_task is None:
+            self.connect_task = asyncio.create_task(self._connect_once())
+        return await asyncio.shield(self.connect_task)
+
+    async def _connect_once(self) -> bool:
+        try:
+            async with self.lock:
+                return await self.connect()
+        finally:
+            self.connect_task = None
+
+    async def _acquire(self, client_ws: WebSocket, stock_code: str) -> bool:
+        """
+        종목의 첫 구독(체결/분봉 합산) 시 실시간 체결을 받을 수 있도록 준비합니다.
+        local 모드는 Kiwoom에 연결 후 REG, redis 모드는 구독 종목만 등록(리더가 REG)합니다.
+        """
+        if self.bus is not None:
+            try:
+                await self.bus.add_interest(stock_code)
+            except redis.RedisError as e:
+                logging.error(f"{stock_code} 구독 등록 실패: {e}")
+                self.send(client_ws, {"status": "error", "detail": "실시간 구독 등록에 실패했습니다."})
+                return False
+            return True
 
-            self.subscriptions[stock_code].remove(client_ws)
-            logging.info(f"Client {client_ws} unsubscribed from {stock_code}.")
-
-            if not self.subscriptions[stock_code]:
-                del self.subscriptions[stock_code]
-                grp_no = self.stock_to_grp.pop(stock_code, None)
-                if grp_no:
-                    self.grp_to_stock.pop(grp_no, None)
-                    logging.info(f"All clients for {stock_code} unsubscribed. Removing grp_no: {grp_no}")
-
-                    remove_msg = {'trnm': 'REMOVE', 'grp_no': grp_no}
-                    if self.is_running and self.kiwoom_ws.protocol.state != State.CLOSED:
-                        await self.kiwoom_ws.send(json.dumps(remove_msg))
-                    else:
-                        logging.warning("Kiwoom이 연결되지 않아 구독 해지 요청을 보낼 수 없습니다.")
-            
-            # 마지막 구독자였는지 확인
-            if not any(self.subscriptions.values()):
+        # 연결을 기다리는 동안 다른 종목의 마지막 해지로 연결이 종료되지 않도록 표시
+        self.acquiring += 1
+        try:
+            if not await self._ensure_connected():
+                self.send(client_ws, {"status": "error", "detail": "Kiwoom 서버 연결에 실패했습니다."})
+                return False
+            await self._register(stock_code)
+            return True
+        finally:
+            self.acquiring -= 1
+
+    async def _release(self, stock_code: str):
+        """종목의 마지막 구독(체결/분봉 합산)이 해지되면 실시간 체결 등록을 해지합니다."""
+        if self.bus is not None:
+            # 키움 구독 해지/연결 종료는 리더가 전체 워커 기준으로 판단
+            try:
+                await self.bus.remove_interest(stock_code)
+            except redis.RedisError as e:
+                logging.warning(f"{stock_code} 구독 해지 등록 실패: {e}")
+            return
+        await self._unregister(stock_code)
+        # 마지막 구독자였는지 확인
+        async with self.lock:
+            if not self.subscriptions and not self.bar_subscriptions and not self.acquiring:
                 await self.disconnect()
 
+    async def subscribe(self, client_ws: WebSocket, stock_code: str, max_hz: float = None, mode: str = None, snapshot: int = SNAPSHOT_TICKS):
+        """
+        클라이언트의 종목 구독 요청을 처리합니다.
+        max_hz 또는 mode="latest"를 지정하면 해당 종목은 최신 틱만 (초당 최대 max_hz번) 전송합니다.
+        보관된 체결이 있으면 구독 직후 최신가와 최근 snapshot개 체결을 먼저 보냅니다.
+        """
+        stock_code = stock_code.split('.')[0]
+        await self._wait_idle(stock_code)
+        # 이미 실시간 체결을 받는 종목이면 대기 없이 구독자만 추가
+        if self._in_use(stock_code):
+            self._add_subscriber(client_ws, stock_code, max_hz, mode, snapshot)
+            return
+        # 첫 구독은 Kiwoom 등록 (같은 종목의 다른 요청만 등록이 끝날 때까지 대기)
+        async with self._transition(stock_code):
+            if await self._acquire(client_ws, stock_code):
+                self._add_subscriber(client_ws, stock_code, max_hz, mode, snapshot)
+
+    def _add_subscriber(self, client_ws: WebSocket, stock_code: str, max_hz, mode, snapshot: int):
+        channel = self._channel(client_ws)
+        if max_hz or mode == "latest":
+            channel.set_conflation(stock_code, max_hz)
+        else:
+            channel.clear_conflation(stock_code)
+        # 스냅샷을 구독 등록 전에 큐에 넣어 이후 체결보다 먼저 전송되도록 함
+        subscribers = self.subscriptions[stock_code]
+        if client_ws not in subscribers:
+            if channel.binary:
+                channel.offer_json({"status": "symbol", "stock_code": stock_code, "symbol": self.encoder.symbol(stock_code)})
+            message = self.ticks.snapshot(stock_code, snapshot)
+            if message is not None:
+                channel.offer_json(message)
+            # 바이너리 구독자는 이후 delta를 적용할 기준 keyframe을 받음
+            if channel.binary and not channel.is_conflated(stock_code):
+                recent = self.ticks.recent(stock_code, 1)
+                frame = self.encoder.resync(stock_code, recent[0] if recent else None)
+                if frame is not None:
+                    channel.offer(frame)
+        subscribers.add(client_ws)
+        self.client_codes[client_ws].add(stock_code)
+        logging.info(f"Client {client_ws} subscribed to {stock_code}. Total subscribers: {len(subscribers)}")
+
+    async def unsubscribe(self, client_ws: WebSocket, stock_code: str):
+        """클라이언트의 종목 구독 해지 요청을 처리합니다."""
+        stock_code = stock_code.split('.')[0]
+        subscribers = self.subscriptions.get(stock_code)
+        if not subscribers or client_ws not in subscribers:
+            return
+
+        subscribers.remove(client_ws)
+        if not subscribers:
+            del self.subscriptions[stock_code]
+        _discard(self.client_codes, client_ws, stock_code)
+        channel = self.clients.get(client_ws)
+        if channel is not None:
+            channel.clear_conflation(stock_code)
+        logging.info(f"Client {client_ws} unsubscribed from {stock_code}.")
+
+        if not self._in_use(stock_code):
+            await self._release_if_unused(stock_code)
+
+    async def subscribe_bars(self, client_ws: WebSocket, stock_code: str, interval: int, snapshot: int = SNAPSHOT_BARS):
+        """
+        클라이언트의 분봉(interval분) 구독 요청을 처리합니다.
+        구독 직후 최근 snapshot개 봉을 보내고, 이후 체결마다 진행 중인 봉을 갱신해 보냅니다.
+        """
+        stock_code = stock_code.split('.')[0]
+        await self._wait_idle(stock_code)
+        if self._in_use(stock_code):
+            self._add_bar_subscriber(client_ws, stock_code, interval, snapshot)
+            return
+        async with self._transition(stock_code):
+            if await self._acquire(client_ws, stock_code):
+                self._add_bar_subscriber(client_ws, stock_code, interval, snapshot)
+
+    def _add_bar_subscriber(self, client_ws: WebSocket, stock_code: str, interval: int, snapshot: int):
+        channel = self._channel(client_ws)
+        intervals = self.bar_subscriptions[stock_code].setdefault(client_ws, set())
+        if interval not in intervals:
+            channel.offer_json({
+                "status": "snapshot", "stock_code": stock_code, "interval": interval,
+                "bars": self.bars.recent(stock_code, interval, snapshot),
+            })
+        intervals.add(interval)
+        self.client_bar_codes[client_ws].add(stock_code)
+        logging.info(f"Client {client_ws} subscribed to {stock_code} {interval}m bars.")
+
+    async def unsubscribe_bars(self, client_ws: WebSocket, stock_code: str, interval: int = None):
+        """분봉 구독 해지 (interval이 없으면 해당 종목의 모든 봉 단위)"""
+        stock_code = stock_code.split('.')[0]
+        subscribers = self.bar_subscriptions.get(stock_code, {})
+        intervals = subscribers.get(client_ws)
+        if not intervals:
+            return
+
+        removed = set(intervals) if interval is None else intervals & {interval}
+        intervals -= removed
+        channel = self.clients.get(client_ws)
+        if channel is not None:
+            for i in removed:
+                channel.clear_conflation(_bar_key(stock_code, i))
+        if not intervals:
+            del subscribers[client_ws]
+            _discard(self.client_bar_codes, client_ws, stock_code)
+        if not subscribers:
+            del self.bar_subscriptions[stock_code]
+        logging.info(f"Client {client_ws} unsubscribed from {stock_code} bars {sorted(removed)}.")
+
+        if not self._in_use(stock_code):
+            await self._release_if_unused(stock_code)
+
+    async def _release_if_unused(self, stock_code: str):
+        await self._wait_idle(stock_code)
+        # 기다리는 동안 다시 구독되었으면 해지하지 않음
+        if self._in_use(stock_code):
+            return
+        async with self._transition(stock_code):
+            await self._release(stock_code)
+
+    async def _wait_idle(self, stock_code: str):
+        """종목의 Kiwoom 등록/해지가 진행 중이면 끝날 때까지 대기 (대기 중인 요청은 완료 시 함께 깨어남)"""
+        while (pending := self.pending.get(stock_code)) is not None:
+            await pending.wait()
+
+    @asynccontextmanager
+    async def _transition(self, stock_code: str):
+        """종목의 Kiwoom 등록/해지 구간 (_wait_idle 직후 대기 없이 진입해야 함)"""
+        done = self.pending[stock_code] = asyncio.Event()
+        try:
+            yield
+        finally:
+            del self.pending[stock_code]
+            done.set()
 
     async def handle_disconnect(self, client_ws: WebSocket):
         """클라이언트의 연결 종료를 처리합니다."""
-        disconnected_subscriptions = []
-        async with self.lock:
-            for stock_code, clients in self.subscriptions.items():
-                if client_ws in clients:
-                    disconnected_subscriptions.append(stock_code)
-        
-        for stock_code in disconnected_subscriptions:
-            await self.unsubscribe(client_ws, stock_code)
\ No newline at end of file
+        # 역색인으로 이 클라이언트의 구독만 해지 (전체 구독 목록을 훑지 않음)
+        for stock_code in list(self.client_codes.get(client_ws, ())):
+            await self.unsubscribe(client_ws, stock_code)
+        for stock_code in list(self.client_bar_codes.get(client_ws, ())):
+            await self.unsubscribe_bars(client_ws, stock_code)
+
+        # 송신 writer 정리
+        channel = self.clients.pop(client_ws, None)
+        if channel is not None:
+            channel.stop()
+
+
+def _discard(index: defaultdict, client_ws: WebSocket, stock_code: str):
+    """역색인에서 종목 제거 (남은 종목이 없으면 클라이언트 항목도 제거)"""
+    codes = index.get(client_ws)
+    if codes is not None:
+        codes.discard(stock_code)
+        if not codes:
+            del index[client_ws]
+
+
+def _by_group(queue: dict) -> dict:
+    """{종목코드: grp_no} → {grp_no: [종목코드]}"""
+    groups = defaultdict(list)
+    for stock_code, grp_no in queue.items():
+        groups[grp_no].append(stock_code)
+    return groups
+
+
+def _group_message(trnm: str, grp_no: str, codes) -> dict:
+    """그룹 하나의 REG/REMOVE 메시지 (종목 여러 개를 한 data 항목에 담음)"""
+    return {
+        'trnm': trnm,
+        'grp_no': grp_no,
+        'refresh': '1',
+        'data': [{'item': sorted(codes), 'type': ['0B']}]
+    }
+
+
+def _bar_key(stock_code: str, interval: int) -> str:
+    """분봉 구독의 conflation 키"""
+    return f"{stock_code}:{interval}m"
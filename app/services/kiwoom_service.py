@@ -1,53 +1,20 @@
-import os
-import json
-import time
+import logging
+import contextvars
 import pandas as pd
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import requests
+from app.services.kiwoom_client import kiwoom_post
+from app.services.kiwoom_token import get_kiwoom_token
+from app.services.chart_history import load_history, save_history, merge_history, is_consistent
+from app.services import metrics
 
 load_dotenv()
 
-API_KEY = os.getenv("KIWOOM_REST_KEY")
-SECRET_KEY = os.getenv("KIWOOM_REST_SECRET")
+# 요청(Task) 단위로 조회한 ka10081 페이지 수
+pages_fetched = contextvars.ContextVar("pages_fetched", default=0)
 
-# 토큰 발급 함수
-def get_kiwoom_token():
-    host = 'https://mockapi.kiwoom.com'
-    endpoint = '/oauth2/token'
-    url = host + endpoint
-
-    headers = {
-        'Content-Type': 'application/json;charset=UTF-8',
-    }
-
-    params = {
-        'grant_type': 'client_credentials',
-        'appkey': API_KEY,
-        'secretkey': SECRET_KEY,
-    }
-
-    response = requests.post(url, headers=headers, json=params)
-    response.raise_for_status()
-    data = response.json()
-
-    token = data.get('access_token') or data.get('token') or data.get('accessToken')
-    if not token:
-        raise ValueError(f"Token missing in response: {data}")
-    return token
-
-def fn_ka10081(token, cont_yn='N', next_key='', code="", date="20250501"):
-    host = 'https://mockapi.kiwoom.com'
+async def fn_ka10081(token, cont_yn='N', next_key='', code="", date="20250501"):
     endpoint = '/api/dostk/chart'
-    url = host + endpoint
-
-    headers = {
-        'Content-Type': 'application/json;charset=UTF-8',
-        'authorization': f'Bearer {token}',
-        'cont-yn': cont_yn,
-        'next-key': next_key,
-        'api-id': 'ka10081',
-    }
 
     params = {
         'stk_cd': code,
@@ -55,28 +22,43 @@ def fn_ka10081(token, cont_yn='N', next_key='', code="", date="20250501"):
         'upd_stkpc_tp': '1',
     }
 
-    response = requests.post(url, headers=headers, json=params)
-    next_key_val = response.headers.get('next-key')
-    data = response.json()
+    data, headers = await kiwoom_post(endpoint, params, api_id='ka10081', token=token, cont_yn=cont_yn, next_key=next_key)
+    next_key_val = headers.get('next-key')
     return pd.DataFrame(data.get('stk_dt_pole_chart_qry', [])), next_key_val
 
-def get_kiwoom_chart(token, code, date=datetime.now().strftime("%Y%m%d")):
+async def _fetch_pages(token, code, date=None, until=None):
+    """
+    ka10081 일봉을 최신 페이지부터 받아옵니다.
+    until(Timestamp)이 주어지면 해당 날짜까지 거슬러 올라간 페이지에서 조회를 멈춥니다.
+    반환값: (원본 DataFrame, 상장일까지 모두 받았는지 여부)
+    """
+    # 기준일자는 호출 시점 기준 (모듈 로드 시점으로 고정되지 않도록)
+    date = date or datetime.now().strftime("%Y%m%d")
     all_data = []
     next_key_val = ""
+    exhausted = False
     while True:
-        time.sleep(0.5)
-        data, next_key_val = fn_ka10081(token=token, code=code, date=date, cont_yn='Y', next_key=next_key_val)
+        data, next_key_val = await fn_ka10081(token=token, code=code, date=date, cont_yn='Y', next_key=next_key_val)
+        pages_fetched.set(pages_fetched.get() + 1)
 
         if data.empty:
+            exhausted = True
             break
         all_data.append(data)
         if not next_key_val:
+            exhausted = True
+            break
+        if until is not None and pd.to_datetime(data['dt'], format='%Y%m%d').min() <= until:
             break
 
     if not all_data:
-        return pd.DataFrame()
+        return pd.DataFrame(), exhausted
+    return pd.concat(all_data, ignore_index=True), exhausted
 
-    all_data = pd.concat(all_data, ignore_index=True)
+# ka10081 원본 응답을 OHLCV 컬럼으로 정리
+def _to_ohlcv(all_data):
+    if all_data.empty:
+        return pd.DataFrame()
 
     # 문자열 → 숫자 변환
     numeric_columns = ['cur_prc', 'trde_qty', 'open_pric', 'high_pric', 'low_pric']
@@ -95,12 +77,74 @@ def get_kiwoom_chart(token, code, date=datetime.now().strftime("%Y%m%d")):
         'dt': 'timestamp'
     })[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
 
+    # 숫자가 아닌 값이 있던 행은 제외하고 원 단위 정수로 유지
+    price_columns = ['open', 'high', 'low', 'close', 'volume']
+    df = df.dropna(subset=price_columns)
+    return df.astype({name: 'int64' for name in price_columns})
+
+async def get_kiwoom_chart(token, code, date=None, until=None):
+    data, _ = await _fetch_pages(token, code, date=date, until=until)
+    return _to_ohlcv(data)
+
+# 저장된 히스토리 이후의 캔들만 받아와 병합
+# start가 저장된 범위보다 과거이면 부족한 구간만 이어서 조회
+async def get_daily_history(token, code, start=None):
+    history, meta = await load_history(code)
+
+    if history is not None:
+        fresh, _ = await _fetch_pages(token, code, until=meta["last"])
+        fresh = _to_ohlcv(fresh)
+        if is_consistent(history, fresh, meta["last"]):
+            df = merge_history(history, fresh)
+            complete = meta["complete"]
+
+            needs_older = start is None or start < meta["first"]
+            if needs_older and not complete:
+                base_dt = (meta["first"] - timedelta(days=1)).strftime("%Y%m%d")
+                older, complete = await _fetch_pages(token, code, date=base_dt, until=start)
+                df = merge_history(_to_ohlcv(older), df) if not older.empty else df
+
+            await save_history(code, df, complete)
+            return df
+        logging.info(f"{code} 히스토리가 최신 데이터와 일치하지 않아 전체를 다시 조회합니다.")
+
+    data, complete = await _fetch_pages(token, code, until=start)
+    df = _to_ohlcv(data)
+    await save_history(code, df, complete)
     return df
 
-def fetch_chart_data(code: str, period: str = "3mo"):
+# 기간별 조회 시작일 (None: 상장일부터 전체)
+PERIOD_DAYS = {
+    "1mo": 30,
+    "3mo": 91,
+    "1y": 365,
+    "5y": 1825,
+    "10y": 3650,
+    "all": None,
+}
+
+def get_period_start(period: str):
+    days = PERIOD_DAYS.get(period)
+    if days is None:
+        return None
+    return pd.Timestamp(datetime.now() - timedelta(days=days))
+
+async def fetch_chart_data(code: str, period: str = "3mo"):
     try:
-        token = get_kiwoom_token()
-        df = get_kiwoom_chart(token=token, code=code)
+        # 기간 필터
+        if period not in PERIOD_DAYS:
+            return {"error": f"지원하지 않는 기간: {period}"}
+        start_date = get_period_start(period)
+
+        token = await get_kiwoom_token()
+        pages_fetched.set(0)
+        df = await get_daily_history(token=token, code=code, start=start_date)
+
+        # 요청당 조회한 페이지 수 기록
+        pages = pages_fetched.get()
+        await metrics.incr("kiwoom.ka10081.pages", pages)
+        await metrics.observe(f"kiwoom.ka10081.pages_per_request.{period}", pages)
+        logging.info(f"{code} {period} 차트 조회: ka10081 {pages} 페이지")
 
         if df.empty:
             return {"error": "데이터 없음"}
@@ -108,21 +152,8 @@ def fetch_chart_data(code: str, period: str = "3mo"):
         # 정렬 (오래된 순)
         df = df.sort_values(by="timestamp", ascending=True)
 
-        # 기간 필터
-        end_date = datetime.now()
-        start_date = {
-            "1mo": end_date - timedelta(days=30),
-            "3mo": end_date - timedelta(days=91),
-            "1y": end_date - timedelta(days=365),
-            "5y": end_date - timedelta(days=1825),
-            "10y": end_date - timedelta(days=3650),
-            "all": datetime.min
-        }.get(period, None)
-
-        if start_date is None:
-            return {"error": f"지원하지 않는 기간: {period}"}
-
-        df = df[df["timestamp"] >= start_date]
+        if start_date is not None:
+            df = df[df["timestamp"] >= start_date]
 
         # 리샘플링
         if period == "1y":
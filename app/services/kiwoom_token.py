@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+import redis
+from dotenv import load_dotenv
+from app.db.redis_service import get_async_redis
+from app.errors import StockAPIException
+from app.services.kiwoom_client import kiwoom_post
+from app.services.single_flight import single_flight
+
+load_dotenv()
+
+API_KEY = os.getenv("KIWOOM_REST_KEY")
+SECRET_KEY = os.getenv("KIWOOM_REST_SECRET")
+
+# 접근토큰 저장소 (Redis db 9)
+TOKEN_DB = 9
+TOKEN_KEY = "KIWOOM_TOKEN"
+
+DEFAULT_LIFETIME = 3600       # 응답에 만료일시가 없을 때 사용하는 유효 시간(초)
+REFRESH_MARGIN = 10 * 60      # 만료 이 시간 전부터 백그라운드에서 미리 재발급(초)
+EXPIRY_MARGIN = 60            # 만료 이 시간 전부터는 사용하지 않고 즉시 재발급(초)
+
+KST = timezone(timedelta(hours=9))
+
+# 프로세스 내 토큰 사본 {"token": str, "expires_at": epoch}
+_cached = None
+# 진행 중인 백그라운드 재발급 Task
+_refresh_task = None
+
+
+# expires_dt(YYYYMMDDHHMMSS, KST) → epoch
+def _parse_expires(data: dict) -> float:
+    expires_dt = data.get("expires_dt")
+    if expires_dt:
+        try:
+            return datetime.strptime(expires_dt, "%Y%m%d%H%M%S").replace(tzinfo=KST).timestamp()
+        except ValueError:
+            logging.warning(f"토큰 만료일시 형식 오류: {expires_dt}")
+    return time.time() + DEFAULT_LIFETIME
+
+
+def _remaining(entry) -> float:
+    return entry["expires_at"] - time.time() if entry else 0
+
+
+async def _load_shared():
+    try:
+        raw = await get_async_redis(TOKEN_DB).get(TOKEN_KEY)
+    except redis.RedisError as e:
+        logging.warning(f"토큰 조회 실패: {e}")
+        return None
+    try:
+        entry = json.loads(raw) if raw else None
+    except ValueError:
+        return None  # 이전 형식(토큰 문자열)은 만료일시를 알 수 없으므로 재발급
+    if not isinstance(entry, dict) or "token" not in entry or "expires_at" not in entry:
+        return None
+    return entry
+
+
+async def _save_shared(entry: dict):
+    ttl = int(_remaining(entry) - EXPIRY_MARGIN)
+    if ttl <= 0:
+        return
+    try:
+        await get_async_redis(TOKEN_DB).setex(TOKEN_KEY, ttl, json.dumps(entry))
+    except redis.RedisError as e:
+        logging.warning(f"토큰 저장 실패: {e}")
+
+
+# /oauth2/token 호출
+async def _issue():
+    global _cached
+    params = {
+        'grant_type': 'client_credentials',
+        'appkey': API_KEY,
+        'secretkey': SECRET_KEY,
+    }
+    data, _ = await kiwoom_post('/oauth2/token', params)
+
+    token = data.get('token') or data.get('access_token') or data.get('accessToken')
+    if not token:
+        raise StockAPIException(status_code=500, detail=f"토큰 발급 실패: {data.get('return_msg', data)}")
+
+    entry = {"token": token, "expires_at": _parse_expires(data)}
+    _cached = entry
+    await _save_shared(entry)
+    logging.info("키움 접근토큰을 발급했습니다.")
+    return entry
+
+
+# 다른 워커가 이미 재발급한 토큰이 있으면 그대로 사용
+async def _load_fresh(min_remaining: float):
+    global _cached
+    entry = await _load_shared()
+    if entry is not None and _remaining(entry) > min_remaining:
+        _cached = entry
+        return entry
+    return None
+
+
+async def _refresh(min_remaining: float):
+    return await single_flight(TOKEN_KEY, _issue, check_cache=lambda: _load_fresh(min_remaining))
+
+
+def _schedule_refresh():
+    global _refresh_task
+    if _refresh_task is not None and not _refresh_task.done():
+        return
+
+    async def run():
+        try:
+            await _refresh(REFRESH_MARGIN)
+        except Exception as e:
+            logging.warning(f"토큰 사전 재발급 실패: {e}")
+
+    _refresh_task = asyncio.create_task(run())
+
+
+async def get_kiwoom_token() -> str:
+    """
+    키움 REST/WebSocket 접근토큰을 반환합니다.
+    프로세스 내 사본 → Redis(db 9) 순으로 조회하고, 만료가 가까우면 기존 토큰을 반환하면서
+    백그라운드에서 미리 재발급합니다. 발급은 워커 전체에서 한 번만 실행됩니다.
+    """
+    entry = _cached if _remaining(_cached) > EXPIRY_MARGIN else await _load_fresh(EXPIRY_MARGIN)
+    if entry is None:
+        entry = await _refresh(EXPIRY_MARGIN)
+    elif _remaining(entry) < REFRESH_MARGIN:
+        _schedule_refresh()
+    return entry["token"]
+
+
+# 토큰이 거부된 경우 (다음 호출에서 재발급)
+async def invalidate():
+    global _cached
+    _cached = None
+    try:
+        await get_async_redis(TOKEN_DB).delete(TOKEN_KEY)
+    except redis.RedisError as e:
+        logging.warning(f"토큰 삭제 실패: {e}")
+
+
+async def replace_rejected(token: str) -> str:
+    """
+    키움이 거부한 토큰 대신 사용할 토큰을 반환합니다.
+    다른 요청/워커가 이미 새 토큰을 받아 두었으면 그 토큰을 쓰고, 아니면 폐기 후 재발급합니다.
+    """
+    for entry in (_cached, await _load_shared()):
+        if entry is not None and entry["token"] != token and _remaining(entry) > EXPIRY_MARGIN:
+            return entry["token"]
+    await invalidate()
+    return await get_kiwoom_token()
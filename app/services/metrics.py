@@ -0,0 +1,55 @@
+import redis
+from app.db.redis_service import get_async_redis
+
+# 지표 저장소 (Redis db 2)
+METRIC_DB = 2
+COUNTER_KEY = "metrics:counters"
+
+
+def _observe_key(name: str) -> str:
+    return f"metrics:observe:{name}"
+
+
+# 카운터 증가
+async def incr(name: str, amount: int = 1):
+    try:
+        await get_async_redis(METRIC_DB).hincrby(COUNTER_KEY, name, amount)
+    except redis.RedisError as e:
+        print(f"지표 저장 실패: {e}")
+
+
+# 관측값 기록 (건수, 합계, 최근값)
+async def observe(name: str, value: float):
+    try:
+        pipe = get_async_redis(METRIC_DB).pipeline(transaction=False)
+        pipe.hincrby(_observe_key(name), "count", 1)
+        pipe.hincrbyfloat(_observe_key(name), "sum", value)
+        pipe.hset(_observe_key(name), "last", value)
+        await pipe.execute()
+    except redis.RedisError as e:
+        print(f"지표 저장 실패: {e}")
+
+
+# 전체 지표 조회
+async def get_metrics() -> dict:
+    client = get_async_redis(METRIC_DB)
+    try:
+        counters = await client.hgetall(COUNTER_KEY)
+        observations = {}
+        async for key in client.scan_iter(match=_observe_key("*")):
+            values = await client.hgetall(key)
+            count = int(values.get("count", 0))
+            total = float(values.get("sum", 0))
+            observations[key[len(_observe_key("")):]] = {
+                "count": count,
+                "avg": round(total / count, 3) if count else 0,
+                "last": float(values.get("last", 0)),
+            }
+    except redis.RedisError as e:
+        print(f"지표 조회 실패: {e}")
+        return {"counters": {}, "observations": {}}
+
+    return {
+        "counters": {k: int(v) for k, v in counters.items()},
+        "observations": observations,
+    }
@@ -0,0 +1,147 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+import redis
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from app.data.getCodes import getKospiCodes, getKosdaqCodes
+from app.db.redis_service import get_async_redis
+from app.services import metrics, rate_limiter, fx_service
+from app.services.stock_service import get_stock_chart_blob, get_domestic_price
+from app.services.indicator_service import crawl_investment_metrics
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") == "1"
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", 30))            # 시장별 시가총액 상위 N 종목
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", 2))  # 동시에 실행하는 업스트림 작업 수
+PREWARM_RATE = float(os.getenv("PREWARM_RATE", 2))              # 초당 시작하는 업스트림 작업 수
+
+# 긴 기간부터 갱신해야 첫 조회에서 받은 히스토리를 나머지 기간이 재사용
+CHART_PERIODS = ["all", "10y", "5y", "1y", "3mo", "1mo"]
+
+TIMEZONE = "Asia/Seoul"
+JOB_LOCK_TTL = 30 * 60
+
+
+class RateBudget:
+    """프리워밍 작업 전체가 공유하는 업스트림 호출 예산 (동시 실행 수 + 초당 시작 수)"""
+
+    def __init__(self, concurrency: int, rate: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1 / rate
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def run(self, func, *args):
+        async with self.semaphore:
+            async with self.lock:
+                loop = asyncio.get_running_loop()
+                wait = self.next_start - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self.next_start = max(loop.time(), self.next_start) + self.interval
+            return await func(*args)
+
+
+budget = RateBudget(PREWARM_CONCURRENCY, PREWARM_RATE)
+scheduler = AsyncIOScheduler(timezone=TIMEZONE)
+
+
+# 프리워밍 대상 종목 [(종목코드, 야후 접미사)]
+def get_universe(top_n: int = PREWARM_TOP_N):
+    kospi = getKospiCodes(os.path.join(DATA_DIR, "kospi100.csv"), limit=top_n)
+    kosdaq = getKosdaqCodes(os.path.join(DATA_DIR, "kosdaq150.csv"), limit=top_n)
+    return [(code, "KS") for code in kospi] + [(code, "KQ") for code in kosdaq]
+
+
+# 여러 워커 중 하나에서만 작업이 실행되도록 Redis 락 사용
+async def _acquire_job_lock(job: str) -> bool:
+    try:
+        return bool(await get_async_redis(0).set(f"prewarm:lock:{job}", "1", nx=True, ex=JOB_LOCK_TTL))
+    except redis.RedisError as e:
+        logging.warning(f"프리워밍 락 획득 실패 ({job}): {e}")
+        return False
+
+
+async def _release_job_lock(job: str):
+    try:
+        await get_async_redis(0).delete(f"prewarm:lock:{job}")
+    except redis.RedisError as e:
+        logging.warning(f"프리워밍 락 해제 실패 ({job}): {e}")
+
+
+# 한 종목의 차트(전 기간), 투자지표, 현재가 갱신
+async def _prewarm_code(code: str, suffix: str):
+    failures = 0
+    tasks = [(get_stock_chart_blob.refresh, (f"{code}.{suffix}", period, "KR")) for period in CHART_PERIODS]
+    tasks += [
+        (crawl_investment_metrics.refresh, (code,)),
+        (get_domestic_price.refresh, (code,)),
+    ]
+
+    for func, args in tasks:
+        try:
+            await budget.run(func, *args)
+        except Exception as e:
+            failures += 1
+            logging.warning(f"프리워밍 실패 {func.__qualname__}{args}: {e}")
+    return failures
+
+
+async def run_prewarm(job: str):
+    if not await _acquire_job_lock(job):
+        logging.info(f"다른 워커에서 프리워밍({job})이 실행 중입니다.")
+        return
+
+    started = time.perf_counter()
+    try:
+        universe = get_universe()
+        # 사용자 요청이 키움 호출 한도를 먼저 쓰도록 낮은 우선순위로 실행
+        with rate_limiter.background_priority():
+            results = await asyncio.gather(*[
+                _prewarm_code(code, suffix) for code, suffix in universe
+            ])
+        failures = sum(results)
+    finally:
+        await _release_job_lock(job)
+
+    elapsed = time.perf_counter() - started
+    await metrics.observe(f"prewarm.{job}.seconds", elapsed)
+    await metrics.incr(f"prewarm.{job}.runs")
+    await metrics.incr(f"prewarm.{job}.failures", failures)
+    logging.info(f"프리워밍({job}) 완료: {len(universe)} 종목, 실패 {failures}건, {elapsed:.1f}s")
+
+
+def start_scheduler():
+    if scheduler.running:
+        return
+
+    # 환율 스냅샷 갱신 (시작 시 한 번 실행 후 주기적으로)
+    scheduler.add_job(
+        fx_service.refresh, IntervalTrigger(minutes=fx_service.REFRESH_MINUTES, timezone=TIMEZONE),
+        id="fx_refresh", next_run_time=datetime.now(scheduler.timezone),
+        coalesce=True, max_instances=1, misfire_grace_time=300,
+    )
+
+    if PREWARM_ENABLED:
+        # 장 시작 전: 차트, 투자지표, 현재가 전체 갱신
+        scheduler.add_job(
+            run_prewarm, CronTrigger(day_of_week="mon-fri", hour=8, minute=30, timezone=TIMEZONE),
+            args=["open"], id="prewarm_open", coalesce=True, max_instances=1, misfire_grace_time=600,
+        )
+        # 장중: 30분마다 차트, 투자지표, 현재가 갱신
+        scheduler.add_job(
+            run_prewarm, CronTrigger(day_of_week="mon-fri", hour="9-15", minute="*/30", timezone=TIMEZONE),
+            args=["session"], id="prewarm_session", coalesce=True, max_instances=1, misfire_grace_time=300,
+        )
+    scheduler.start()
+    logging.info("스케줄러를 시작합니다.")
+
+
+def stop_scheduler():
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
@@ -0,0 +1,138 @@
+import os
+import time
+import asyncio
+import logging
+import contextlib
+import contextvars
+import redis
+from app.db.redis_service import get_async_redis
+from app.errors import StockAPIException
+from app.services import metrics
+
+# 키움 REST 호출 제한 (api-id별 토큰 버킷, Redis db 0 ratelimit:{api_id})
+LIMIT_DB = 0
+DEFAULT_RATE = float(os.getenv("KIWOOM_RATE", 4))    # 초당 허용 호출 수
+DEFAULT_BURST = int(os.getenv("KIWOOM_BURST", 4))    # 한 번에 몰아서 보낼 수 있는 호출 수
+ACQUIRE_TIMEOUT = 30                                   # 토큰을 기다리는 최대 시간(초)
+MAX_SLEEP = 1.0                                        # 한 번에 대기하는 최대 시간(초)
+
+# api-id별 (초당 호출 수, burst) - 연속조회가 많은 TR은 더 낮게 설정
+RATE_LIMITS = {
+    "ka10081": (2, 2),
+}
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# 현재 호출의 우선순위 (프리워밍, 백그라운드 캐시 갱신은 BACKGROUND)
+priority = contextvars.ContextVar("kiwoom_priority", default=INTERACTIVE)
+
+# 버킷을 채운 뒤 토큰을 하나 꺼내고, 부족하면 기다려야 할 시간(초)을 반환
+# BACKGROUND 호출은 reserve 만큼의 토큰을 사용자 요청 몫으로 남겨둠
+_ACQUIRE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local reserve = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 + reserve then
+    tokens = tokens - 1
+else
+    wait = (1 + reserve - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class LocalBucket:
+    """Redis를 사용할 수 없을 때 프로세스 내에서만 동작하는 토큰 버킷"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.ts = time.monotonic()
+
+    def take(self, reserve: int) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.ts) * self.rate)
+        self.ts = now
+        if self.tokens >= 1 + reserve:
+            self.tokens -= 1
+            return 0.0
+        return (1 + reserve - self.tokens) / self.rate
+
+
+_local_buckets = {}
+# Redis 장애 중 경고를 한 번만 남기기 위한 상태
+_degraded = False
+
+
+def _limit_key(api_id: str) -> str:
+    return f"ratelimit:{api_id}"
+
+
+def get_limit(api_id: str):
+    return RATE_LIMITS.get(api_id, (DEFAULT_RATE, DEFAULT_BURST))
+
+
+async def _take(api_id: str, reserve: int) -> float:
+    global _degraded
+    rate, burst = get_limit(api_id)
+    try:
+        wait = await get_async_redis(LIMIT_DB).eval(_ACQUIRE_SCRIPT, 1, _limit_key(api_id), rate, burst, reserve)
+        _degraded = False
+        return float(wait)
+    except redis.RedisError as e:
+        if not _degraded:
+            logging.warning(f"호출 제한 조회 실패, 프로세스 내 제한을 사용합니다: {e}")
+            _degraded = True
+        bucket = _local_buckets.get(api_id)
+        if bucket is None:
+            bucket = _local_buckets[api_id] = LocalBucket(rate, burst)
+        return bucket.take(reserve)
+
+
+async def acquire(api_id: str):
+    """
+    api_id의 호출 토큰을 하나 얻을 때까지 비동기로 대기합니다.
+    토큰이 남아 있으면 바로 반환하고, BACKGROUND 우선순위는 버킷에 토큰 하나를 남겨
+    사용자 요청이 먼저 처리되도록 합니다.
+    """
+    lane = priority.get()
+    _, burst = get_limit(api_id)
+    reserve = 1 if lane == BACKGROUND and burst > 1 else 0
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    slept = False
+    while True:
+        wait = await _take(api_id, reserve)
+        if wait <= 0:
+            break
+        if loop.time() - started + wait > ACQUIRE_TIMEOUT:
+            await metrics.incr(f"kiwoom.ratelimit.{api_id}.timeouts")
+            raise StockAPIException(status_code=503, detail="요청이 많아 잠시 후 다시 시도해주세요.")
+        await asyncio.sleep(min(wait, MAX_SLEEP))
+        slept = True
+
+    # 실제로 기다린 경우만 기록
+    if slept:
+        await metrics.observe(f"kiwoom.ratelimit.{api_id}.{lane}.wait_seconds", loop.time() - started)
+
+
+@contextlib.contextmanager
+def background_priority():
+    """블록 안에서 시작한 키움 호출(생성한 Task 포함)을 BACKGROUND 우선순위로 처리"""
+    token = priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        priority.reset(token)
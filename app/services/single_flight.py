@@ -0,0 +1,115 @@
+import asyncio
+import uuid
+import logging
+import redis
+from app.db.redis_service import get_async_redis
+
+# 워커 간 락 (Redis db 0, lock:{key})
+LOCK_DB = 0
+LOCK_LEASE_MS = 10_000      # 락 임대 시간 (조회 중에는 주기적으로 연장)
+WAIT_TIMEOUT = 30           # 다른 워커의 조회를 기다리는 최대 시간(초)
+POLL_INTERVAL = 0.1         # 다른 워커가 캐시를 채웠는지 확인하는 주기(초)
+
+# 락 소유자만 해제/연장할 수 있도록 토큰 비교 후 처리
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+_EXTEND_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# 프로세스 내 진행 중인 조회 (key -> Task)
+_inflight = {}
+
+
+def _lock_key(key: str) -> str:
+    return f"lock:{key}"
+
+
+async def _keep_lease(client, lock_key: str, token: str, lease_ms: int):
+    # 조회가 끝날 때까지 임대 시간의 1/3마다 락 연장
+    try:
+        while True:
+            await asyncio.sleep(lease_ms / 3000)
+            await client.eval(_EXTEND_SCRIPT, 1, lock_key, token, lease_ms)
+    except asyncio.CancelledError:
+        pass
+    except redis.RedisError as e:
+        logging.warning(f"락 연장 실패 ({lock_key}): {e}")
+
+
+async def _release(client, lock_key: str, token: str):
+    try:
+        await client.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+    except redis.RedisError as e:
+        logging.warning(f"락 해제 실패 ({lock_key}): {e}")
+
+
+# Redis 락을 잡은 워커만 fetch를 실행하고, 나머지는 캐시가 채워질 때까지 대기
+async def _run_locked(key, fetch, check_cache, lease_ms):
+    client = get_async_redis(LOCK_DB)
+    lock_key = _lock_key(key)
+    token = uuid.uuid4().hex
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + WAIT_TIMEOUT
+
+    while True:
+        try:
+            acquired = await client.set(lock_key, token, nx=True, px=lease_ms)
+        except redis.RedisError as e:
+            logging.warning(f"락 획득 실패, 직접 조회합니다 ({lock_key}): {e}")
+            return await fetch()
+
+        if acquired:
+            keeper = asyncio.create_task(_keep_lease(client, lock_key, token, lease_ms))
+            try:
+                # 락을 기다리는 사이 다른 워커가 캐시를 채웠을 수 있음
+                if check_cache is not None:
+                    cached = await check_cache()
+                    if cached is not None:
+                        return cached
+                return await fetch()
+            finally:
+                keeper.cancel()
+                await _release(client, lock_key, token)
+
+        await asyncio.sleep(POLL_INTERVAL)
+        if check_cache is not None:
+            cached = await check_cache()
+            if cached is not None:
+                return cached
+
+        if loop.time() > deadline:
+            logging.warning(f"{key} 조회 대기 시간 초과, 직접 조회합니다.")
+            return await fetch()
+
+
+def _consume_exception(task: asyncio.Task):
+    # 기다리던 호출자가 모두 취소된 경우에도 예외 로그가 남지 않도록 처리
+    if not task.cancelled():
+        task.exception()
+
+
+async def single_flight(key: str, fetch, check_cache=None, lease_ms: int = LOCK_LEASE_MS):
+    """
+    같은 key에 대한 조회를 하나로 합칩니다.
+    - 프로세스 내: 먼저 들어온 요청의 Task를 나머지 요청이 함께 await
+    - 워커 간: Redis 락(lock:{key})을 잡은 워커만 fetch를 실행하고,
+      나머지 워커는 check_cache()가 값을 반환할 때까지 대기
+    fetch, check_cache는 인자 없는 코루틴 함수입니다.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_run_locked(key, fetch, check_cache, lease_ms))
+        task.add_done_callback(_consume_exception)
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+        _inflight[key] = task
+
+    # 호출자 하나가 취소되어도 다른 호출자를 위한 조회는 계속 진행
+    return await asyncio.shield(task)
@@ -1,39 +1,35 @@
 import requests
 from curl_cffi import requests
-import redis
-import json
 from bs4 import BeautifulSoup
-import yfinance as yf
 import os
+import asyncio
 from dotenv import load_dotenv
+import numpy as np
 import pandas as pd
-from datetime import datetime, date
+from datetime import date
 from .kiwoom_service import fetch_chart_data
+from .swr_cache import swr_cache, identity
+from .chart_codec import encode_chart, decode_chart, to_frame, to_records, to_json_bytes
 from app.errors import StockAPIException
+from app.services import fx_service, us_market_data
 
 load_dotenv()
-REDIS_HOST = os.getenv("REDIS_HOST", "redis")
-REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
 
-r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
-
 # 해외 현재가 조회
-def get_overseas_price(symbol: str):
-    session = requests.Session(impersonate="chrome")
-
-    ticker = yf.Ticker(symbol, session=session)
-    data = ticker.history(period="1d", interval="1m")
+async def get_overseas_price(symbol: str):
+    data = await us_market_data.get_history(symbol, period="1d", interval="1m")
 
     if data.empty:
         raise StockAPIException(status_code=404, detail=f"No data for {symbol}")
 
     return {
         "code": symbol,
-        "current_price": round(data["Close"].iloc[-1], 2)
+        "current_price": round(float(data["Close"].iloc[-1]), 2)
     }
 
-# 국내 상한가, 하한가, 현재가 조회
+# 국내 상한가, 하한가, 현재가 조회 (짧은 TTL로 캐싱)
+@swr_cache(key_fn=lambda code: f"price:{code}", soft_ttl=30, hard_ttl=300, db=REDIS_DB)
 def get_domestic_price(code: str) -> dict:
     url = f"https://finance.naver.com/item/main.naver?code={code}"
     headers = {"User-Agent": "Mozilla/5.0"}
@@ -70,8 +66,8 @@ def get_domestic_price(code: str) -> dict:
     }
 
 # 주가, 상한가, 하한가 조회
-def get_price(code: str, intent: str) -> dict:
-    summary = get_domestic_price(code)
+async def get_price(code: str, intent: str) -> dict:
+    summary = await get_domestic_price(code)
 
     name = summary.get("name")
 
@@ -84,32 +80,43 @@ def get_price(code: str, intent: str) -> dict:
     else:
         raise StockAPIException(status_code=400, detail=f"지원하지 않는 intent: {intent}")
 
-# 환율 변환 함수   
-def get_usd_to_krw_rate():
-    try:
-        res = requests.get("https://finance.naver.com/marketindex/exchangeDetail.naver?marketindexCd=FX_USDKRW")
-        res.encoding = "utf-8"
-        rate_text = res.text.split("blind\">")[1].split("</span>")[0].replace(",", "")
-        return float(rate_text)
-    except:
-        return 1350.0
-        
-def get_stock_chart(stock_code: str, period: str, market: str = None):
-    cache_key = f"chart:{stock_code}:{period}:{market}"
-
-    cached = r.get(cache_key)
-    if cached:
-        try:
-            return json.loads(cached)
-        except json.JSONDecodeError:
-            pass  
-
-    result = []
-
+US_PRICE_COLUMNS = ["open", "high", "low", "close"]
+
+# yfinance 원본 → 차트 컬럼 (가격 반올림, 등락률, 원화 환산을 컬럼 단위로 계산)
+# usd_to_krw: 고정 환율 또는 날짜 배열을 받아 일별 환율 배열을 반환하는 함수
+def postprocess_us_history(df: pd.DataFrame, usd_to_krw) -> pd.DataFrame:
+    df = df.reset_index()
+    # 거래소 현지 날짜 기준 datetime64 (캐시 포맷이 일 단위 정수로 저장하므로 문자열 변환 생략)
+    dates = df["Date"]
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    out = pd.DataFrame({
+        "timestamp": dates.dt.normalize(),
+        "open": df["Open"],
+        "high": df["High"],
+        "low": df["Low"],
+        "close": df["Close"],
+        "volume": df["Volume"],
+    })
+    out["fluctuation_rate"] = (out["close"].pct_change() * 100).round(2)
+    out = out.dropna()
+
+    prices = out[US_PRICE_COLUMNS].to_numpy(dtype="f8").round(2)
+    out[US_PRICE_COLUMNS] = prices
+    # 원화 가격은 반올림한 달러 가격 기준, 소수점 이하 버림
+    if callable(usd_to_krw):
+        usd_to_krw = usd_to_krw(out["timestamp"].to_numpy())[:, None]
+    krw = np.trunc(prices * usd_to_krw).astype("i8")
+    for i, name in enumerate(US_PRICE_COLUMNS):
+        out[f"{name}_krw"] = krw[:, i]
+    return out.reset_index(drop=True)
+
+# 차트 데이터를 업스트림에서 받아 DataFrame으로 반환
+async def _build_chart_frame(stock_code: str, period: str, market: str = None) -> pd.DataFrame:
     if market == "KR":
         code = stock_code.split(".")[0]
 
-        df = fetch_chart_data(code=code, period=period)
+        df = await fetch_chart_data(code=code, period=period)
 
         if isinstance(df, dict) and "error" in df:
             raise StockAPIException(status_code=500, detail=df["error"])
@@ -117,7 +124,7 @@ def get_stock_chart(stock_code: str, period: str, market: str = None):
         df = pd.DataFrame(df)  
         df = df.replace([float('inf'), float('-inf')], pd.NA).fillna(0) # 결측치 처리
 
-        result = df.to_dict(orient="records")
+        return df
 
     elif market == "US":
         try:
@@ -135,44 +142,15 @@ def get_stock_chart(stock_code: str, period: str, market: str = None):
 
             interval = period_map[period]
 
-            session = requests.Session(impersonate="chrome")
-            ticker = yf.Ticker(stock_code, session=session)
-            df = ticker.history(period=period if period != "all" else "max", interval=interval)
+            # 동시에 들어온 다른 종목 요청과 묶어서 조회
+            df = await us_market_data.get_history(stock_code, period if period != "all" else "max", interval)
 
             if df.empty:
                 raise StockAPIException(status_code=404, detail="No chart data available.")
 
-            df = df.reset_index()
-            df["timestamp"] = df["Date"].dt.strftime("%Y-%m-%d")
-            df = df[["timestamp", "Open", "High", "Low", "Close", "Volume"]]
-
-            df.rename(columns={
-                "Open": "open",
-                "High": "high",
-                "Low": "low",
-                "Close": "close",
-                "Volume": "volume"
-            }, inplace=True)
-
-            df["fluctuation_rate"] = df["close"].pct_change() * 100
-            df["fluctuation_rate"] = df["fluctuation_rate"].round(2)
-            df = df.dropna()
-
-            usd_to_krw = get_usd_to_krw_rate()
-
-            for row in df.to_dict(orient="records"):
-                item = dict(row)
-                item["open"] = round(item["open"], 2)
-                item["high"] = round(item["high"], 2)
-                item["low"] = round(item["low"], 2)
-                item["close"] = round(item["close"], 2)
-
-                item["open_krw"] = int(item["open"] * usd_to_krw)
-                item["high_krw"] = int(item["high"] * usd_to_krw)
-                item["low_krw"] = int(item["low"] * usd_to_krw)
-                item["close_krw"] = int(item["close"] * usd_to_krw)
-
-                result.append(item)
+            # 캔들 날짜별 환율로 원화 환산 (히스토리가 없는 구간은 현재 환율)
+            current = await fx_service.get_rate("USD")
+            return postprocess_us_history(df, lambda dates: fx_service.rates_on("USD", dates, current))
 
         except Exception as e:
             raise StockAPIException(status_code=500, detail=f"yfinance error: {e}")
@@ -180,34 +158,80 @@ def get_stock_chart(stock_code: str, period: str, market: str = None):
     else:
         raise StockAPIException(status_code=400, detail=f"지원하지 않는 market: {market}")
 
-    r.setex(cache_key, 3600, json.dumps(result))
-    return result
-
-def get_stock_chart_range(stock_code: str, start: date, end: date, market: str = None):
-    cache_key = f"chart_range:{stock_code}:{start}:{end}:{market}"
-
-    # Redis 캐시 확인
-    cached = r.get(cache_key)
-    if cached:
-        try:
-            return json.loads(cached)
-        except json.JSONDecodeError:
-            pass
-
+# 차트 캐시 TTL (soft: 갱신 시점, hard: stale 값을 제공하는 최대 시간)
+CHART_SOFT_TTL = 3600
+CHART_HARD_TTL = 6 * 3600
+
+# 차트 바이너리 조회 (stale-while-revalidate 캐시)
+@swr_cache(
+    key_fn=lambda stock_code, period, market=None: f"chart:{stock_code}:{period}:{market}",
+    soft_ttl=CHART_SOFT_TTL, hard_ttl=CHART_HARD_TTL,
+    encode=identity, decode=identity, db=REDIS_DB,
+)
+async def get_stock_chart_blob(stock_code: str, period: str, market: str = None) -> bytes:
+    df = await _build_chart_frame(stock_code, period, market)
+    return encode_chart(df)
+
+# 차트 컬럼 조회
+async def get_stock_chart_columns(stock_code: str, period: str, market: str = None) -> dict:
+    columns, _ = decode_chart(await get_stock_chart_blob(stock_code, period, market))
+    return columns
+
+# 여러 종목 차트 일괄 조회
+# 캐시는 MGET 한 번으로 확인하고, 미스는 동시 실행 수를 제한해 업스트림에서 조회
+# [(stock_code, period, market)]의 결과를 완료되는 순서대로 (item, blob 또는 예외)로 반환
+BATCH_CONCURRENCY = 4
+
+async def iter_stock_charts(items: list):
+    cached = await get_stock_chart_blob.get_many(items)
+
+    misses = []
+    for item, blob in zip(items, cached):
+        if blob is not None:
+            yield item, blob
+        else:
+            misses.append(item)
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def load(item):
+        async with semaphore:
+            try:
+                return item, await get_stock_chart_blob(*item)
+            except Exception as e:
+                return item, e
+
+    for next_done in asyncio.as_completed([load(item) for item in misses]):
+        yield await next_done
+
+# 차트 조회 (list of dict)
+async def get_stock_chart(stock_code: str, period: str, market: str = None):
+    return to_records(await get_stock_chart_columns(stock_code, period, market))
+
+# 차트 조회 (JSON 응답 bytes)
+async def get_stock_chart_json(stock_code: str, period: str, market: str = None) -> bytes:
+    return to_json_bytes(await get_stock_chart_columns(stock_code, period, market))
+
+
+# 기간 지정 차트 바이너리 조회 (stale-while-revalidate 캐시)
+@swr_cache(
+    key_fn=lambda stock_code, start, end, market=None: f"chart_range:{stock_code}:{start}:{end}:{market}",
+    soft_ttl=CHART_SOFT_TTL, hard_ttl=CHART_HARD_TTL,
+    encode=identity, decode=identity, db=REDIS_DB,
+)
+async def get_stock_chart_range_blob(stock_code: str, start: date, end: date, market: str = None) -> bytes:
     # 3개월치 데이터를 가져와서 필터링 (이미 캐시되어 있을 가능성 높음)
-    full_data = get_stock_chart(stock_code, "3mo", market)
-
-    # 에러가 반환된 경우 그대로 전달
-    if isinstance(full_data, dict) and "error" in full_data:
-        return full_data
+    full_data = await get_stock_chart_columns(stock_code, "3mo", market)
 
-    # 날짜 필터링
-    filtered = [
-        item for item in full_data
-        if start <= datetime.strptime(item["timestamp"], "%Y-%m-%d").date() <= end
-    ]
+    # 날짜 필터링 (timestamp는 1970-01-01 기준 일수)
+    days = full_data.get("timestamp", np.empty(0, dtype="<i4"))
+    start_day = (np.datetime64(start, "D") - np.datetime64("1970-01-01", "D")).astype(int)
+    end_day = (np.datetime64(end, "D") - np.datetime64("1970-01-01", "D")).astype(int)
+    mask = (days >= start_day) & (days <= end_day)
+    filtered = {name: arr[mask] for name, arr in full_data.items()}
 
-    # Redis에 캐싱 (1시간 TTL)
-    r.setex(cache_key, 3600, json.dumps(filtered))
+    return encode_chart(to_frame(filtered))
 
-    return filtered
\ No newline at end of file
+async def get_stock_chart_range(stock_code: str, start: date, end: date, market: str = None):
+    columns, _ = decode_chart(await get_stock_chart_range_blob(stock_code, start, end, market))
+    return to_records(columns)
@@ -0,0 +1,172 @@
+import json
+import time
+import struct
+import asyncio
+import logging
+import functools
+import redis
+from fastapi.concurrency import run_in_threadpool
+from app.db.redis_service import get_async_redis
+from app.services.single_flight import single_flight
+from app.services.rate_limiter import background_priority
+
+# 캐시 엔트리 = envelope(magic, soft 만료 시각) + payload
+# Redis TTL은 hard TTL로 설정하고, soft 만료 이후에는 stale 값을 반환하면서 백그라운드에서 갱신
+ENVELOPE = struct.Struct("<4sd")
+MAGIC = b"SWR1"
+
+REFRESH_LEASE = 60  # 다른 워커와 갱신이 겹치지 않도록 잡는 마커의 유지 시간(초)
+
+# 프로세스 내에서 갱신 중인 key (중복 갱신 방지)
+_refreshing = set()
+# 실행 중인 백그라운드 갱신 Task (GC 방지용 참조)
+_background_tasks = set()
+
+
+def json_encode(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def json_decode(payload: bytes):
+    return json.loads(payload)
+
+
+def identity(value):
+    return value
+
+
+def pack_entry(payload: bytes, soft_ttl: int) -> bytes:
+    return ENVELOPE.pack(MAGIC, time.time() + soft_ttl) + payload
+
+
+# (payload, soft 만료 시각) 반환, 형식이 다르면 None
+def unpack_entry(entry: bytes):
+    if not entry or len(entry) < ENVELOPE.size:
+        return None
+    magic, soft_expires_at = ENVELOPE.unpack_from(entry, 0)
+    if magic != MAGIC:
+        return None
+    return entry[ENVELOPE.size:], soft_expires_at
+
+
+async def read_entry(client, key: str):
+    try:
+        return unpack_entry(await client.get(key))
+    except redis.RedisError as e:
+        logging.warning(f"캐시 조회 실패 ({key}): {e}")
+        return None
+
+
+async def write_entry(client, key: str, payload: bytes, soft_ttl: int, hard_ttl: int):
+    try:
+        await client.setex(key, hard_ttl, pack_entry(payload, soft_ttl))
+    except redis.RedisError as e:
+        logging.warning(f"캐시 저장 실패 ({key}): {e}")
+
+
+def _schedule_refresh(client, key: str, refresh):
+    if key in _refreshing:
+        return
+    _refreshing.add(key)
+
+    async def run():
+        marker = f"refresh:{key}"
+        try:
+            # 여러 워커가 같은 stale 값을 보더라도 갱신은 한 곳에서만 실행
+            if await client.set(marker, "1", nx=True, ex=REFRESH_LEASE):
+                try:
+                    await refresh()
+                finally:
+                    await client.delete(marker)
+        except Exception as e:
+            logging.warning(f"백그라운드 캐시 갱신 실패 ({key}): {e}")
+        finally:
+            _refreshing.discard(key)
+
+    # 백그라운드 갱신은 사용자 요청보다 낮은 우선순위로 업스트림 호출
+    with background_priority():
+        task = asyncio.create_task(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def swr_cache(key_fn, soft_ttl: int, hard_ttl: int, encode=json_encode, decode=json_decode, db: int = 0):
+    """
+    stale-while-revalidate 캐시 데코레이터
+
+    - soft_ttl 이내: 캐시 값을 그대로 반환
+    - soft_ttl ~ hard_ttl: stale 값을 즉시 반환하고 백그라운드에서 갱신 (key당 한 번만)
+    - hard_ttl 이후(캐시 없음): single_flight로 한 번만 조회한 뒤 저장
+    동기 함수는 스레드풀에서 실행되며, 데코레이터를 거친 함수는 항상 코루틴 함수입니다.
+    wrapper.refresh(*args)로 캐시를 강제로 갱신할 수 있습니다.
+    wrapper.get_many([args, ...])는 여러 key를 MGET 한 번으로 조회합니다 (없으면 None).
+    """
+    def decorator(func):
+        is_coroutine = asyncio.iscoroutinefunction(func)
+
+        async def call(*args, **kwargs):
+            if is_coroutine:
+                return await func(*args, **kwargs)
+            return await run_in_threadpool(func, *args, **kwargs)
+
+        async def refresh(*args, **kwargs):
+            client = get_async_redis(db, decode_responses=False)
+            value = await call(*args, **kwargs)
+            await write_entry(client, key_fn(*args, **kwargs), encode(value), soft_ttl, hard_ttl)
+            return value
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            client = get_async_redis(db, decode_responses=False)
+            key = key_fn(*args, **kwargs)
+
+            entry = await read_entry(client, key)
+            if entry is not None:
+                payload, soft_expires_at = entry
+                try:
+                    value = decode(payload)
+                except ValueError:
+                    value = None
+                if value is not None:
+                    if time.time() >= soft_expires_at:
+                        _schedule_refresh(client, key, lambda: refresh(*args, **kwargs))
+                    return value
+
+            async def read_fresh():
+                fresh = await read_entry(client, key)
+                if fresh is None or time.time() >= fresh[1]:
+                    return None
+                return decode(fresh[0])
+
+            return await single_flight(key, lambda: refresh(*args, **kwargs), check_cache=read_fresh)
+
+        async def get_many(args_list):
+            client = get_async_redis(db, decode_responses=False)
+            keys = [key_fn(*args) for args in args_list]
+            try:
+                entries = await client.mget(keys)
+            except redis.RedisError as e:
+                logging.warning(f"캐시 일괄 조회 실패: {e}")
+                return [None] * len(keys)
+
+            now = time.time()
+            values = []
+            for args, key, raw in zip(args_list, keys, entries):
+                entry = unpack_entry(raw)
+                value = None
+                if entry is not None:
+                    try:
+                        value = decode(entry[0])
+                    except ValueError:
+                        value = None
+                    if value is not None and now >= entry[1]:
+                        _schedule_refresh(client, key, functools.partial(refresh, *args))
+                values.append(value)
+            return values
+
+        wrapper.refresh = refresh
+        wrapper.get_many = get_many
+        wrapper.cache_key = key_fn
+        return wrapper
+
+    return decorator
@@ -0,0 +1,98 @@
+"""
+종목별 최근 체결 버퍼
+
+종목마다 고정 크기 numpy 구조체 배열을 링 버퍼로 사용해 최근 체결을 보관합니다.
+새 구독자에게 보내는 스냅샷(최신가 + 최근 체결)과 최근 체결 조회 API에 사용합니다.
+"""
+import os
+from collections import OrderedDict
+import numpy as np
+
+TICK_BUFFER_SIZE = int(os.getenv("TICK_BUFFER_SIZE", 256))      # 종목당 보관하는 체결 수
+TICK_BUFFER_CODES = int(os.getenv("TICK_BUFFER_CODES", 1000))   # 버퍼를 유지하는 최대 종목 수 (오래 사용하지 않은 종목부터 제거)
+SNAPSHOT_TICKS = int(os.getenv("WS_SNAPSHOT_TICKS", 20))         # 구독 시 보내는 기본 체결 수
+
+TICK_DTYPE = np.dtype([
+    ("execution_time", "U6"),
+    ("current_price", "f8"),
+    ("change", "f8"),
+    ("fluctuation_rate", "f8"),
+    ("volume", "i8"),
+])
+
+
+class TickRing:
+    """고정 크기 체결 링 버퍼 (가득 차면 가장 오래된 체결을 덮어씀)"""
+
+    def __init__(self, code: str, capacity: int = TICK_BUFFER_SIZE):
+        self.code = code
+        self.data = np.zeros(capacity, dtype=TICK_DTYPE)
+        self.head = 0     # 다음에 쓸 위치
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, tick: dict):
+        self.data[self.head] = (
+            tick["execution_time"], tick["current_price"], tick["change"],
+            tick["fluctuation_rate"], tick["volume"],
+        )
+        self.head = (self.head + 1) % len(self.data)
+        self.count = min(self.count + 1, len(self.data))
+
+    def recent(self, n: int) -> np.ndarray:
+        """최근 n개 체결 (오래된 순)"""
+        n = min(n, self.count)
+        index = (self.head - n + np.arange(n)) % len(self.data)
+        return self.data[index]
+
+    def to_dicts(self, rows: np.ndarray) -> list:
+        return [
+            {
+                "stock_code": self.code,
+                "execution_time": str(row["execution_time"]),
+                "current_price": float(row["current_price"]),
+                "change": float(row["change"]),
+                "fluctuation_rate": float(row["fluctuation_rate"]),
+                "volume": int(row["volume"]),
+            }
+            for row in rows
+        ]
+
+
+class TickStore:
+    """종목코드 -> TickRing"""
+
+    def __init__(self, capacity: int = TICK_BUFFER_SIZE, max_codes: int = TICK_BUFFER_CODES):
+        self.capacity = capacity
+        self.max_codes = max_codes
+        self.rings = OrderedDict()
+
+    def append(self, code: str, tick: dict):
+        ring = self.rings.get(code)
+        if ring is None:
+            ring = self.rings[code] = TickRing(code, self.capacity)
+            if len(self.rings) > self.max_codes:
+                self.rings.popitem(last=False)
+        else:
+            self.rings.move_to_end(code)
+        ring.append(tick)
+
+    def recent(self, code: str, n: int) -> list:
+        """최근 n개 체결 (오래된 순, 없으면 빈 리스트)"""
+        ring = self.rings.get(code)
+        if ring is None or n <= 0:
+            return []
+        return ring.to_dicts(ring.recent(n))
+
+    def snapshot(self, code: str, n: int = SNAPSHOT_TICKS):
+        """구독 직후 보낼 스냅샷 (보관된 체결이 없으면 None)"""
+        ring = self.rings.get(code)
+        if ring is None or not len(ring):
+            return None
+        ticks = ring.to_dicts(ring.recent(max(n, 1)))
+        return {"status": "snapshot", "stock_code": code, "last": ticks[-1], "ticks": ticks[-n:] if n else []}
+
+    def __len__(self):
+        return len(self.rings)
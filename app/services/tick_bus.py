@@ -0,0 +1,219 @@
+"""
+워커 간 실시간 체결 배포 (Redis pub/sub)
+
+WS_DISTRIBUTION=redis 로 실행하면
+- 리더 워커 하나만 키움 WebSocket에 연결합니다. (Redis 임대 ws:leader)
+- 각 워커는 자기 클라이언트가 구독한 종목을 ws:demand:{worker_id}에 등록하고,
+  리더는 모든 워커의 구독 종목 합집합만 키움에 REG 합니다.
+- 리더는 체결을 ws:ticks:{종목코드} 채널로 발행하고, 각 워커는 필요한 채널만 구독해 자기 클라이언트에 전송합니다.
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import redis
+from app.db.redis_service import get_async_redis
+
+BUS_DB = 0
+LEADER_KEY = "ws:leader"
+WORKERS_KEY = "ws:workers"
+CONTROL_CHANNEL = "ws:control"
+STATUS_CHANNEL = "ws:status"   # 리더 연결 상태(끊김/재개)를 모든 워커의 클라이언트에 알림
+TICK_CHANNEL_PREFIX = "ws:ticks:"
+
+LEASE_MS = int(os.getenv("WS_LEADER_LEASE_MS", 15_000))   # 리더 임대 시간
+HEARTBEAT = LEASE_MS / 3000                               # 임대 연장, 구독 목록 갱신 주기(초)
+DEMAND_TTL = int(LEASE_MS / 1000 * 2)                     # 응답 없는 워커의 구독 목록 유지 시간(초)
+SYNC_DEBOUNCE = 0.05                                      # 구독 변경을 모아서 반영하는 시간(초)
+
+# 리더만 임대를 연장/해제할 수 있도록 값 비교 후 처리
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def tick_channel(code: str) -> str:
+    return f"{TICK_CHANNEL_PREFIX}{code}"
+
+
+def _demand_key(worker_id: str) -> str:
+    return f"ws:demand:{worker_id}"
+
+
+class TickBus:
+    def __init__(self, manager):
+        self.manager = manager
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.client = get_async_redis(BUS_DB)
+        self.pubsub = None
+        self.is_leader = False
+        self.local_codes = set()
+        self.sync_event = asyncio.Event()
+        self.tasks = []
+        self.published = 0
+        self.received = 0
+
+    async def start(self):
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self.pubsub.subscribe(CONTROL_CHANNEL, STATUS_CHANNEL)
+        self.tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._heartbeat()),
+            asyncio.create_task(self._sync_loop()),
+        ]
+        logging.info(f"실시간 체결 배포(redis)를 시작합니다. worker: {self.worker_id}")
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+        try:
+            if self.is_leader:
+                await self.client.eval(_RELEASE_SCRIPT, 1, LEADER_KEY, self.worker_id)
+            await self.client.delete(_demand_key(self.worker_id))
+            await self.client.zrem(WORKERS_KEY, self.worker_id)
+            await self.client.publish(CONTROL_CHANNEL, "changed")
+        except redis.RedisError as e:
+            logging.warning(f"실시간 배포 정리 실패: {e}")
+        if self.is_leader:
+            self.is_leader = False
+            await self.manager.sync_upstream(set())
+        if self.pubsub is not None:
+            await self.pubsub.close()
+            self.pubsub = None
+
+    # 로컬 클라이언트가 종목을 처음 구독하거나 모두 해지할 때 호출
+    async def add_interest(self, code: str):
+        self.local_codes.add(code)
+        await self.pubsub.subscribe(tick_channel(code))
+        pipe = self.client.pipeline(transaction=False)
+        pipe.sadd(_demand_key(self.worker_id), code)
+        pipe.expire(_demand_key(self.worker_id), DEMAND_TTL)
+        pipe.zadd(WORKERS_KEY, {self.worker_id: time.time()})
+        pipe.publish(CONTROL_CHANNEL, "changed")
+        await pipe.execute()
+
+    async def remove_interest(self, code: str):
+        self.local_codes.discard(code)
+        await self.pubsub.unsubscribe(tick_channel(code))
+        pipe = self.client.pipeline(transaction=False)
+        pipe.srem(_demand_key(self.worker_id), code)
+        pipe.publish(CONTROL_CHANNEL, "changed")
+        await pipe.execute()
+
+    # 리더: 체결 발행 (모든 워커가 자기 구독자에게 전송)
+    async def publish(self, code: str, trade_info: dict):
+        try:
+            await self.client.publish(tick_channel(code), json.dumps(trade_info))
+            self.published += 1
+        except redis.RedisError as e:
+            logging.warning(f"체결 발행 실패 ({code}): {e}")
+
+    # 리더: 연결 상태 발행
+    async def publish_status(self, payload: dict):
+        try:
+            await self.client.publish(STATUS_CHANNEL, json.dumps(payload, ensure_ascii=False))
+        except redis.RedisError as e:
+            logging.warning(f"연결 상태 발행 실패: {e}")
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"실시간 배포 수신 오류: {e}")
+                await asyncio.sleep(1)
+                continue
+            if message is None:
+                continue
+
+            channel = message["channel"]
+            if channel == CONTROL_CHANNEL:
+                if self.is_leader:
+                    self.sync_event.set()
+                continue
+            try:
+                if channel == STATUS_CHANNEL:
+                    self.manager.notify_clients(json.loads(message["data"]))
+                elif channel.startswith(TICK_CHANNEL_PREFIX):
+                    self.received += 1
+                    data = message["data"]
+                    # 발행된 JSON을 그대로 재사용 (워커에서 다시 직렬화하지 않음)
+                    self.manager.dispatch(channel[len(TICK_CHANNEL_PREFIX):], json.loads(data), encoded=data)
+            except (ValueError, KeyError, TypeError) as e:
+                logging.warning(f"실시간 배포 메시지 처리 실패 ({channel}): {e}")
+
+    async def _heartbeat(self):
+        while True:
+            try:
+                pipe = self.client.pipeline(transaction=False)
+                pipe.zadd(WORKERS_KEY, {self.worker_id: time.time()})
+                if self.local_codes:
+                    pipe.sadd(_demand_key(self.worker_id), *self.local_codes)
+                    pipe.expire(_demand_key(self.worker_id), DEMAND_TTL)
+                await pipe.execute()
+                await self._elect()
+            except asyncio.CancelledError:
+                raise
+            except redis.RedisError as e:
+                logging.warning(f"실시간 배포 heartbeat 실패: {e}")
+                await self._step_down()
+            await asyncio.sleep(HEARTBEAT)
+
+    async def _elect(self):
+        if self.is_leader:
+            if await self.client.eval(_RENEW_SCRIPT, 1, LEADER_KEY, self.worker_id, LEASE_MS):
+                self.sync_event.set()  # 주기적으로 전체 구독 목록과 맞춤
+                return
+            logging.warning("리더 임대를 잃었습니다.")
+            await self._step_down()
+        elif await self.client.set(LEADER_KEY, self.worker_id, nx=True, px=LEASE_MS):
+            logging.info(f"키움 WebSocket 리더가 되었습니다. worker: {self.worker_id}")
+            self.is_leader = True
+            self.sync_event.set()
+
+    async def _step_down(self):
+        if self.is_leader:
+            self.is_leader = False
+            await self.manager.sync_upstream(set())
+
+    # 리더: 살아있는 워커들의 구독 종목 합집합을 키움 구독과 맞춤
+    async def _sync_loop(self):
+        while True:
+            await self.sync_event.wait()
+            await asyncio.sleep(SYNC_DEBOUNCE)
+            self.sync_event.clear()
+            if not self.is_leader:
+                continue
+            try:
+                now = time.time()
+                await self.client.zremrangebyscore(WORKERS_KEY, 0, now - DEMAND_TTL)
+                workers = await self.client.zrange(WORKERS_KEY, 0, -1)
+                keys = [_demand_key(w) for w in workers]
+                codes = await self.client.sunion(keys) if keys else set()
+                await self.manager.sync_upstream(set(codes))
+            except Exception as e:
+                logging.warning(f"구독 목록 동기화 실패: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "is_leader": self.is_leader,
+            "local_codes": len(self.local_codes),
+            "published": self.published,
+            "received": self.received,
+        }
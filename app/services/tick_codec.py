@@ -0,0 +1,137 @@
+"""
+실시간 체결 바이너리 프레임 (WebSocket ?encoding=binary)
+
+체결 하나를 고정 길이 struct 프레임으로 인코딩합니다. (little endian)
+    keyframe (23 bytes) : type(B)=1 symbol(H) seq(H) time(I) price(i) change(i) rate(h) volume(i)
+    delta    (15 bytes) : type(B)=2 symbol(H) seq(H) d_time(H) d_price(h) d_rate(h) volume(i)
+
+- symbol : 종목 번호. 구독 시 텍스트 메시지 {"status": "symbol", "stock_code", "symbol"}로 알려줍니다.
+- seq    : 종목별 프레임 번호 (uint16, 순환). delta는 seq가 바로 이전 프레임의 것이어야 적용할 수 있고,
+           중간 프레임을 놓친 클라이언트는 다음 keyframe부터 다시 적용합니다.
+- time   : 체결시간의 자정 이후 초, price/change : 원, rate : 등락률 x 100, volume : 체결량(부호 포함)
+- delta  : 직전 프레임 대비 증감 (전일대비는 가격 증감과 같음). 범위를 넘으면 keyframe을 보냅니다.
+
+프레임은 종목별로 한 번만 만들어 그 종목의 바이너리 구독자 모두에게 같은 bytes를 보냅니다.
+"""
+import os
+import struct
+
+KEYFRAME = 1
+DELTA = 2
+
+KEY_STRUCT = struct.Struct("<BHHIiihi")
+DELTA_STRUCT = struct.Struct("<BHHHhhi")
+
+KEYFRAME_EVERY = int(os.getenv("WS_KEYFRAME_EVERY", 32))   # 이 수만큼 delta를 보낸 뒤 keyframe
+
+_I16 = (-0x8000, 0x7FFF)
+
+
+def _seconds(execution_time: str) -> int:
+    try:
+        return int(execution_time[0:2]) * 3600 + int(execution_time[2:4]) * 60 + int(execution_time[4:6])
+    except (TypeError, ValueError):
+        return 0
+
+
+def _values(tick: dict) -> tuple:
+    return (
+        _seconds(tick["execution_time"]),
+        int(round(tick["current_price"])),
+        int(round(tick["change"])),
+        int(round(tick["fluctuation_rate"] * 100)),
+        int(tick["volume"]),
+    )
+
+
+class _State:
+    __slots__ = ("symbol", "seq", "values", "since_key", "fresh")
+
+    def __init__(self, symbol: int):
+        self.symbol = symbol
+        self.seq = 0
+        self.values = None      # 마지막으로 인코딩한 (time, price, change, rate, volume)
+        self.since_key = 0
+        self.fresh = False      # values가 직전 체결인지 (바이너리 구독자가 없던 체결이 있으면 False)
+
+
+class TickEncoder:
+    """종목별 마지막 프레임 상태를 보관하는 인코더 (프로세스 하나에 하나)"""
+
+    def __init__(self, keyframe_every: int = KEYFRAME_EVERY):
+        self.keyframe_every = keyframe_every
+        self.states = {}
+
+    def _state(self, code: str) -> _State:
+        state = self.states.get(code)
+        if state is None:
+            if len(self.states) > 0xFFFF:
+                raise ValueError("바이너리 종목 번호를 모두 사용했습니다.")
+            state = self.states[code] = _State(len(self.states))
+        return state
+
+    def symbol(self, code: str) -> int:
+        return self._state(code).symbol
+
+    def _keyframe(self, state: _State) -> bytes:
+        return KEY_STRUCT.pack(KEYFRAME, state.symbol, state.seq, *state.values)
+
+    def encode(self, code: str, tick: dict) -> bytes:
+        """체결 하나를 프레임으로 인코딩하고 상태를 갱신합니다. (종목의 모든 바이너리 구독자가 공유)"""
+        state = self._state(code)
+        values = _values(tick)
+        previous = state.values
+        state.seq = (state.seq + 1) & 0xFFFF
+        state.values = values
+
+        if previous is not None and state.fresh and state.since_key < self.keyframe_every:
+            d_time = values[0] - previous[0]
+            d_price = values[1] - previous[1]
+            d_rate = values[3] - previous[3]
+            if (0 <= d_time <= 0xFFFF and _I16[0] <= d_price <= _I16[1] and _I16[0] <= d_rate <= _I16[1]
+                    and values[2] - previous[2] == d_price):
+                state.since_key += 1
+                return DELTA_STRUCT.pack(DELTA, state.symbol, state.seq, d_time, d_price, d_rate, values[4])
+
+        state.fresh = True
+        state.since_key = 0
+        return self._keyframe(state)
+
+    def skip(self, code: str):
+        """바이너리 구독자 없이 지나간 체결 (다음 프레임은 keyframe)"""
+        state = self.states.get(code)
+        if state is not None:
+            state.fresh = False
+
+    def resync(self, code: str, last_tick: dict = None):
+        """
+        새 바이너리 구독자에게 보낼 keyframe. 기존 구독자가 받은 마지막 프레임과 같은 상태를 보내
+        이후 delta를 그대로 적용할 수 있게 합니다. 상태가 오래되었으면 last_tick으로 새로 만듭니다.
+        """
+        state = self._state(code)
+        if state.values is not None and state.fresh:
+            return self._keyframe(state)
+        if last_tick is None:
+            return None
+        return self.encode(code, last_tick)
+
+    def keyframe(self, code: str, tick: dict) -> bytes:
+        """상태를 바꾸지 않는 단독 keyframe (최신 값만 받는 conflation 구독용)"""
+        state = self._state(code)
+        return KEY_STRUCT.pack(KEYFRAME, state.symbol, state.seq, *_values(tick))
+
+
+def decode(frame: bytes, previous: tuple = None) -> tuple:
+    """
+    프레임 → (symbol, seq, (time, price, change, rate, volume)) (클라이언트 구현 참고/검증용)
+    delta는 previous(같은 종목의 직전 값)가 필요합니다.
+    """
+    if frame[0] == KEYFRAME:
+        _, symbol, seq, *values = KEY_STRUCT.unpack(frame)
+        return symbol, seq, tuple(values)
+    _, symbol, seq, d_time, d_price, d_rate, volume = DELTA_STRUCT.unpack(frame)
+    if previous is None:
+        raise ValueError("delta 프레임에는 직전 값이 필요합니다.")
+    return symbol, seq, (
+        previous[0] + d_time, previous[1] + d_price, previous[2] + d_price, previous[3] + d_rate, volume,
+    )
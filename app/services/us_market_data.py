@@ -0,0 +1,142 @@
+"""
+해외 시세 조회 (yfinance)
+
+- 세션: curl_cffi 브라우저 위장 세션 하나를 재사용 (TLS 연결, 쿠키/crumb 재협상 방지)
+- 일괄 조회: 짧은 시간(BATCH_WINDOW) 동안 들어온 요청을 (period, interval)별로 모아
+  종목별 Ticker.history를 공유 스레드 풀에서 동시에 받고, 결과를 기다리던 호출자에게 나눠줍니다.
+  yf.download는 모듈 전역 상태(shared._DFS)를 사용해 프로세스에서 한 번에 하나만 실행할 수 있으므로 쓰지 않으며,
+  서로 다른 (period, interval) 배치도 동시에 진행됩니다. (동시 요청 수는 DOWNLOAD_THREADS로 제한)
+"""
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import yfinance as yf
+from curl_cffi import requests
+from fastapi.concurrency import run_in_threadpool
+from app.services import metrics
+
+BATCH_WINDOW = float(os.getenv("YF_BATCH_WINDOW", 0.05))  # 요청을 모으는 시간(초)
+MAX_BATCH = int(os.getenv("YF_MAX_BATCH", 20))             # 한 번에 조회하는 최대 종목 수
+DOWNLOAD_THREADS = int(os.getenv("YF_DOWNLOAD_THREADS", 8))  # 프로세스 전체의 동시 Yahoo 요청 수
+
+_session = None
+_session_lock = threading.Lock()
+# 종목별 조회를 실행하는 공유 스레드 풀 (모든 배치가 함께 사용)
+_executor = ThreadPoolExecutor(max_workers=DOWNLOAD_THREADS, thread_name_prefix="yfinance")
+
+
+# 공유 세션 반환 (yfinance는 세션과 crumb를 프로세스 전역으로 관리하므로 세션도 하나만 사용)
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session(impersonate="chrome")
+        return _session
+
+
+# 요청이 실패하면 다음 조회에서 새 세션으로 다시 협상
+def reset_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+# 종목 하나 조회 (yf.download와 같은 옵션, 일/주/월봉은 거래소 현지 시각으로 tz 제거)
+def _download_one(ticker: str, period: str, interval: str) -> pd.DataFrame:
+    df = yf.Ticker(ticker, session=get_session()).history(
+        period=period, interval=interval, auto_adjust=True, actions=False, raise_errors=True,
+    )
+    if df.empty:
+        return pd.DataFrame()
+    if interval[-1] not in ("m", "h") and df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    df = df.dropna(how="all")
+    df.index.name = "Date"
+    return df
+
+
+# 여러 종목을 공유 스레드 풀에서 동시에 조회 → {ticker: DataFrame}
+# 실패한 종목은 (yf.download와 같이) 빈 DataFrame, 모두 실패하면 다음 조회에서 새 세션으로 다시 협상
+def _download_batch(tickers: list, period: str, interval: str) -> dict:
+    futures = {ticker: _executor.submit(_download_one, ticker, period, interval) for ticker in tickers}
+    frames = {}
+    failed = 0
+    for ticker, future in futures.items():
+        try:
+            frames[ticker] = future.result()
+        except Exception as e:
+            logging.warning(f"yfinance 조회 실패 {ticker} ({period}, {interval}): {e}")
+            frames[ticker] = pd.DataFrame()
+            failed += 1
+    if failed == len(tickers):
+        reset_session()
+    return frames
+
+
+class _Batcher:
+    def __init__(self, window: float, max_batch: int):
+        self.window = window
+        self.max_batch = max_batch
+        # (period, interval) -> ({ticker: Future}, 예약된 flush 핸들)
+        self.pending = {}
+        # 실행 중인 조회 Task (GC 방지용 참조)
+        self.tasks = set()
+
+    async def get(self, ticker: str, period: str, interval: str) -> pd.DataFrame:
+        loop = asyncio.get_running_loop()
+        key = (period, interval)
+        if key not in self.pending:
+            handle = loop.call_later(self.window, self._flush, key)
+            self.pending[key] = ({}, handle)
+        group, handle = self.pending[key]
+
+        future = group.get(ticker)
+        if future is None:
+            future = group[ticker] = loop.create_future()
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            if len(group) >= self.max_batch:
+                handle.cancel()
+                self._flush(key)
+
+        # 호출자 하나가 취소되어도 같은 배치의 다른 호출자는 결과를 받음
+        return await asyncio.shield(future)
+
+    def _flush(self, key):
+        group, _ = self.pending.pop(key, (None, None))
+        if group:
+            task = asyncio.ensure_future(self._run(key, group))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, key, group: dict):
+        period, interval = key
+        tickers = list(group)
+        await metrics.incr("yfinance.batches")
+        await metrics.observe("yfinance.batch_size", len(tickers))
+        try:
+            frames = await run_in_threadpool(_download_batch, tickers, period, interval)
+        except Exception as e:
+            logging.warning(f"yfinance 일괄 조회 실패 {tickers} ({period}, {interval}): {e}")
+            for future in group.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for ticker, future in group.items():
+            if not future.done():
+                future.set_result(frames.get(ticker, pd.DataFrame()))
+
+
+_batcher = _Batcher(BATCH_WINDOW, MAX_BATCH)
+
+
+async def get_history(ticker: str, period: str, interval: str) -> pd.DataFrame:
+    """
+    종목의 시세(Open, High, Low, Close, Volume)를 반환합니다. 데이터가 없으면 빈 DataFrame.
+    같은 시점에 들어온 다른 종목/같은 종목 요청과 묶어서 조회합니다.
+    """
+    return await _batcher.get(ticker, period, interval)
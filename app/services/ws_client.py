@@ -0,0 +1,164 @@
+import os
+import json
+import asyncio
+import logging
+from fastapi import WebSocket
+
+# 클라이언트별 송신 큐 설정
+SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 256))   # 클라이언트당 대기 메시지 수
+SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", 5))         # 메시지 하나를 보내는 최대 시간(초)
+# 큐가 가득 찼을 때: drop_oldest(오래된 메시지 버림) | disconnect(연결 종료)
+DROP_POLICY = os.getenv("WS_DROP_POLICY", "drop_oldest")
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+MAX_HZ = 50   # 구독 시 지정할 수 있는 최대 전송 빈도(초당)
+
+
+class ClientChannel:
+    """
+    WebSocket 클라이언트 하나의 송신 채널
+    리더는 offer()로 큐에 넣기만 하고, 실제 전송은 클라이언트별 writer Task가 담당합니다.
+    느린 클라이언트는 자기 큐만 가득 차고, 다른 클라이언트나 리더를 막지 않습니다.
+
+    conflation: 종목별로 최신 틱 하나만 보관하고 max_hz 간격으로(0이면 writer가 비는 대로) 전송합니다.
+    보관 중인 틱은 dict 그대로 두었다가 전송 직전에 한 번만 JSON(또는 encode 함수)으로 만듭니다.
+
+    binary: 체결을 바이너리 프레임(app/services/tick_codec.py)으로 받는 클라이언트
+    큐에 들어온 bytes는 바이너리 프레임, str은 텍스트 프레임으로 전송합니다.
+    """
+
+    def __init__(self, websocket: WebSocket, maxsize: int = SEND_QUEUE_SIZE, policy: str = DROP_POLICY, binary: bool = False):
+        self.websocket = websocket
+        self.binary = binary
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.policy = policy
+        self.closed = False
+        self.close_task = None
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.conflate = {}    # 종목코드 -> 최소 전송 간격(초)
+        self.latest = {}      # 종목코드 -> (아직 보내지 않은 최신 틱, encode 함수)
+        self.next_due = {}    # 종목코드 -> 다음 전송 가능 시각
+        self.wakeup = asyncio.Event()
+        self.writer_task = asyncio.create_task(self._writer())
+
+    def offer(self, message) -> bool:
+        """메시지를 큐에 넣습니다. (대기하지 않음) 넣지 못하면 False"""
+        if self.closed:
+            return False
+        if self.queue.full():
+            if self.policy == DISCONNECT:
+                logging.warning(f"송신 큐가 가득 차 클라이언트 연결을 종료합니다: {self.websocket}")
+                self.dropped += 1
+                self.close()
+                return False
+            # 가장 오래된 메시지를 버리고 최신 메시지를 넣음
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        self.wakeup.set()
+        return True
+
+    def offer_json(self, payload) -> bool:
+        return self.offer(json.dumps(payload, ensure_ascii=False))
+
+    def set_conflation(self, code: str, max_hz: float = None):
+        """code의 틱을 최신 값만 남기도록 설정 (max_hz가 없으면 writer가 비는 대로 전송)"""
+        self.conflate[code] = 1 / max_hz if max_hz else 0.0
+
+    def clear_conflation(self, code: str):
+        self.conflate.pop(code, None)
+        self.latest.pop(code, None)
+        self.next_due.pop(code, None)
+
+    def is_conflated(self, code: str) -> bool:
+        return code in self.conflate
+
+    def offer_latest(self, code: str, tick: dict, encode=None):
+        """conflation 구독의 틱 보관 (이전에 보내지 못한 틱은 덮어씀), encode(code, tick)가 없으면 JSON으로 전송"""
+        if self.closed:
+            return
+        if code in self.latest:
+            self.coalesced += 1
+        self.latest[code] = (tick, encode)
+        self.wakeup.set()
+
+    async def _next(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.queue.empty():
+                return self.queue.get_nowait()
+
+            now = loop.time()
+            wait = None
+            for code, (tick, encode) in self.latest.items():
+                due = self.next_due.get(code, 0)
+                if now >= due:
+                    del self.latest[code]
+                    self.next_due[code] = now + self.conflate.get(code, 0)
+                    if encode is not None:
+                        return encode(code, tick)
+                    return json.dumps(tick, ensure_ascii=False)
+                wait = due - now if wait is None else min(wait, due - now)
+
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _writer(self):
+        try:
+            while True:
+                message = await self._next()
+                if isinstance(message, bytes):
+                    await asyncio.wait_for(self.websocket.send_bytes(message), SEND_TIMEOUT)
+                else:
+                    await asyncio.wait_for(self.websocket.send_text(message), SEND_TIMEOUT)
+                self.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            logging.warning(f"전송 시간 초과로 클라이언트 연결을 종료합니다: {self.websocket}")
+            await self._close_socket()
+        except Exception as e:
+            logging.info(f"클라이언트 전송 중단: {e}")
+        finally:
+            self.closed = True
+
+    async def _close_socket(self):
+        try:
+            await self.websocket.close(code=1013)  # Try Again Later
+        except Exception:
+            pass
+
+    def close(self):
+        """writer를 중지하고 소켓을 닫습니다. (느린 클라이언트 정리)"""
+        if self.closed:
+            return
+        self.closed = True
+        self.writer_task.cancel()
+        self.close_task = asyncio.create_task(self._close_socket())
+
+    def stop(self):
+        """클라이언트가 이미 연결을 종료한 경우 writer만 중지합니다."""
+        self.closed = True
+        self.writer_task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "client": f"{self.websocket.client.host}:{self.websocket.client.port}" if self.websocket.client else None,
+            "binary": self.binary,
+            "queue_depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "conflated_codes": len(self.conflate),
+            "closed": self.closed,
+        }
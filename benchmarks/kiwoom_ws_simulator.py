@@ -0,0 +1,125 @@
+"""
+로컬 Kiwoom 실시간 WebSocket 시뮬레이터
+
+KiwoomConnectionManager가 사용하는 LOGIN / REG / REMOVE / PING / REAL(주식체결) 메시지만 흉내 냅니다.
+등록된 종목마다 초당 rate개의 가짜 체결을 보내며, 체결량(15) 필드에는 종목별 일련번호를 넣어
+벤치마크가 보낸 시각(sent)과 받은 시각을 짝지을 수 있게 합니다. (토큰은 검사하지 않음)
+
+실행: python -m benchmarks.kiwoom_ws_simulator [포트] [종목당 초당 체결 수]
+서버: KIWOOM_SOCKET_URL=ws://127.0.0.1:포트 uvicorn app.main:app
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+from datetime import datetime
+import websockets
+from websockets.exceptions import ConnectionClosed
+
+PING_INTERVAL = 10   # PING 전송 주기(초)
+
+
+class KiwoomSimulator:
+    def __init__(self, host: str = "127.0.0.1", port: int = 18700, rate: float = 5.0, record: bool = False):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.record = record  # 체결별 보낸 시각 기록 (지연 측정용)
+        self.server = None
+        self.sent = {}        # (종목코드, 일련번호) -> 보낸 시각(perf_counter)
+        self.sent_count = 0
+        self.reg_frames = 0
+        self.connections = 0
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self.server = await websockets.serve(self._handle, self.host, self.port, max_size=None)
+        logging.info(f"Kiwoom 시뮬레이터 시작: {self.url} (종목당 초당 {self.rate}건)")
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle(self, ws):
+        self.connections += 1
+        groups = {}       # grp_no -> 종목코드 set
+        tasks = []
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                trnm = message.get("trnm")
+                if trnm == "LOGIN":
+                    await ws.send(json.dumps({"trnm": "LOGIN", "return_code": 0, "return_msg": ""}))
+                    tasks = [asyncio.create_task(self._ping(ws)), asyncio.create_task(self._emit(ws, groups))]
+                elif trnm in ("REG", "REMOVE"):
+                    self.reg_frames += 1
+                    codes = groups.setdefault(message["grp_no"], set())
+                    items = [item for data in message.get("data", []) for item in data.get("item", [])]
+                    if trnm == "REG":
+                        codes.update(items)
+                    else:
+                        codes.difference_update(items or codes)
+                    await ws.send(json.dumps({"trnm": trnm, "return_code": 0, "return_msg": ""}))
+        except ConnectionClosed:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _ping(self, ws):
+        while True:
+            await asyncio.sleep(PING_INTERVAL)
+            await ws.send(json.dumps({"trnm": "PING"}))
+
+    async def _emit(self, ws, groups: dict):
+        """등록된 종목마다 1/rate초 간격으로 체결 하나씩 전송"""
+        seq = {}
+        price = {}
+        period = 1 / self.rate
+        next_at = time.perf_counter()
+        while True:
+            next_at += period
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            now = datetime.now().strftime("%H%M%S")
+            for code in {c for codes in groups.values() for c in codes}:
+                n = seq[code] = seq.get(code, 0) + 1
+                base = price.setdefault(code, random.randint(1_000, 200_000))
+                current = base + random.randint(-20, 20) * 10
+                values = {
+                    "20": now,
+                    "10": f"+{current}",
+                    "11": f"{current - base:+d}",
+                    "12": f"{(current - base) / base * 100:+.2f}",
+                    "15": f"+{n}",
+                }
+                message = json.dumps({"trnm": "REAL", "data": [
+                    {"type": "0B", "name": "주식체결", "item": code, "values": values},
+                ]})
+                if self.record:
+                    self.sent[(code, n)] = time.perf_counter()
+                self.sent_count += 1
+                await ws.send(message)
+
+
+async def _serve(port: int, rate: float):
+    simulator = KiwoomSimulator(port=port, rate=rate)
+    await simulator.start()
+    await asyncio.Future()
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 18700
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve(port, rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+해외 차트 후처리 마이크로벤치마크 (행 단위 루프 vs 컬럼 연산)
+
+실행: python -m benchmarks.us_chart_postprocess [행 수] [반복 횟수]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+from app.services.stock_service import postprocess_us_history
+from app.services.chart_codec import encode_chart
+
+USD_TO_KRW = 1387.5
+
+
+# yfinance history()와 같은 형태의 가짜 데이터
+def make_history(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+    index = pd.date_range("1980-01-01", periods=rows, freq="D", tz="America/New_York", name="Date")
+    return pd.DataFrame({
+        "Open": close * rng.uniform(0.98, 1.02, rows),
+        "High": close * 1.03,
+        "Low": close * 0.97,
+        "Close": close,
+        "Volume": rng.integers(1_000, 10_000_000, rows),
+        "Dividends": 0.0,
+        "Stock Splits": 0.0,
+    }, index=index)
+
+
+# 기존 구현 (행마다 dict를 만들어 반올림/원화 환산)
+def postprocess_loop(df: pd.DataFrame, usd_to_krw: float) -> pd.DataFrame:
+    df = df.reset_index()
+    df["timestamp"] = df["Date"].dt.strftime("%Y-%m-%d")
+    df = df[["timestamp", "Open", "High", "Low", "Close", "Volume"]]
+    df = df.rename(columns={"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"})
+    df["fluctuation_rate"] = (df["close"].pct_change() * 100).round(2)
+    df = df.dropna()
+
+    result = []
+    for row in df.to_dict(orient="records"):
+        item = dict(row)
+        for name in ["open", "high", "low", "close"]:
+            item[name] = round(item[name], 2)
+            item[f"{name}_krw"] = int(item[name] * usd_to_krw)
+        result.append(item)
+    return pd.DataFrame(result)
+
+
+def bench(func, df, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = func(df, USD_TO_KRW)
+        best = min(best, time.perf_counter() - started)
+    return out, best
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 12_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    df = make_history(rows)
+
+    before, t_before = bench(postprocess_loop, df, repeat)
+    after, t_after = bench(postprocess_us_history, df, repeat)
+
+    krw_columns = [f"{name}_krw" for name in ["open", "high", "low", "close"]]
+    dates = after["timestamp"].dt.strftime("%Y-%m-%d").to_numpy()
+    mismatched = int(((before[krw_columns].to_numpy() != after[krw_columns].to_numpy()).any(axis=1)
+                      | (before["timestamp"].to_numpy() != dates)).sum())
+
+    print(f"rows: {rows}, repeat: {repeat} (best)")
+    print(f"loop      : {t_before * 1000:8.2f} ms  {rows / t_before:12,.0f} rows/s")
+    print(f"vectorized: {t_after * 1000:8.2f} ms  {rows / t_after:12,.0f} rows/s")
+    print(f"speedup   : {t_before / t_after:.1f}x, 불일치 행: {mismatched}")
+
+    # 캐시 저장까지 포함한 전체 처리 시간
+    _, t_before = bench(lambda d, r: encode_chart(postprocess_loop(d, r)), df, repeat)
+    _, t_after = bench(lambda d, r: encode_chart(postprocess_us_history(d, r)), df, repeat)
+    print("+ encode_chart")
+    print(f"loop      : {t_before * 1000:8.2f} ms  {rows / t_before:12,.0f} rows/s")
+    print(f"vectorized: {t_after * 1000:8.2f} ms  {rows / t_after:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
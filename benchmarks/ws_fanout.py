@@ -0,0 +1,235 @@
+"""
+실시간 시세 fan-out 부하 벤치마크 (/api/stock/ws/trade-price)
+
+Kiwoom 대신 로컬 시뮬레이터(benchmarks/kiwoom_ws_simulator.py)를 띄우고, 그 주소(KIWOOM_SOCKET_URL)로
+서버(uvicorn app.main:app)를 실행한 뒤 클라이언트 N개가 각각 종목 K개를 구독했을 때
+- 처리량 : 측정 구간 동안 클라이언트가 받은 체결 수 / 초
+- 지연    : 시뮬레이터가 체결을 보낸 시각 → 클라이언트가 받은 시각 (p50/p90/p99/max)
+- 메모리  : 클라이언트 연결 전후 서버 VmRSS 차이 / 연결 수
+를 측정합니다. 시뮬레이터는 체결량 필드에 종목별 일련번호를 넣으므로 (종목코드, 체결량)으로 보낸 시각을 찾습니다.
+
+서버는 로그인 시 Redis(db 9)의 KIWOOM_TOKEN을 사용하므로, 유효한 토큰이 없으면 --seed-token으로
+가짜 토큰을 넣어야 합니다. (기존 토큰을 덮어쓰므로 운영 Redis에서는 사용하지 마세요)
+
+실행: python -m benchmarks.ws_fanout [클라이언트 수] [종목 수] [클라이언트당 구독 수] [종목당 초당 체결 수]
+      [--encoding json|binary] [--mode all|latest] [--duration 초] [--seed-token]
+      [--server http://host:port --server-pid PID]   (이미 떠 있는 서버 사용, KIWOOM_SOCKET_URL은 --sim-port 주소)
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import subprocess
+import urllib.request
+import numpy as np
+import websockets
+from websockets.exceptions import ConnectionClosed
+from app.services.tick_codec import decode, KEYFRAME
+from benchmarks.kiwoom_ws_simulator import KiwoomSimulator
+
+
+class Collector:
+    """클라이언트들이 받은 체결의 지연/건수 집계"""
+
+    def __init__(self):
+        self.window_start = None   # 측정 시작 시각 (이전에 보낸 체결, 스냅샷은 제외)
+        self.latencies = []
+        self.received = 0
+        self.unmatched = 0         # 보낸 시각을 찾지 못한 체결
+        self.gaps = 0              # 바이너리: seq가 끊겨 다음 keyframe까지 버린 delta
+
+    def record(self, sent: dict, code: str, seq: int, received_at: float):
+        if self.window_start is None:
+            return
+        sent_at = sent.get((code, seq))
+        if sent_at is None:
+            self.unmatched += 1
+            return
+        if sent_at < self.window_start:
+            return
+        self.received += 1
+        self.latencies.append(received_at - sent_at)
+
+
+async def run_client(url: str, codes: list, mode: str, sent: dict, collector: Collector, ready):
+    async with websockets.connect(url, max_size=None, open_timeout=30) as ws:
+        for code in codes:
+            await ws.send(json.dumps({"action": "subscribe", "code": code, "mode": mode, "snapshot": 0}))
+        ready()
+        symbols = {}    # symbol -> 종목코드
+        previous = {}   # symbol -> (seq, 직전 값)
+        try:
+            async for message in ws:
+                received_at = time.perf_counter()
+                if isinstance(message, bytes):
+                    symbol, seq = int.from_bytes(message[1:3], "little"), int.from_bytes(message[3:5], "little")
+                    last = previous.get(symbol)
+                    if message[0] == KEYFRAME:
+                        _, _, values = decode(message)
+                    elif last is not None and last[0] == (seq - 1) & 0xFFFF:
+                        _, _, values = decode(message, last[1])
+                    else:
+                        collector.gaps += 1
+                        previous.pop(symbol, None)
+                        continue
+                    previous[symbol] = (seq, values)
+                    code = symbols.get(symbol)
+                    if code is not None:
+                        collector.record(sent, code, abs(values[4]), received_at)
+                    continue
+                data = json.loads(message)
+                if data.get("status") == "symbol":
+                    symbols[data["symbol"]] = data["stock_code"]
+                elif "status" not in data and "volume" in data:
+                    collector.record(sent, data["stock_code"], abs(int(data["volume"])), received_at)
+        except ConnectionClosed:
+            pass
+
+
+def vm_rss(pid: int) -> int:
+    """프로세스 VmRSS (bytes, 알 수 없으면 0)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def get_stats(server: str) -> dict:
+    with urllib.request.urlopen(f"{server}/api/stock/ws/stats", timeout=5) as response:
+        return json.loads(response.read())
+
+
+async def wait_ready(server: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return await asyncio.to_thread(get_stats, server)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"서버가 {timeout:.0f}초 안에 응답하지 않았습니다: {server}")
+            await asyncio.sleep(0.3)
+
+
+def seed_token():
+    """Redis에 가짜 Kiwoom 토큰 저장 (시뮬레이터는 토큰을 검사하지 않음)"""
+    from app.db.redis_service import kiwoom_token
+    from app.services.kiwoom_token import TOKEN_KEY
+    lifetime = 6 * 3600
+    kiwoom_token.setex(TOKEN_KEY, lifetime, json.dumps({"token": "simulator", "expires_at": time.time() + lifetime}))
+
+
+def start_server(port: int, simulator_url: str) -> subprocess.Popen:
+    env = {**os.environ, "KIWOOM_SOCKET_URL": simulator_url}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+
+
+def report(args, collector: Collector, duration: float, rss_before: int, rss_after: int, stats: dict, simulator):
+    ms = np.array(collector.latencies) * 1000
+    expected = args.clients * args.per_client * args.rate
+    print(f"clients: {args.clients}, codes: {args.codes}, 구독/클라이언트: {args.per_client}, "
+          f"종목당 {args.rate}건/s, encoding: {args.encoding}, mode: {args.mode}")
+    print(f"처리량    : {collector.received / duration:12,.0f} msgs/s  (mode=all 기준 기대값 {expected:,.0f} msgs/s)")
+    if len(ms):
+        print(f"지연      : p50 {np.percentile(ms, 50):7.2f} ms  p90 {np.percentile(ms, 90):7.2f} ms  "
+              f"p99 {np.percentile(ms, 99):7.2f} ms  max {ms.max():7.2f} ms")
+    else:
+        print("지연      : 측정 구간에 받은 체결이 없습니다.")
+    if rss_before and rss_after:
+        print(f"서버 메모리: {rss_before / 2**20:,.1f} MiB → {rss_after / 2**20:,.1f} MiB  "
+              f"(연결당 {(rss_after - rss_before) / args.clients / 1024:,.1f} KiB)")
+    print(f"시뮬레이터: 송신 체결 {simulator.sent_count:,d}개, REG/REMOVE 프레임 {simulator.reg_frames}개, "
+          f"연결 {simulator.connections}회")
+    print(f"서버      : 버린 메시지 {stats.get('dropped_total', 0):,d}개, 재연결 {stats.get('reconnects', 0)}회  |  "
+          f"매칭 실패 {collector.unmatched:,d}개, 바이너리 seq 끊김 {collector.gaps:,d}개")
+
+
+async def run(args):
+    simulator = KiwoomSimulator(port=args.sim_port, rate=args.rate, record=True)
+    await simulator.start()
+    process = None
+    if args.seed_token:
+        seed_token()
+    if args.server:
+        server, pid = args.server.rstrip("/"), args.server_pid
+    else:
+        process = start_server(args.port, simulator.url)
+        server, pid = f"http://127.0.0.1:{args.port}", process.pid
+
+    tasks = []
+    try:
+        await wait_ready(server)
+        rss_before = vm_rss(pid) if pid else 0
+
+        rng = random.Random(0)
+        pool = [f"{i:06d}" for i in range(args.codes)]
+        query = "?encoding=binary" if args.encoding == "binary" else ""
+        url = server.replace("http", "ws", 1) + "/api/stock/ws/trade-price" + query
+        collector = Collector()
+        connected = asyncio.Semaphore(0)
+        for _ in range(args.clients):
+            codes = rng.sample(pool, args.per_client)
+            tasks.append(asyncio.create_task(run_client(
+                url, codes, args.mode, simulator.sent, collector, connected.release,
+            )))
+            if len(tasks) % 100 == 0:
+                await asyncio.sleep(0)   # 서버 accept backlog 초과 방지
+
+        for _ in range(args.clients):
+            await asyncio.wait_for(connected.acquire(), timeout=60)
+        failed = [t for t in tasks if t.done() and t.exception()]
+        if failed:
+            raise RuntimeError(f"클라이언트 연결 실패: {failed[0].exception()!r}")
+
+        await asyncio.sleep(args.warmup)
+        collector.window_start = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        duration = time.perf_counter() - collector.window_start
+        rss_after = vm_rss(pid) if pid else 0
+        stats = await asyncio.to_thread(get_stats, server)
+        collector.window_start = None
+        report(args, collector, duration, rss_before, rss_after, stats, simulator)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        await simulator.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="실시간 시세 fan-out 부하 벤치마크")
+    parser.add_argument("clients", type=int, nargs="?", default=500)
+    parser.add_argument("codes", type=int, nargs="?", default=100)
+    parser.add_argument("per_client", type=int, nargs="?", default=5)
+    parser.add_argument("rate", type=float, nargs="?", default=5.0, help="종목당 초당 체결 수")
+    parser.add_argument("--encoding", choices=("json", "binary"), default="json")
+    parser.add_argument("--mode", choices=("all", "latest"), default="all")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=18000, help="직접 실행하는 서버 포트")
+    parser.add_argument("--sim-port", type=int, default=18700, help="시뮬레이터 포트")
+    parser.add_argument("--server", help="이미 실행 중인 서버 주소 (예: http://127.0.0.1:8000)")
+    parser.add_argument("--server-pid", type=int, help="--server의 프로세스 ID (메모리 측정용)")
+    parser.add_argument("--seed-token", action="store_true", help="Redis에 가짜 Kiwoom 토큰 저장")
+    args = parser.parse_args()
+    if args.per_client > args.codes:
+        parser.error("클라이언트당 구독 수는 종목 수 이하여야 합니다.")
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
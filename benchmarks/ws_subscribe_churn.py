@@ -0,0 +1,146 @@
+"""
+실시간 시세 구독 churn 벤치마크 (KiwoomConnectionManager 구독/해지/연결 종료)
+
+Kiwoom 연결은 가짜 소켓으로 대체하고(연결 지연만 흉내), 클라이언트 N개가 동시에
+구독 → 무작위 구독 변경 → (재연결 중) 구독 변경 → 연결 종료를 할 때의 처리량과 요청별 지연을 측정합니다.
+
+실행: python -m benchmarks.ws_subscribe_churn [클라이언트 수] [종목 수] [클라이언트당 구독 수] [연결 지연(초)]
+"""
+import sys
+import time
+import random
+import asyncio
+import logging
+from types import SimpleNamespace
+import numpy as np
+from websockets.protocol import State
+from app.services.kiwoom_connection_manager import KiwoomConnectionManager
+
+
+class FakeKiwoomSocket:
+    def __init__(self):
+        self.protocol = SimpleNamespace(state=State.OPEN)
+        self.frames = 0
+
+    async def send(self, message):
+        self.frames += 1
+        await asyncio.sleep(0)
+
+    async def close(self):
+        self.protocol.state = State.CLOSED
+
+
+class FakeClient:
+    client = None
+
+    async def send_text(self, message):
+        pass
+
+    async def send_bytes(self, message):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+
+def install_fake_upstream(manager, connect_latency: float):
+    frames = []
+
+    async def connect():
+        if manager.is_running:
+            return True
+        await asyncio.sleep(connect_latency)  # 네트워크 연결 + 로그인
+        manager.kiwoom_ws = FakeKiwoomSocket()
+        frames.append(manager.kiwoom_ws)
+        manager.is_running = True
+        await manager._resubscribe_all()
+        return True
+
+    manager.connect = connect
+    return frames
+
+
+async def timed(latencies: list, coro):
+    started = time.perf_counter()
+    await coro
+    latencies.append(time.perf_counter() - started)
+
+
+def report(name: str, latencies: list, elapsed: float):
+    ms = np.array(latencies) * 1000
+    print(f"{name:<11}: {len(ms):7,d} ops  {len(ms) / elapsed:10,.0f} ops/s  "
+          f"p50 {np.percentile(ms, 50):7.2f} ms  p99 {np.percentile(ms, 99):7.2f} ms  max {ms.max():7.2f} ms")
+
+
+async def run(clients: int, codes: int, per_client: int, connect_latency: float):
+    manager = KiwoomConnectionManager()
+    frames = install_fake_upstream(manager, connect_latency)
+    rng = random.Random(0)
+    pool = [f"{i:06d}" for i in range(codes)]
+    sockets = [FakeClient() for _ in range(clients)]
+    for ws in sockets:
+        manager.register_client(ws)
+    owned = {ws: rng.sample(pool, per_client) for ws in sockets}
+
+    # Kiwoom 연결 수립
+    warmup = FakeClient()
+    manager.register_client(warmup)
+    await manager.subscribe(warmup, pool[0])
+
+    # 1. 모든 클라이언트가 동시에 구독
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(latencies, manager.subscribe(ws, code)) for ws in sockets for code in owned[ws]))
+    report("subscribe", latencies, time.perf_counter() - started)
+
+    # 2. 클라이언트마다 구독 종목 하나를 다른 종목으로 변경
+    latencies = []
+    started = time.perf_counter()
+
+    async def switch(ws):
+        old = owned[ws].pop()
+        new = rng.choice(pool)
+        owned[ws].append(new)
+        await manager.unsubscribe(ws, old)
+        await manager.subscribe(ws, new)
+
+    await asyncio.gather(*(timed(latencies, switch(ws)) for ws in sockets))
+    report("switch", latencies, time.perf_counter() - started)
+
+    # 3. Kiwoom 재연결(연결 지연 동안 연결 Lock 보유) 중에 같은 구독 변경
+    async def reconnect():
+        async with manager.lock:
+            manager.is_running = False
+            await manager.connect()
+
+    latencies = []
+    started = time.perf_counter()
+    reconnecting = asyncio.create_task(reconnect())
+    await asyncio.sleep(0)
+    await asyncio.gather(*(timed(latencies, switch(ws)) for ws in sockets))
+    report("reconnect", latencies, time.perf_counter() - started)
+    await reconnecting
+
+    # 4. 모든 클라이언트 연결 종료
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(latencies, manager.handle_disconnect(ws)) for ws in sockets))
+    report("disconnect", latencies, time.perf_counter() - started)
+    await manager.handle_disconnect(warmup)
+
+    print(f"Kiwoom 연결 {len(frames)}회, 송신 프레임 {sum(f.frames for f in frames):,d}개, "
+          f"남은 구독 {len(manager.subscriptions)}, 진행 중인 등록/해지 {len(manager.pending)}")
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    codes = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    per_client = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    connect_latency = float(sys.argv[4]) if len(sys.argv) > 4 else 0.2
+    logging.disable(logging.INFO)
+    print(f"clients: {clients}, codes: {codes}, 구독/클라이언트: {per_client}, 연결 지연: {connect_latency}s")
+    asyncio.run(run(clients, codes, per_client, connect_latency))
+
+
+if __name__ == "__main__":
+    main()
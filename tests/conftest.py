@@ -0,0 +1,16 @@
+import pytest
+from app.db import redis_service
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """get_async_redis가 테스트마다 새 fakeredis 서버를 사용하도록 교체"""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+
+    def client(**kwargs):
+        return fakeredis.aioredis.FakeRedis(server=server, decode_responses=kwargs.get("decode_responses", True))
+
+    monkeypatch.setattr(redis_service.aioredis, "Redis", client)
+    monkeypatch.setattr(redis_service, "_async_clients", {})
+    return redis_service.get_async_redis
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.services import chart_codec
+from app.services.chart_codec import encode_chart, decode_chart, to_frame, to_records, to_json_bytes, iter_ndjson
+
+
+def _kr_frame():
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(["2024-01-02", "2024-01-03"]),
+        "open": np.array([70000, 70100], dtype="int64"),
+        "high": np.array([70500, 70900], dtype="int64"),
+        "low": np.array([69800, 70000], dtype="int64"),
+        "close": np.array([70100, 70800], dtype="int64"),
+        "volume": np.array([1_000_000, 2_000_000], dtype="int64"),
+        "fluctuation_rate": [0.14, 1.0],
+    })
+
+
+def _us_frame():
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(["2024-01-02", "2024-01-03"]),
+        "open": [700123.45, 0.0],
+        "close": [185.0, 186.25],
+        "volume": [10.0, 20.0],
+        "close_krw": [249750.9, 251437.5],
+    })
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_round_trip_keeps_values(compress):
+    df = _us_frame()
+    columns, meta = decode_chart(encode_chart(df, meta={"first": "2024-01-02"}, compress=compress))
+    assert meta == {"first": "2024-01-02"}
+    assert list(columns) == list(df.columns)
+    assert columns["open"].tolist() == [700123.45, 0.0]
+    assert to_frame(columns)["timestamp"].tolist() == df["timestamp"].tolist()
+
+
+def test_kr_prices_stay_integers():
+    columns, _ = decode_chart(encode_chart(_kr_frame()))
+    for name in ("open", "high", "low", "close", "volume"):
+        assert columns[name].dtype == np.dtype("<i8")
+    assert columns["fluctuation_rate"].dtype == np.dtype("<f8")
+
+    record = to_records(columns)[0]
+    assert record["close"] == 70100 and isinstance(record["close"], (int, np.integer))
+    assert b'"close":70100,' in to_json_bytes(columns)
+
+
+def test_dtype_follows_source_not_values():
+    columns, _ = decode_chart(encode_chart(_us_frame()))
+    # 정수 값만 있는 실수 컬럼도 float64 유지
+    assert columns["close"].dtype == np.dtype("<f8")
+    assert to_records(columns)[1]["open"] == 0.0
+    # 원화 환산값과 거래량은 항상 정수
+    assert columns["close_krw"].dtype == np.dtype("<i8")
+    assert columns["volume"].dtype == np.dtype("<i8")
+
+
+def test_rows_without_price_are_dropped():
+    df = _kr_frame().astype({"close": "float64"})
+    df.loc[0, "close"] = np.nan
+    columns, _ = decode_chart(encode_chart(df))
+    assert columns["close"].tolist() == [70800.0]
+    assert len(columns["timestamp"]) == 1
+
+
+def test_non_numeric_column_is_rejected():
+    df = _kr_frame()
+    df["name"] = "삼성전자"
+    with pytest.raises(ValueError):
+        encode_chart(df)
+
+
+def test_invalid_blob_is_rejected():
+    with pytest.raises(ValueError):
+        decode_chart(b"")
+    blob = bytearray(encode_chart(_kr_frame()))
+    blob[4] = chart_codec.VERSION + 1
+    with pytest.raises(ValueError):
+        decode_chart(bytes(blob))
+
+
+def test_ndjson_chunks_cover_all_rows():
+    columns, _ = decode_chart(encode_chart(_kr_frame()))
+    lines = b"".join(iter_ndjson(columns, chunk_rows=1)).splitlines()
+    assert len(lines) == 2
+    assert lines[0].startswith(b'{"timestamp":"2024-01-02"')
@@ -0,0 +1,55 @@
+import pytest
+from app.services import chart_response
+from app.services.chart_response import make_etag, etag_header, matched_etag, etag_matches, choose_encoding, IDENTITY
+
+
+ETAG = make_etag(b"blob")
+
+
+def test_etag_depends_on_blob_and_variant():
+    assert make_etag(b"blob") == ETAG
+    assert make_etag(b"other") != ETAG
+    assert make_etag(b"blob", "ndjson") != ETAG
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    (f'"{ETAG}"', f'"{ETAG}"'),
+    (f'"{ETAG}-br"', f'"{ETAG}-br"'),
+    (f'W/"{ETAG}-gzip"', f'"{ETAG}-gzip"'),
+    (f'"stale", "{ETAG}-gzip"', f'"{ETAG}-gzip"'),
+    ("*", f'"{ETAG}"'),
+    ('"stale"', None),
+    ("", None),
+    (None, None),
+])
+def test_matched_etag_returns_the_variant_the_client_sent(if_none_match, expected):
+    assert matched_etag(if_none_match, ETAG) == expected
+    assert etag_matches(if_none_match, ETAG) is (expected is not None)
+
+
+def test_etag_header_suffixes_compressed_variants():
+    assert etag_header(ETAG, IDENTITY) == f'"{ETAG}"'
+    assert etag_header(ETAG, "gzip") == f'"{ETAG}-gzip"'
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    (None, IDENTITY),
+    ("", IDENTITY),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0", IDENTITY),
+    ("*", "br"),
+    ("*, br;q=0", "gzip"),
+    ("GZIP;q=0.5", "gzip"),
+    ("gzip;q=abc", IDENTITY),
+])
+def test_choose_encoding(monkeypatch, accept_encoding, expected):
+    monkeypatch.setattr(chart_response, "brotli", object())
+    assert choose_encoding(accept_encoding) == expected
+
+
+def test_choose_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(chart_response, "brotli", None)
+    assert choose_encoding("br, gzip") == "gzip"
+    assert choose_encoding("br") == IDENTITY
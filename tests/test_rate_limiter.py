@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+import redis
+from app.errors import StockAPIException
+from app.services import rate_limiter as rl
+
+
+def test_burst_then_wait(fake_redis):
+    async def run():
+        return [await rl._take("ka10081", 0) for _ in range(3)]
+
+    first, second, third = asyncio.run(run())
+    assert first == second == 0
+    # ka10081은 초당 2회, burst 2 → 세 번째 호출은 약 0.5초 대기
+    assert third == pytest.approx(0.5, abs=0.05)
+
+
+def test_background_keeps_token_for_interactive(fake_redis):
+    _, burst = rl.get_limit("ka10001")
+
+    async def run():
+        background = [await rl._take("ka10001", 1) for _ in range(burst)]
+        interactive = await rl._take("ka10001", 0)
+        return background, interactive
+
+    background, interactive = asyncio.run(run())
+    # BACKGROUND는 토큰 하나를 남기고 멈추고, 남은 토큰은 사용자 요청이 사용
+    assert background[:-1] == [0] * (burst - 1)
+    assert background[-1] > 0
+    assert interactive == 0
+
+
+def test_acquire_times_out(fake_redis, monkeypatch):
+    monkeypatch.setattr(rl, "ACQUIRE_TIMEOUT", 0.1)
+
+    async def run():
+        for _ in range(3):
+            await rl.acquire("ka10081")
+
+    with pytest.raises(StockAPIException) as e:
+        asyncio.run(run())
+    assert e.value.status_code == 503
+
+
+def test_local_bucket_when_redis_fails(monkeypatch):
+    class Broken:
+        async def eval(self, *args):
+            raise redis.ConnectionError("down")
+
+    monkeypatch.setattr(rl, "get_async_redis", lambda db: Broken())
+    monkeypatch.setattr(rl, "_local_buckets", {})
+
+    async def run():
+        return [await rl._take("ka10081", 0) for _ in range(3)]
+
+    first, second, third = asyncio.run(run())
+    assert first == second == 0
+    assert third > 0
@@ -0,0 +1,57 @@
+import asyncio
+from app.services import single_flight as sf
+from app.services.single_flight import single_flight
+
+
+def test_concurrent_calls_share_one_fetch(fake_redis):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*(single_flight("sf-share", fetch) for _ in range(5)))
+
+    assert asyncio.run(asyncio.wait_for(run(), 5)) == ["value"] * 5
+    assert calls == [1]
+    assert sf._inflight == {}
+
+
+def test_lock_is_released_after_fetch_error(fake_redis):
+    async def fetch():
+        raise ValueError("upstream")
+
+    async def run():
+        try:
+            await single_flight("sf-error", fetch)
+        except ValueError:
+            pass
+        return await fake_redis(sf.LOCK_DB).exists(sf._lock_key("sf-error"))
+
+    assert asyncio.run(run()) == 0
+
+
+def test_waits_for_cache_filled_by_lock_holder(fake_redis, monkeypatch):
+    monkeypatch.setattr(sf, "POLL_INTERVAL", 0.01)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return "fetched"
+
+    async def check_cache():
+        return await fake_redis(0).get("sf-cache")
+
+    async def run():
+        client = fake_redis(sf.LOCK_DB)
+        # 다른 워커가 락을 잡고 조회 중인 상태
+        await client.set(sf._lock_key("sf-wait"), "other", px=10_000)
+        waiter = asyncio.create_task(single_flight("sf-wait", fetch, check_cache))
+        await asyncio.sleep(0.05)
+        await fake_redis(0).set("sf-cache", "cached")
+        return await waiter
+
+    assert asyncio.run(asyncio.wait_for(run(), 5)) == "cached"
+    assert calls == []
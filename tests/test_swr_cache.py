@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+from app.services import swr_cache as swr
+from app.services.swr_cache import swr_cache, unpack_entry
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(swr.time, "time", clock.time)
+    return clock
+
+
+def make_cached(calls: list, key: str):
+    @swr_cache(key_fn=lambda x: f"{key}:{x}", soft_ttl=10, hard_ttl=100)
+    async def load(x):
+        calls.append(x)
+        await asyncio.sleep(0.01)
+        return {"x": x, "version": len(calls)}
+
+    return load
+
+
+async def _drain_background():
+    while swr._background_tasks:
+        await asyncio.gather(*list(swr._background_tasks))
+
+
+def test_miss_fetches_and_stores_with_hard_ttl(fake_redis, clock):
+    calls = []
+    load = make_cached(calls, "swr-miss")
+
+    async def run():
+        value = await load(1)
+        client = fake_redis(0, decode_responses=False)
+        payload, soft_expires_at = unpack_entry(await client.get("swr-miss:1"))
+        return value, payload, soft_expires_at, await client.ttl("swr-miss:1")
+
+    value, payload, soft_expires_at, ttl = asyncio.run(run())
+    assert value == {"x": 1, "version": 1}
+    assert calls == [1]
+    assert soft_expires_at == clock.now + 10
+    assert 0 < ttl <= 100
+
+
+def test_fresh_value_is_served_from_cache(fake_redis, clock):
+    calls = []
+    load = make_cached(calls, "swr-fresh")
+
+    async def run():
+        first = await load(1)
+        clock.now += 9
+        return first, await load(1)
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert calls == [1]
+    assert not swr._background_tasks
+
+
+def test_stale_value_is_served_while_refreshing_in_background(fake_redis, clock):
+    calls = []
+    load = make_cached(calls, "swr-stale")
+
+    async def run():
+        await load(1)
+        clock.now += 11
+        # soft 만료 이후: 기존 값을 바로 반환하고 갱신은 백그라운드에서 한 번만
+        stale = await asyncio.gather(load(1), load(1))
+        await _drain_background()
+        return stale, await load(1)
+
+    stale, refreshed = asyncio.run(run())
+    assert stale == [{"x": 1, "version": 1}] * 2
+    assert refreshed == {"x": 1, "version": 2}
+    assert calls == [1, 1]
+
+
+def test_hard_expiry_fetches_again_before_returning(fake_redis, clock):
+    calls = []
+    load = make_cached(calls, "swr-hard")
+
+    async def run():
+        await load(1)
+        # hard TTL이 지나 Redis에서 키가 사라진 상태
+        await fake_redis(0, decode_responses=False).delete("swr-hard:1")
+        return await load(1)
+
+    assert asyncio.run(run()) == {"x": 1, "version": 2}
+    assert calls == [1, 1]
+    assert not swr._background_tasks
+
+
+def test_concurrent_misses_fetch_once(fake_redis, clock):
+    calls = []
+    load = make_cached(calls, "swr-burst")
+
+    async def run():
+        return await asyncio.gather(*(load(1) for _ in range(5)))
+
+    values = asyncio.run(asyncio.wait_for(run(), 5))
+    assert values == [{"x": 1, "version": 1}] * 5
+    assert calls == [1]
+
+
+def test_get_many_returns_cached_values_and_none_for_misses(fake_redis, clock):
+    calls = []
+    load = make_cached(calls, "swr-many")
+
+    async def run():
+        await load(1)
+        return await load.get_many([(1,), (2,)])
+
+    assert asyncio.run(run()) == [{"x": 1, "version": 1}, None]
+    assert calls == [1]
@@ -0,0 +1,102 @@
+import asyncio
+import json
+from app.services.ws_client import ClientChannel, DISCONNECT
+
+
+class FakeWebSocket:
+    """send가 release될 때까지 막히는 WebSocket (느린 클라이언트 흉내)"""
+
+    client = None
+
+    def __init__(self, blocked: bool = False):
+        self.sent = []
+        self.closed_code = None
+        self.gate = asyncio.Event()
+        if not blocked:
+            self.gate.set()
+
+    async def send_text(self, message):
+        await self.gate.wait()
+        self.sent.append(message)
+
+    async def send_bytes(self, message):
+        await self.gate.wait()
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        self.closed_code = code
+
+
+async def _settle():
+    # writer Task가 대기 중인 메시지를 처리할 시간
+    await asyncio.sleep(0.01)
+
+
+def test_sends_text_and_bytes_in_order():
+    async def run():
+        websocket = FakeWebSocket()
+        channel = ClientChannel(websocket, maxsize=4)
+        channel.offer_json({"a": 1})
+        channel.offer(b"\x01\x02")
+        await _settle()
+        channel.stop()
+        return websocket.sent, channel.sent
+
+    sent, count = asyncio.run(run())
+    assert sent == [json.dumps({"a": 1}), b"\x01\x02"]
+    assert count == 2
+
+
+def test_full_queue_drops_oldest():
+    async def run():
+        websocket = FakeWebSocket(blocked=True)
+        channel = ClientChannel(websocket, maxsize=2)
+        channel.offer("0")
+        await _settle()
+        # writer가 "0"을 들고 막혀 있으므로 이후 메시지만 큐에 쌓임
+        for i in range(1, 5):
+            channel.offer(str(i))
+        websocket.gate.set()
+        await _settle()
+        channel.stop()
+        return websocket.sent, channel.dropped
+
+    sent, dropped = asyncio.run(run())
+    assert sent == ["0", "3", "4"]
+    assert dropped == 2
+
+
+def test_full_queue_disconnect_policy_closes_socket():
+    async def run():
+        websocket = FakeWebSocket(blocked=True)
+        channel = ClientChannel(websocket, maxsize=1, policy=DISCONNECT)
+        channel.offer("0")
+        await _settle()
+        # writer가 "0"을 들고 막혀 있으므로 "1"로 큐가 가득 차고 "2"에서 연결 종료
+        accepted = [channel.offer(str(i)) for i in range(1, 4)]
+        await channel.close_task
+        return accepted, channel.closed, websocket.closed_code
+
+    accepted, closed, code = asyncio.run(run())
+    assert accepted == [True, False, False]
+    assert closed
+    assert code == 1013
+
+
+def test_conflation_sends_only_latest_tick():
+    async def run():
+        websocket = FakeWebSocket(blocked=True)
+        channel = ClientChannel(websocket)
+        channel.set_conflation("005930")
+        channel.offer("first")
+        await _settle()
+        for price in (100, 101, 102):
+            channel.offer_latest("005930", {"price": price})
+        websocket.gate.set()
+        await _settle()
+        channel.stop()
+        return websocket.sent, channel.coalesced
+
+    sent, coalesced = asyncio.run(run())
+    assert sent == ["first", json.dumps({"price": 102})]
+    assert coalesced == 2